@@ -5,6 +5,11 @@ CREATE TABLE auroraStrength(
 	obs_date timestamptz,
 	forecast timestamptz,
 	strength numeric,
-	geom geography
+	geom geography,
+	gid bigserial PRIMARY KEY
 );
 
+CREATE INDEX aurorastrength_forecast_brin ON auroraStrength USING BRIN (forecast);
+CREATE INDEX aurorastrength_geom_gist ON auroraStrength USING GIST (geom);
+CREATE INDEX aurorastrength_id_idx ON auroraStrength (id);
+
@@ -28,5 +28,6 @@ def getJSON():
         else:
             classifiedMultiPoints[a] = []
 
+    aurora['points'] = points # keep the raw [lon, lat, strength] grid for the time cube
     aurora['coordinates'] = classifiedMultiPoints
     return aurora
@@ -0,0 +1,15 @@
+-- Migration for an existing auroraStrength table made by an older cr_tables.sql.
+-- Adds a sequence key and the indexes used by stream_query.py and read.py:
+--     gid      : bigserial primary key, filled in for existing rows
+--     forecast : BRIN, rows arrive in forecast order so block ranges stay tight
+--     geom     : GiST, for bounding box searches
+--     id       : btree, for the per-forecast selections in read.py
+-- Safe to run more than once.
+
+ALTER TABLE auroraStrength ADD COLUMN IF NOT EXISTS gid bigserial PRIMARY KEY;
+
+CREATE INDEX IF NOT EXISTS aurorastrength_forecast_brin ON auroraStrength USING BRIN (forecast);
+CREATE INDEX IF NOT EXISTS aurorastrength_geom_gist ON auroraStrength USING GIST (geom);
+CREATE INDEX IF NOT EXISTS aurorastrength_id_idx ON auroraStrength (id);
+
+ANALYZE auroraStrength;
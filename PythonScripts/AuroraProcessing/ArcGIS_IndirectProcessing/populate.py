@@ -8,8 +8,14 @@
 
 import psycopg2
 import datetime
+import os
+import sys
 from get_json import *
 
+# the time cube lives with the open source scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'OpenSource_DirectProcessing'))
+from timecube import TimeCube, gridFromOvation, CUBE_DIR # the shared history of every forecast
+
 
 aurora = getJSON()
 # Get name based on timestamp
@@ -63,7 +69,7 @@ else:
     maxid += 1
     
 for key in aurora['coordinates']:
-    insert = f'''INSERT INTO auroraStrength VALUES(
+    insert = f'''INSERT INTO auroraStrength(id, obs_date, forecast, strength, geom) VALUES(
         {maxid},'{obsStr}'::timestamptz,'{forecastStr}'::timestamptz,{key},'{aurora['coordinates'][key]}'
         );'''
     print(f'inserting values: {maxid}, {obsStr}, {forecastStr}, {key}')
@@ -74,3 +80,6 @@ c.close()
 conn.commit()
 print('committed insert to database!')
 conn.close()
+
+if TimeCube(CUBE_DIR).append(forecastTime, gridFromOvation(aurora['points'])):
+    print('appended forecast to the time cube!')
@@ -0,0 +1,110 @@
+#==============================================================================
+# Aurora : rastercube.py
+# Author : Nathan Wisla
+# Purpose: To keep a whole batch of interpolated forecasts in one multi-band
+#          GeoTIFF, one band per forecast, with each band's forecast time in
+#          its metadata
+# Date   : October 19, 2026
+#==============================================================================
+# This replaces the RasterAnimated mosaic dataset in RasterizePoints.ipynb and
+# the AddJoin / CalculateField / RemoveJoin steps that attached forecast times
+# to it. Every band is allocated up front (sparse, so unwritten bands take no
+# space) and filled in as its forecast finishes. Each band carries:
+#     FORECAST_TIME - ISO 8601 forecast time
+#     FORECAST_ID   - the auroraStrength id it was made from
+# and the dataset carries BANDS_WRITTEN, the number of bands filled so far.
+
+from osgeo import gdal, osr
+import numpy as np
+
+CREATE_OPTIONS = ['TILED=YES', 'INTERLEAVE=BAND', 'SPARSE_OK=TRUE',\
+                  'COMPRESS=DEFLATE', 'PREDICTOR=3', 'BIGTIFF=IF_SAFER']
+
+
+class RasterCube():
+
+    def __init__(self, outputName, nBands=None, shape=None, geotransform=None, epsg=4326):
+        '''RasterCube(outputName, nBands, shape, geotransform, epsg)
+               outputName  : path of the GeoTIFF
+               nBands      : number of forecasts the cube will hold
+               shape       : (rows, cols) of every band
+               geotransform: GDAL geotransform of every band
+
+               Creates a new time cube when nBands, shape and geotransform are
+               given, otherwise opens an existing one for update.
+        '''
+        self.outputName = outputName
+
+        if nBands is None:
+            self.dataset = gdal.Open(outputName, gdal.GA_Update)
+        else:
+            rows, cols = shape
+            driver = gdal.GetDriverByName('GTiff')
+            self.dataset = driver.Create(outputName, cols, rows, nBands,\
+                                         gdal.GDT_Float32, CREATE_OPTIONS)
+            self.dataset.SetGeoTransform(geotransform)
+
+            targetSRS = osr.SpatialReference()
+            targetSRS.ImportFromEPSG(epsg)
+            self.dataset.SetProjection(targetSRS.ExportToWkt())
+
+            for i in range(nBands):
+                self.dataset.GetRasterBand(i + 1).SetNoDataValue(np.nan)
+            self.dataset.SetMetadataItem('BANDS_WRITTEN', '0')
+            self.dataset.FlushCache()
+
+    def __repr__(self):
+        return f'RasterCube({self.outputName}: {self.written}/{self.dataset.RasterCount} bands written)'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def written(self):
+        return int(self.dataset.GetMetadataItem('BANDS_WRITTEN') or 0)
+
+    def writeBand(self, index, grid, forecastTime, forecastId=None):
+        '''writeBand(index, grid, forecastTime, forecastId) -> void
+               index       : band number, starting at 1
+               grid        : (rows, cols) array
+               forecastTime: datetime of the forecast
+
+               Writes one forecast into its band and flushes it to disk, so
+               the file is readable with every finished band while the rest
+               of the batch is still running.
+        '''
+        band = self.dataset.GetRasterBand(index)
+        band.WriteArray(np.asarray(grid, dtype=np.float32))
+
+        forecastTime = forecastTime.isoformat() if hasattr(forecastTime, 'isoformat') else str(forecastTime)
+        band.SetDescription(forecastTime)
+        band.SetMetadataItem('FORECAST_TIME', forecastTime)
+        if forecastId is not None:
+            band.SetMetadataItem('FORECAST_ID', str(forecastId))
+
+        if band.GetMetadataItem('WRITTEN') is None:
+            band.SetMetadataItem('WRITTEN', 'YES')
+            self.dataset.SetMetadataItem('BANDS_WRITTEN', str(self.written + 1))
+        self.dataset.FlushCache()
+
+    def times(self):
+        '''times() -> list of (band number, forecast time string)
+               Gets the forecast time of every band written so far.
+        '''
+        times = []
+        for i in range(1, self.dataset.RasterCount + 1):
+            forecastTime = self.dataset.GetRasterBand(i).GetMetadataItem('FORECAST_TIME')
+            if forecastTime is not None:
+                times.append((i, forecastTime))
+        return times
+
+    def close(self):
+        '''close() -> void
+               Flushes and closes the GeoTIFF.
+        '''
+        if self.dataset is not None:
+            self.dataset.FlushCache()
+            self.dataset = None
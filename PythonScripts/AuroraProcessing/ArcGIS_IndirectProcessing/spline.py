@@ -0,0 +1,299 @@
+#==============================================================================
+# Aurora : spline.py
+# Author : Nathan Wisla
+# Purpose: To interpolate every forecast in auroraStrength with a regularized
+#          spline without ArcGIS, one forecast per process
+# Date   : October 19, 2026
+#==============================================================================
+# This reproduces arcpy.sa.Spline(points, 'strength', 0.1, 'REGULARIZED', 0.1, 12)
+# from read.py and RasterizePoints.ipynb:
+#
+#     S(x,y) = a1 + a2*x + a3*y + sum(lambda_j * R(r_j))
+#     R(r)   = 1/(2pi) * { r^2/4 * [ln(r/2tau) + c - 1] + tau^2 * [K0(r/tau) + c + ln(r/2pi)] }
+#
+# with tau^2 the weight, K0 the modified Bessel function and c Euler's constant.
+# Like ArcGIS, every output cell is fitted to its 12 nearest input points
+# (found with a KD-tree). Neighbouring cells almost always share the same 12
+# points, so each distinct set of points is solved once and reused.
+#
+# Not yet validated against ArcGIS: compareRasters has not been run on an
+# arcpy.sa.Spline output, so the RMSE and maximum difference are unknown.
+#
+# Usage:
+#     python spline.py [output folder]            interpolate every forecast id
+#     python spline.py cube aurora.tif            ... into one time cube (rastercube.py)
+#     python spline.py compare ours.tif arc.tif   compare against ArcGIS output
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os import path, makedirs
+from osgeo import gdal, osr
+from scipy.spatial import cKDTree
+from scipy.special import k0
+import numpy as np
+
+from stream_query import streamBatches, forecastIds
+from rastercube import RasterCube
+
+dsn = 'host=localhost dbname=aurora user=postgres password=cogs1234'
+
+CELL_SIZE = 0.1
+WEIGHT = 0.1
+NUMBER_POINTS = 12
+EULER = 0.577215
+OVATION_EXTENT = (0, -90, 359, 90) # every forecast in a time cube shares this extent
+
+
+def regularizedBasis(r, tau):
+    '''regularizedBasis(r, tau) -> array
+            r  : array of distances
+            tau: square root of the spline weight
+
+            Evaluates the regularized spline basis function R(r).
+    '''
+    r = np.asarray(r, dtype=float)
+    R = np.empty_like(r)
+    zero = r < 1e-12
+    d = r[~zero]
+
+    R[~zero] = (d ** 2 / 4 * (np.log(d / (2 * tau)) + EULER - 1)\
+                + tau ** 2 * (k0(d / tau) + EULER + np.log(d / (2 * np.pi)))) / (2 * np.pi)
+    # limit as r -> 0, where the K0 and log terms cancel
+    R[zero] = tau ** 2 * np.log(tau / np.pi) / (2 * np.pi)
+    return R
+
+
+def solveLocal(xy, z, tau):
+    '''solveLocal(xy, z, tau) -> lambdas, trend
+            xy: (systems, points, 2) local coordinates of each point set
+            z : (systems, points) values of each point set
+
+            Solves the spline system of many point sets in one batched call.
+    '''
+    nSystems, n, _ = xy.shape
+    d = np.linalg.norm(xy[:, :, None, :] - xy[:, None, :, :], axis=-1)
+
+    A = np.zeros((nSystems, n + 3, n + 3))
+    A[:, :n, :n] = regularizedBasis(d, tau)
+    A[:, :n, n] = A[:, n, :n] = 1
+    A[:, :n, n + 1] = A[:, n + 1, :n] = xy[:, :, 0]
+    A[:, :n, n + 2] = A[:, n + 2, :n] = xy[:, :, 1]
+
+    b = np.zeros((nSystems, n + 3))
+    b[:, :n] = z
+
+    try:
+        solution = np.linalg.solve(A, b[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # coincident input points make a system singular
+        solution = (np.linalg.pinv(A) @ b[..., None])[..., 0]
+    return solution[:, :n], solution[:, n:]
+
+
+def splineGrid(x, y, z, cellSize=CELL_SIZE, weight=WEIGHT, nPoints=NUMBER_POINTS,\
+               extent=None, chunkRows=64):
+    '''splineGrid(x, y, z, cellSize, weight, nPoints, extent, chunkRows) -> grid, geotransform
+            x, y, z  : arrays of input point coordinates and values
+            cellSize : output cell size, in the units of x and y
+            weight   : regularized spline weight (tau^2)
+            nPoints  : number of nearest points used for each cell
+            extent   : (xmin, ymin, xmax, ymax) of the output, defaults to the
+                       extent of the points like ArcGIS
+            chunkRows: output rows processed at a time, bounds memory use
+
+            Interpolates a north-up float32 grid with a regularized spline.
+    '''
+    x, y, z = (np.asarray(v, dtype=float).ravel() for v in (x, y, z))
+    points = np.column_stack([x, y])
+    tree = cKDTree(points)
+    nPoints = min(nPoints, len(points))
+    tau = weight ** 0.5
+
+    extent = extent or (x.min(), y.min(), x.max(), y.max())
+    (nRows, nCols), geotransform = gridFrame(extent, cellSize)
+    xmin, ymax = geotransform[0], geotransform[3]
+    xc = xmin + (np.arange(nCols) + 0.5) * cellSize
+
+    grid = np.empty((nRows, nCols), dtype=np.float32)
+    for r0 in range(0, nRows, chunkRows):
+        r1 = min(nRows, r0 + chunkRows)
+        yc = ymax - (np.arange(r0, r1) + 0.5) * cellSize
+        cx, cy = (v.ravel() for v in np.meshgrid(xc, yc))
+
+        _, neighbours = tree.query(np.column_stack([cx, cy]), k=nPoints)
+        neighbours = np.sort(neighbours.reshape(len(cx), nPoints), axis=1)
+        sets, which = np.unique(neighbours, axis=0, return_inverse=True)
+        which = which.ravel()
+
+        # solve in coordinates local to each point set to keep A well conditioned
+        setXY = points[sets]
+        origin = setXY.mean(axis=1)
+        lambdas, trend = solveLocal(setXY - origin[:, None, :], z[sets], tau)
+
+        cellXY = setXY[which]
+        r = np.hypot(cx[:, None] - cellXY[:, :, 0], cy[:, None] - cellXY[:, :, 1])
+        localX = cx - origin[which, 0]
+        localY = cy - origin[which, 1]
+
+        a = trend[which]
+        values = a[:, 0] + a[:, 1] * localX + a[:, 2] * localY\
+                 + (lambdas[which] * regularizedBasis(r, tau)).sum(axis=1)
+        grid[r0:r1] = values.reshape(r1 - r0, nCols)
+
+    return grid, geotransform
+
+
+def gridFrame(extent, cellSize=CELL_SIZE):
+    '''gridFrame(extent, cellSize) -> (rows, cols), geotransform
+            Gets the shape and north-up geotransform of the output grid
+            covering extent (xmin, ymin, xmax, ymax).
+    '''
+    xmin, ymin, xmax, ymax = extent
+    nCols = max(1, int(np.ceil((xmax - xmin) / cellSize)))
+    nRows = max(1, int(np.ceil((ymax - ymin) / cellSize)))
+    return (nRows, nCols), (xmin, cellSize, 0, ymax, 0, -cellSize)
+
+
+def loadForecast(dsn, forecastId):
+    '''loadForecast(dsn, forecastId) -> x, y, strength, forecast time
+            Streams the points of one forecast id out of auroraStrength.
+    '''
+    x, y, z = [], [], []
+    forecast = None
+    for rows in streamBatches(dsn, ids=[forecastId]):
+        for _, _, forecast, strength, lon, lat in rows:
+            x.append(lon)
+            y.append(lat)
+            z.append(float(strength))
+    return np.array(x), np.array(y), np.array(z), forecast
+
+
+def writeRaster(outputName, grid, geotransform, epsg=4326):
+    '''writeRaster(outputName, grid, geotransform, epsg) -> void
+            Writes a single band float32 GeoTIFF.
+    '''
+    driver = gdal.GetDriverByName('GTiff')
+    rows, cols = grid.shape
+    target = driver.Create(outputName, cols, rows, 1, gdal.GDT_Float32)
+    target.SetGeoTransform(geotransform)
+
+    targetSRS = osr.SpatialReference()
+    targetSRS.ImportFromEPSG(epsg)
+    target.SetProjection(targetSRS.ExportToWkt())
+
+    target.GetRasterBand(1).WriteArray(grid)
+    target = None
+
+
+def interpolateForecast(dsn, forecastId, extent=None):
+    '''interpolateForecast(dsn, forecastId, extent) -> grid, geotransform, forecast time
+            Loads and interpolates one forecast. Runs in a worker process.
+    '''
+    x, y, z, forecast = loadForecast(dsn, forecastId)
+    grid, geotransform = splineGrid(x, y, z, extent=extent)
+    return grid, geotransform, forecast
+
+
+def processForecast(dsn, forecastId, outDir):
+    '''processForecast(dsn, forecastId, outDir) -> outputName
+            Loads, interpolates and writes one forecast. Runs in a worker process.
+    '''
+    grid, geotransform, _ = interpolateForecast(dsn, forecastId)
+    outputName = path.join(outDir, f'spline{forecastId}.tif')
+    writeRaster(outputName, grid, geotransform)
+    return outputName
+
+
+def batchSpline(dsn, outDir, ids=None, workers=None):
+    '''batchSpline(dsn, outDir, ids, workers) -> list of output rasters
+            ids    : forecast ids to interpolate, defaults to every id in the table
+            workers: size of the process pool, defaults to the number of CPUs
+
+            Interpolates every forecast id in parallel, one process per forecast.
+    '''
+    makedirs(outDir, exist_ok=True)
+    ids = forecastIds(dsn) if ids is None else ids
+
+    outputs = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(processForecast, dsn, i, outDir): i for i in ids}
+        for future in as_completed(futures):
+            outputs[futures[future]] = future.result()
+            print(f'forecast {futures[future]} done! ({len(outputs)}/{len(ids)})')
+
+    return [outputs[i] for i in ids]
+
+
+def batchSplineCube(dsn, outputName, ids=None, workers=None, extent=OVATION_EXTENT):
+    '''batchSplineCube(dsn, outputName, ids, workers, extent) -> outputName
+            outputName: the multi-band GeoTIFF to create
+            extent    : (xmin, ymin, xmax, ymax) shared by every band
+
+            Interpolates every forecast id in parallel and writes each one into
+            its own band of a single time cube as soon as it finishes. Bands
+            are ordered by forecast id and tagged with their forecast time.
+    '''
+    ids = forecastIds(dsn) if ids is None else ids
+    shape, geotransform = gridFrame(extent)
+
+    with RasterCube(outputName, len(ids), shape, geotransform) as cube,\
+         ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(interpolateForecast, dsn, i, extent): (band, i)\
+                   for band, i in enumerate(ids, 1)}
+        for future in as_completed(futures):
+            band, i = futures[future]
+            grid, _, forecast = future.result()
+            cube.writeBand(band, grid, forecast, i)
+            print(f'forecast {i} written to band {band}! ({cube.written}/{len(ids)})')
+
+    return outputName
+
+
+def compareRasters(ours, reference):
+    '''compareRasters(ours, reference) -> dict of statistics
+            ours     : raster made by this script
+            reference: arcpy.sa.Spline output of the same forecast, exported to
+                       a GDAL readable format with the same extent and cell size
+
+            Compares two interpolations of the same forecast cell by cell.
+    '''
+    arrays = []
+    for name in (ours, reference):
+        dataset = gdal.Open(name)
+        band = dataset.GetRasterBand(1)
+        array = band.ReadAsArray().astype(float)
+        if band.GetNoDataValue() is not None:
+            array[array == band.GetNoDataValue()] = np.nan
+        arrays.append(array)
+        dataset = None
+
+    a, b = arrays
+    if a.shape != b.shape:
+        raise ValueError(f'raster shapes differ: {a.shape} vs {b.shape}')
+
+    both = ~np.isnan(a) & ~np.isnan(b)
+    diff = a[both] - b[both]
+    stats = {'cells': int(both.sum()),
+             'meanAbsDiff': float(np.abs(diff).mean()),
+             'rmse': float(np.sqrt((diff ** 2).mean())),
+             'maxAbsDiff': float(np.abs(diff).max()),
+             'correlation': float(np.corrcoef(a[both], b[both])[0, 1])}
+
+    for key in stats:
+        print(f'{key:<12} {stats[key]:>12.4f}' if isinstance(stats[key], float) else f'{key:<12} {stats[key]:>12}')
+    return stats
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 3 and sys.argv[1] == 'compare':
+        compareRasters(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 2 and sys.argv[1] == 'cube':
+        print('Interpolating forecasts into a time cube...')
+        batchSplineCube(dsn, sys.argv[2])
+        print('done!')
+    else:
+        outDir = sys.argv[1] if len(sys.argv) > 1 else 'splines'
+        print('Interpolating forecasts...')
+        batchSpline(dsn, outDir)
+        print('done!')
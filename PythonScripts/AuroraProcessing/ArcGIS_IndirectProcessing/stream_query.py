@@ -0,0 +1,112 @@
+#==============================================================================
+# Aurora : stream_query.py
+# Author : Nathan Wisla
+# Purpose: To pull points out of auroraStrength by bounding box, forecast time
+#          window and forecast id without loading the whole result into memory
+# Date   : October 19, 2026
+#==============================================================================
+# Results come back through a server-side (named) cursor in fixed-size batches,
+# so only one batch is held in client memory at a time. The WHERE clause is
+# written to hit the indexes made by migrate_indexes.sql: the GiST index on
+# geom, the BRIN index on forecast and the btree index on id.
+
+import uuid
+import psycopg2
+
+BATCH_SIZE = 10000
+
+STREAM_QUERY = '''
+    SELECT s.gid, s.id, s.forecast, s.strength, ST_X(p.geom), ST_Y(p.geom)
+    FROM auroraStrength s
+    CROSS JOIN LATERAL ST_DumpPoints(s.geom::geometry) AS p
+    WHERE {where}
+    ORDER BY s.gid, p.path
+'''
+
+
+def buildWhere(bbox=None, start=None, end=None, ids=None):
+    '''buildWhere(bbox, start, end, ids) -> where clause, parameters
+            bbox      : (lonMin, latMin, lonMax, latMax) in degrees
+            start, end: forecast time window, start inclusive, end exclusive
+            ids       : iterable of forecast ids
+
+            Builds the parameterized filter for STREAM_QUERY. Any argument
+            left as None is not filtered on.
+    '''
+    where = ['TRUE']
+    params = {}
+
+    if bbox is not None:
+        params.update(zip(('xmin', 'ymin', 'xmax', 'ymax'), bbox))
+        envelope = 'ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 4326)'
+        # index-assisted row filter first, then the exact per-point test
+        where.append(f's.geom && {envelope}::geography')
+        where.append(f'p.geom && {envelope}')
+    if start is not None:
+        params['start'] = start
+        where.append('s.forecast >= %(start)s')
+    if end is not None:
+        params['end'] = end
+        where.append('s.forecast < %(end)s')
+    if ids is not None:
+        params['ids'] = list(ids)
+        where.append('s.id = ANY(%(ids)s)')
+
+    return ' AND '.join(where), params
+
+
+def streamBatches(dsn, bbox=None, start=None, end=None, ids=None, batchSize=BATCH_SIZE):
+    '''streamBatches(dsn, bbox, start, end, ids, batchSize) -> generator of lists
+            dsn      : psycopg2 connection string
+            batchSize: number of rows fetched from the server per batch
+
+            Yields lists of at most batchSize rows of
+                (gid, id, forecast, strength, lon, lat)
+            one row per point, in table order.
+    '''
+    where, params = buildWhere(bbox, start, end, ids)
+    connection = psycopg2.connect(dsn)
+    try:
+        # a named cursor keeps the result set on the server
+        with connection.cursor(name=f'aurora_stream_{uuid.uuid4().hex}') as c:
+            c.itersize = batchSize
+            c.execute(STREAM_QUERY.format(where=where), params)
+            while True:
+                rows = c.fetchmany(batchSize)
+                if not rows:
+                    break
+                yield rows
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def streamRows(dsn, bbox=None, start=None, end=None, ids=None, batchSize=BATCH_SIZE):
+    '''streamRows(dsn, bbox, start, end, ids, batchSize) -> generator of tuples
+            Same as streamBatches(), one row at a time.
+    '''
+    for rows in streamBatches(dsn, bbox, start, end, ids, batchSize):
+        yield from rows
+
+
+def forecastIds(dsn):
+    '''forecastIds(dsn) -> list of ints
+            Gets every forecast id in auroraStrength, in order.
+    '''
+    with psycopg2.connect(dsn) as connection:
+        with connection.cursor() as c:
+            c.execute('SELECT DISTINCT id FROM auroraStrength ORDER BY id')
+            return [row[0] for row in c.fetchall()]
+
+
+if __name__ == '__main__':
+    import sys
+
+    dsn = 'host=localhost dbname=aurora user=postgres password=cogs1234'
+    bbox = [float(v) for v in sys.argv[1:5]] if len(sys.argv) > 4 else None
+
+    count = 0
+    for rows in streamBatches(dsn, bbox=bbox):
+        count += len(rows)
+        print(f'{count} points streamed...')
+    print('done!')
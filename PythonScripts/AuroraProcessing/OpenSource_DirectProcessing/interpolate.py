@@ -14,6 +14,7 @@ from numpy import mgrid, transpose, array
 from json import dumps, loads
 from urllib import request
 from PIL import Image
+from timecube import TimeCube, gridFromOvation, CUBE_DIR # the shared history of every forecast
 import datetime
 import psycopg2
 
@@ -227,6 +228,10 @@ if not aurora.instanceExists():
         aurora.insertInto()
         aurora.deleteTIF()
         print('done!')
+        print('Appending forecast to the time cube...')
+        TimeCube(CUBE_DIR).append(aurora.sourceData['Forecast Time'],\
+                                  gridFromOvation(aurora.sourceData['coordinates']))
+        print('done!')
         aurora.deleteLastRow(maxRowCount)
         aurora.producePNG(PNG_DEST)
 
@@ -0,0 +1,266 @@
+#==============================================================================
+# Aurora : pointquery.py
+# Author : Nathan Wisla
+# Purpose: To read aurora strength back out of stored forecasts for many
+#          locations at once, as a points x times matrix
+# Date   : October 19, 2026
+#==============================================================================
+# Forecasts can come from the local time cube (timecube.py) or from the
+# aurorarasters table written by interpolate.py. Sampling is done with array
+# index arithmetic for every point at once, so a query for thousands of
+# observatories costs a handful of NumPy gathers per forecast.
+#
+# Run this file directly for a throughput benchmark:
+#     python pointquery.py [cube directory] [number of points]
+
+from collections import OrderedDict
+from time import perf_counter
+import numpy as np
+
+from timecube import TimeCube, toEpoch
+
+
+class CubeSource():
+
+    def __init__(self, cube):
+        '''CubeSource(cube)
+               cube: a TimeCube or the directory of one
+
+               Serves forecasts out of a local time cube.
+        '''
+        self.cube = cube if isinstance(cube, TimeCube) else TimeCube(cube)
+
+    def forecasts(self, start=None, end=None):
+        '''forecasts(start, end) -> times, keys
+               Gets the forecast times in the range and the keys to load them.
+        '''
+        self.cube.refresh()
+        t = self.cube.timeIndex(start, end)
+        return self.cube.times[t], list(range(t.start, t.stop))
+
+    def load(self, key):
+        '''load(key) -> grid, geotransform
+               Decodes one forecast into a float32 grid.
+        '''
+        return np.asarray(self.cube[key], dtype=np.float32), self.cube.geotransform
+
+
+class RasterTableSource():
+
+    def __init__(self, db_connectString, table='aurorarasters', column='rast'):
+        '''RasterTableSource(db_connectString, table, column)
+               Serves forecasts out of the PostGIS raster table written by
+               interpolate.py. Needs psycopg2 and GDAL.
+        '''
+        self.db_connectString = db_connectString
+        self.table = table
+        self.column = column
+
+    def forecasts(self, start=None, end=None):
+        '''forecasts(start, end) -> times, keys
+               Gets the forecast times in the range and the keys to load them.
+        '''
+        import psycopg2
+
+        start = None if start is None else str(np.datetime64(toEpoch(start), 's')) + '+00'
+        end = None if end is None else str(np.datetime64(toEpoch(end), 's')) + '+00'
+        with psycopg2.connect(self.db_connectString) as connection:
+            with connection.cursor() as c:
+                c.execute(f"""SELECT forecast_dt
+                              FROM {self.table}
+                              WHERE (%(start)s::timestamptz IS NULL OR forecast_dt >= %(start)s::timestamptz)
+                                AND (%(end)s::timestamptz IS NULL OR forecast_dt <= %(end)s::timestamptz)
+                              ORDER BY forecast_dt
+                           """, {'start': start, 'end': end})
+                keys = [row[0] for row in c.fetchall()]
+
+        times = np.array([toEpoch(key) for key in keys], dtype='datetime64[s]')
+        return times, keys
+
+    def load(self, key):
+        '''load(key) -> grid, geotransform
+               Fetches one raster as a GeoTIFF and decodes it with GDAL.
+        '''
+        import psycopg2
+        from osgeo import gdal
+
+        with psycopg2.connect(self.db_connectString) as connection:
+            with connection.cursor() as c:
+                c.execute(f"""SELECT ST_AsGDALRaster({self.column}, 'GTiff')
+                              FROM {self.table}
+                              WHERE forecast_dt = %s
+                           """, (key,))
+                tif = bytes(c.fetchone()[0])
+
+        name = f'/vsimem/aurora_{toEpoch(key)}.tif'
+        gdal.FileFromMemBuffer(name, tif)
+        try:
+            dataset = gdal.Open(name)
+            grid = dataset.GetRasterBand(1).ReadAsArray().astype(np.float32)
+            geotransform = dataset.GetGeoTransform()
+            dataset = None
+        finally:
+            gdal.Unlink(name)
+        return grid, geotransform
+
+
+def sampleIndex(shape, geotransform, lons, lats, method='bilinear'):
+    '''sampleIndex(shape, geotransform, lons, lats, method) -> rows, cols, weights, valid
+            shape       : (rows, cols) of the grid
+            geotransform: (x0, dx, 0, y0, 0, dy) of the grid
+            lons, lats  : arrays of point coordinates in degrees
+            method      : 'nearest' or 'bilinear'
+
+            Works out which cells every point reads and with what weight. Grids
+            spanning 360 degrees wrap around in longitude; points beyond the
+            top or bottom edge are flagged as not valid.
+    '''
+    nRows, nCols = shape
+    x0, dx, _, y0, _, dy = geotransform
+    lons = np.asarray(lons, dtype=float).ravel()
+    lats = np.asarray(lats, dtype=float).ravel()
+
+    # fractional position measured from the centre of the first cell
+    fc = (lons - x0) / dx - 0.5
+    fr = (lats - y0) / dy - 0.5
+    wraps = abs(abs(nCols * dx) - 360) < 1e-9
+
+    valid = (fr > -1) & (fr < nRows)
+    if not wraps:
+        valid &= (fc > -1) & (fc < nCols)
+
+    if method == 'nearest':
+        c = np.rint(fc).astype(np.intp)
+        r = np.clip(np.rint(fr).astype(np.intp), 0, nRows - 1)
+        c = c % nCols if wraps else np.clip(c, 0, nCols - 1)
+        return r[:, None], c[:, None], np.ones((len(lons), 1)), valid
+
+    if method != 'bilinear':
+        raise ValueError(f'unknown sampling method: {method}')
+
+    c0 = np.floor(fc).astype(np.intp)
+    r0 = np.floor(fr).astype(np.intp)
+    wc = fc - c0
+    wr = fr - r0
+
+    cols = np.stack([c0, c0 + 1, c0, c0 + 1], axis=1)
+    rows = np.stack([r0, r0, r0 + 1, r0 + 1], axis=1)
+    weights = np.stack([(1 - wc) * (1 - wr), wc * (1 - wr), (1 - wc) * wr, wc * wr], axis=1)
+
+    cols = cols % nCols if wraps else np.clip(cols, 0, nCols - 1)
+    rows = np.clip(rows, 0, nRows - 1)
+    return rows, cols, weights, valid
+
+
+class AuroraQuery():
+
+    def __init__(self, source, cacheSize=16):
+        '''AuroraQuery(source, cacheSize)
+               source   : a CubeSource, RasterTableSource, TimeCube or cube directory
+               cacheSize: how many decoded forecasts to keep in memory
+
+               Answers batch point / time series queries over stored forecasts.
+        '''
+        if not hasattr(source, 'forecasts'):
+            source = CubeSource(source)
+        self.source = source
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+        self.hits = self.misses = 0
+
+    def __repr__(self):
+        return f'AuroraQuery: {len(self.cache)}/{self.cacheSize} forecasts cached, '\
+               f'{self.hits} hits, {self.misses} misses'
+
+    def load(self, key):
+        '''load(key) -> grid, geotransform
+               Gets a decoded forecast, from the LRU cache when possible.
+        '''
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.misses += 1
+        forecast = self.source.load(key)
+        self.cache[key] = forecast
+        if len(self.cache) > self.cacheSize:
+            self.cache.popitem(last=False)
+        return forecast
+
+    def series(self, lons, lats, start=None, end=None, method='bilinear'):
+        '''series(lons, lats, start, end, method) -> times, strength
+               lons, lats: arrays of point coordinates in degrees
+               start, end: forecast time range (inclusive), None for open ended
+               method    : 'nearest' or 'bilinear'
+
+               Gets the forecast times and a (points, times) float array of
+               aurora strength. Points off the grid are NaN.
+        '''
+        times, keys = self.source.forecasts(start, end)
+        nPoints = np.asarray(lons).size
+        strength = np.full((nPoints, len(keys)), np.nan, dtype=np.float32)
+
+        # the index arithmetic only depends on the grid, so it is done once
+        # per distinct grid rather than once per forecast
+        plans = {}
+        for j, key in enumerate(keys):
+            grid, geotransform = self.load(key)
+            plan = (grid.shape, tuple(geotransform))
+            if plan not in plans:
+                plans[plan] = sampleIndex(grid.shape, geotransform, lons, lats, method)
+            rows, cols, weights, valid = plans[plan]
+
+            values = (grid[rows, cols] * weights).sum(axis=1)
+            strength[valid, j] = values[valid]
+
+        return times, strength
+
+
+def benchmark(query, nPoints=10000, repeat=3, method='bilinear', seed=0):
+    '''benchmark(query, nPoints, repeat, method, seed) -> points per second
+            Times series() for random points over every forecast in the source
+            and reports point-forecast samples per second. The first pass fills
+            the cache, the rest measure cached throughput.
+    '''
+    rng = np.random.default_rng(seed)
+    lons = rng.uniform(-180, 180, nPoints)
+    lats = rng.uniform(-90, 90, nPoints)
+
+    best = float('inf')
+    for i in range(repeat + 1):
+        t0 = perf_counter()
+        times, strength = query.series(lons, lats, method=method)
+        elapsed = perf_counter() - t0
+        if i:
+            best = min(best, elapsed)
+
+    rate = nPoints * len(times) / best
+    print(f'{method}: {nPoints} points x {len(times)} forecasts in {best:.4f} s '\
+          f'= {rate:,.0f} points/second')
+    return rate
+
+
+if __name__ == '__main__':
+    import datetime
+    import sys
+    import tempfile
+
+    nPoints = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    if len(sys.argv) > 1:
+        cube = TimeCube(sys.argv[1])
+    else:
+        # no cube given, so benchmark against 48 synthetic forecasts
+        cube = TimeCube(tempfile.mkdtemp(prefix='aurora_cube_'))
+        rng = np.random.default_rng(0)
+        t0 = datetime.datetime(2021, 5, 1, tzinfo=datetime.timezone.utc)
+        for i in range(48):
+            cube.append(t0 + datetime.timedelta(minutes=30 * i),
+                        rng.integers(0, 100, cube.shape, dtype=np.uint8))
+
+    print(cube)
+    query = AuroraQuery(cube, cacheSize=64)
+    for method in ('nearest', 'bilinear'):
+        benchmark(query, nPoints, method=method)
+    print(query)
@@ -0,0 +1,261 @@
+#==============================================================================
+# Aurora : timecube.py
+# Author : Nathan Wisla
+# Purpose: To keep every OVATION forecast in a local, append-only time cube
+#          (time x lat x lon, uint8) so historical queries can slice a
+#          memory-mapped array instead of decoding every database row
+# Date   : October 19, 2026
+#==============================================================================
+# A cube is a directory holding three files:
+#     cube.json  - grid shape, geotransform and the committed frame count
+#     frames.u8  - raw uint8 frames, one (rows x cols) grid after another
+#     times.i8   - raw int64 forecast times (UTC epoch seconds), one per frame
+#
+# cube.json is the commit record: frames and times are written and synced
+# first, and only then is cube.json atomically replaced with the new count.
+# A crash mid-append leaves trailing bytes that readers never see and that the
+# next append truncates away. Only one process should append at a time.
+
+import datetime
+import json
+import os
+import numpy as np
+
+# the one cube every ingest script appends to: AuroraProcessing/aurora_cube,
+# whichever script runs and wherever it is run from, or AURORA_CUBE if set
+CUBE_DIR = os.environ.get('AURORA_CUBE') or\
+           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'aurora_cube')
+
+META = 'cube.json'
+FRAMES = 'frames.u8'
+TIMES = 'times.i8'
+
+# OVATION grid: longitude 0..359, latitude -90..90, one degree cells centred
+# on whole degrees. Row 0 is the southernmost latitude, the same orientation
+# as interpolate.py. Geotransforms follow GDAL: (x0, dx, 0, y0, 0, dy) with
+# (x0, y0) the outer corner of the first cell.
+OVATION_SHAPE = (181, 360)
+OVATION_GEOTRANSFORM = (-0.5, 1, 0, -90.5, 0, 1)
+
+
+def gridFromOvation(coordinates, shape=OVATION_SHAPE, geotransform=OVATION_GEOTRANSFORM):
+    '''gridFromOvation(coordinates) -> numpy uint8 array (rows, cols)
+            coordinates: iterable of [lon, lat, strength] from the OVATION JSON
+
+            Places every OVATION point into its grid cell. Cells without a
+            point are left at 0.
+    '''
+    points = np.asarray(coordinates, dtype=float).reshape(-1, 3)
+    x0, dx, _, y0, _, dy = geotransform
+
+    cols = np.floor((points[:, 0] - x0) / dx).astype(np.intp) % shape[1]
+    rows = np.floor((points[:, 1] - y0) / dy).astype(np.intp)
+    inside = (rows >= 0) & (rows < shape[0])
+
+    grid = np.zeros(shape, dtype=np.uint8)
+    grid[rows[inside], cols[inside]] = np.clip(points[inside, 2], 0, 255)
+    return grid
+
+
+def toEpoch(dt):
+    '''toEpoch(dt) -> int
+            Converts a datetime (naive datetimes are taken as UTC), an ISO
+            date string, a numpy datetime64 or a number of seconds into UTC
+            epoch seconds.
+    '''
+    if isinstance(dt, str):
+        dt = np.datetime64(dt)
+    if isinstance(dt, datetime.datetime):
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=datetime.timezone.utc)
+        return int(dt.timestamp())
+    if isinstance(dt, np.datetime64):
+        return int(dt.astype('datetime64[s]').astype(np.int64))
+    return int(dt)
+
+
+class TimeCube():
+
+    def __init__(self, path, shape=OVATION_SHAPE, geotransform=OVATION_GEOTRANSFORM):
+        '''TimeCube(path, shape, geotransform)
+               path        : directory of the cube, created if it does not exist
+               shape       : (rows, cols) of every frame, only used for a new cube
+               geotransform: (x0, dx, 0, y0, 0, dy) of every frame, only
+                             used for a new cube
+
+               Opens (or creates) an append-only aurora time cube.
+        '''
+        self.path = path
+        metaPath = os.path.join(path, META)
+
+        if not os.path.exists(metaPath):
+            os.makedirs(path, exist_ok=True)
+            self.__writeMeta({'shape': list(shape),
+                              'geotransform': list(geotransform),
+                              'dtype': 'uint8',
+                              'count': 0})
+            for name in (FRAMES, TIMES):
+                open(os.path.join(path, name), 'ab').close()
+
+        self.refresh()
+
+    def __repr__(self):
+        if self.count:
+            first, last = self.times[[0, -1]]
+            return f'TimeCube({self.path}: {self.count} frames, {first} --> {last})'
+        return f'TimeCube({self.path}: empty)'
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, key):
+        return self.frames[key]
+
+    def __writeMeta(self, meta):
+        # write, sync, then atomically swap: this is the commit point of an append
+        metaPath = os.path.join(self.path, META)
+        tempPath = metaPath + '.tmp'
+        with open(tempPath, 'w') as file:
+            json.dump(meta, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tempPath, metaPath)
+
+        if hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(self.path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def refresh(self):
+        '''refresh() -> void
+               Re-reads cube.json and re-maps the frames, picking up any frames
+               committed by another process since this cube was opened.
+        '''
+        with open(os.path.join(self.path, META)) as file:
+            self.meta = json.load(file)
+
+        self.shape = tuple(self.meta['shape'])
+        self.geotransform = tuple(self.meta['geotransform'])
+        self.count = self.meta['count']
+
+        if self.count:
+            self.frames = np.memmap(os.path.join(self.path, FRAMES), dtype=np.uint8,
+                                    mode='r', shape=(self.count, *self.shape))
+            self.epochs = np.memmap(os.path.join(self.path, TIMES), dtype=np.int64,
+                                    mode='r', shape=(self.count,))
+        else:
+            self.frames = np.zeros((0, *self.shape), dtype=np.uint8)
+            self.epochs = np.zeros(0, dtype=np.int64)
+
+    @property
+    def times(self):
+        '''times -> numpy datetime64[s] array of every committed forecast time'''
+        return self.epochs.astype('datetime64[s]')
+
+    def append(self, forecastTime, grid):
+        '''append(forecastTime, grid) -> bool
+               forecastTime: datetime of the forecast
+               grid        : (rows, cols) array of aurora strength
+
+               Appends one frame to the cube. Forecasts must arrive in time
+               order; a frame that is not newer than the last one is skipped
+               and False is returned.
+        '''
+        grid = np.ascontiguousarray(grid, dtype=np.uint8)
+        if grid.shape != self.shape:
+            raise ValueError(f'frame shape {grid.shape} does not match cube shape {self.shape}')
+
+        epoch = toEpoch(forecastTime)
+        self.refresh()
+        if self.count and epoch <= self.epochs[-1]:
+            return False
+
+        # drop the mapping before touching the files underneath it
+        self.frames = self.epochs = None
+
+        frameSize = grid.nbytes
+        for name, data, size in ((FRAMES, grid.tobytes(), frameSize),
+                                 (TIMES, np.int64(epoch).tobytes(), 8)):
+            with open(os.path.join(self.path, name), 'r+b') as file:
+                # cut off anything left behind by an interrupted append
+                file.truncate(self.count * size)
+                file.seek(self.count * size)
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+
+        self.meta['count'] = self.count + 1
+        self.__writeMeta(self.meta)
+        self.refresh()
+        return True
+
+    def timeIndex(self, start=None, end=None):
+        '''timeIndex(start, end) -> slice
+               Gets the frame slice covering start <= forecast time <= end.
+               Either end may be None to leave that side open.
+        '''
+        i0 = 0 if start is None else int(np.searchsorted(self.epochs, toEpoch(start), 'left'))
+        i1 = self.count if end is None else int(np.searchsorted(self.epochs, toEpoch(end), 'right'))
+        return slice(i0, max(i0, i1))
+
+    def bboxIndex(self, bbox):
+        '''bboxIndex(bbox) -> rows slice, list of column slices
+               bbox: (lonMin, latMin, lonMax, latMax) in degrees
+
+               Gets the grid rows and columns covering the bounding box.
+               Longitudes are wrapped onto the cube's 360 degree grid, so a box
+               that crosses the grid's seam returns two column slices.
+        '''
+        lonMin, latMin, lonMax, latMax = bbox
+        x0, dx, _, y0, _, dy = self.geotransform
+        rows, cols = self.shape
+
+        r0 = max(0, int(np.floor((latMin - y0) / dy)))
+        r1 = min(rows, int(np.floor((latMax - y0) / dy)) + 1)
+
+        if lonMax - lonMin >= cols * dx:
+            return slice(r0, max(r0, r1)), [slice(0, cols)]
+
+        c0 = int(np.floor(((lonMin - x0) % (cols * dx)) / dx)) % cols
+        c1 = int(np.floor(((lonMax - x0) % (cols * dx)) / dx)) % cols
+        if c0 <= c1:
+            colSlices = [slice(c0, c1 + 1)]
+        else:
+            colSlices = [slice(c0, cols), slice(0, c1 + 1)]
+        return slice(r0, max(r0, r1)), colSlices
+
+    def select(self, start=None, end=None, bbox=None):
+        '''select(start, end, bbox) -> times, frames
+               start, end: forecast time range (inclusive), None for open ended
+               bbox      : optional (lonMin, latMin, lonMax, latMax) in degrees
+
+               Gets the forecast times and a (time, rows, cols) array of
+               strength. The array is a read-only view of the memory map, not a
+               copy, unless the bbox crosses the longitude seam of the grid.
+        '''
+        t = self.timeIndex(start, end)
+        times = self.times[t]
+        if bbox is None:
+            return times, self.frames[t]
+
+        rows, colSlices = self.bboxIndex(bbox)
+        if len(colSlices) == 1:
+            return times, self.frames[t, rows, colSlices[0]]
+        return times, np.concatenate([self.frames[t, rows, c] for c in colSlices], axis=2)
+
+    def coordinates(self, bbox=None):
+        '''coordinates(bbox) -> lons, lats
+               Gets the cell centre longitudes and latitudes matching the columns
+               and rows returned by select() for the same bbox.
+        '''
+        x0, dx, _, y0, _, dy = self.geotransform
+        rows, cols = self.shape
+        lons = x0 + dx * (np.arange(cols) + 0.5)
+        lats = y0 + dy * (np.arange(rows) + 0.5)
+        if bbox is None:
+            return lons, lats
+
+        rowSlice, colSlices = self.bboxIndex(bbox)
+        return np.concatenate([lons[c] for c in colSlices]), lats[rowSlice]
@@ -5,68 +5,90 @@
 # Date: February 10, 2021
 
 
-from arcpy import *
-import math as m
-import turtle as t
-
+import numpy as np
+from featureio import openWriter, readRows
+from hashjoin import buildJoinIndex, joinColumns
+from sectors import sectorVertices, assignPoints
 
+# ws can be any ArcGIS workspace, or a .gpkg file to run without ArcGIS
+# (with antennaTable as a .csv file or a GeoPackage table)
 ws = r''
-env.overwriteOutput = True
-env.workspace = ws
+
+try:
+    import arcpy
+    arcpy.env.overwriteOutput = True
+    arcpy.env.workspace = ws
+except ImportError:
+    arcpy = None
+
+# Sector size: 0.003 'degrees' draws the original arcs, which shrink east-west
+# with latitude. Use 'metres' for sectors with a true ground radius.
+RADIUS = 0.003
+RADIUS_UNITS = 'degrees'
 
 # Get the vertices of an arc
 def arc(x0, y0, a=0):
     # Given a position (x,y), draw a circle slice in direction a
     # This rotation is a NEGATIVELY ORIENTED, AZIMUTHAL rotation
     # (clockwise, from the y-axis)
-
-    #in decimal degrees
-    r = 0.003
-    
-    MAX_ANGLE = 20
-    offset = 90 - MAX_ANGLE
-    MAX_ANGLE = (MAX_ANGLE * 2) + 1
-    
-    aList = []
-    for theta in range(0, MAX_ANGLE, 4):
-        y = r*m.sin( (theta + offset - a) * m.pi/180)
-        x = r*m.cos( (theta + offset - a) * m.pi/180)
-
-        aList.append((x + x0, y + y0))
-
-    return aList
+    # For many antennas at once, call sectorVertices() directly.
+    return [tuple(xy) for xy in sectorVertices(x0, y0, a, RADIUS, RADIUS_UNITS)[0, 1:]]
 
 # Select the tables
 antennaTable = ''
 joinTable = ''
 
-# Create a new feature class representing orientation based on antennaTable
-antennaPolys = management.CreateFeatureclass(
-            ws, 'antennaPolys','POLYGON',spatial_reference=4326)
-antennaPolys = antennaPolys[0]
+# How many KPI measurements of one CELL become one: 'latest', 'first',
+# 'mean', 'min', 'max' or 'count' of RSSI (see hashjoin.py)
+JOIN_REDUCTION = 'latest'
 
+# The fields SITE, CELL, LATITUDE, LONGITUDE, ORIENTATION
+FIELDS = [['SITE','TEXT'],['CELL','TEXT'],['LATITUDE','DOUBLE'],['LONGITUDE','DOUBLE'],['ORIENTATION','DOUBLE']]
+# plus the KPI fields joined on CELL, leave out redundant tags
+JOIN_FIELDS = [['Date','DATE'],['RSSI','DOUBLE']]
 
-# Insert the fields SITE, CELL, LATITUDE, LONGITUDE, ORIENTATION
-management.AddField(antennaPolys, 'SITE', 'TEXT')
-management.AddField(antennaPolys, 'CELL', 'TEXT')
-management.AddField(antennaPolys, 'LATITUDE', 'DOUBLE')
-management.AddField(antennaPolys, 'LONGITUDE', 'DOUBLE')
-management.AddField(antennaPolys, 'ORIENTATION', 'DOUBLE')
+# Optional drive-test measurements with the fields LONGITUDE, LATITUDE, RSSI.
+# Each sector gets the number of measurements inside it and their mean RSSI.
+measurementTable = ''
+POINT_FIELDS = [['POINTS','LONG'],['POINT_RSSI','DOUBLE']]
+
+# Optional offline gazetteer directory (see gazetteer.py). Each sector gets
+# the nearest populated place to its antenna and the distance to it.
+gazetteerDir = ''
+PLACE_FIELDS = [['PLACE','TEXT'],['PLACE_KM','DOUBLE']]
 
 print('baking...')
-with da.InsertCursor(antennaPolys,['SHAPE@','SITE','CELL','LATITUDE','LONGITUDE','ORIENTATION']) as ic:
-    with da.SearchCursor(antennaTable, ['SITE','CELL','LATITUDE','LONGITUDE','ORIENTATION']) as sc:
-        for row in sc:
-            y,x = row[2],row[3]
-            angle = row[4]
-            
-            points = arc(x,y,angle)
-            geom = [(x,y),*(point for point in points)]
-
-            
-            ic.insertRow([geom,row[0],row[1],row[2],row[3],row[4]])
-        
-# join the KPI field on the cellular device id, leave out redundant tags
-management.JoinField(antennaPolys,'CELL',joinTable,'CELL',['Date','RSSI'])
+rows = list(readRows(antennaTable, [field[0] for field in FIELDS]))
+kpi = buildJoinIndex(readRows(joinTable, ['CELL','Date','RSSI']), JOIN_REDUCTION)
+site, cell = [row[0] for row in rows], [row[1] for row in rows]
+lat, lon, angle = np.array([row[2:5] for row in rows], dtype=float).reshape(-1, 3).T
+
+# every sector in one call: the antenna position followed by its arc
+sectors = sectorVertices(lon, lat, angle, RADIUS, RADIUS_UNITS)
+
+# join the KPI fields on the cellular device id as the sectors are written,
+# so the output is only written once
+date, rssi = joinColumns(cell, kpi)
+fields, columns = FIELDS + JOIN_FIELDS, [site, cell, lat.tolist(), lon.tolist(), angle.tolist(), date, rssi]
+
+# count the measurements in each sector by angle and distance, no spatial join
+if measurementTable:
+    px, py, value = np.array(list(readRows(measurementTable, ['LONGITUDE','LATITUDE','RSSI'])),\
+                             dtype=float).reshape(-1, 3).T
+    stats = assignPoints(px, py, value, lon, lat, angle, RADIUS, RADIUS_UNITS)
+    meanRSSI = [None if np.isnan(v) else v for v in stats['mean'].tolist()]
+    fields, columns = fields + POINT_FIELDS, columns + [stats['count'].tolist(), meanRSSI]
+
+# label the antennas with their nearest place, all in one KD-tree query
+if gazetteerDir:
+    from reversegeocode import ReverseGeocoder
+    geocoder = ReverseGeocoder(gazetteerDir)
+    nearest, metres = geocoder.nearest(lat, lon)
+    fields, columns = fields + PLACE_FIELDS, columns + [geocoder.names(nearest), (metres / 1000).tolist()]
+
+# Create a new feature class representing orientation based on antennaTable
+with openWriter(ws, 'antennaPolys', 'POLYGON', fields, 4326) as writer:
+    writer.insertArrays(sectors, *columns)
+antennaPolys = writer.path
 
 print('ding!')
@@ -24,6 +24,15 @@ if __name__ == "__main__":
     print (f'Number of arguments: {len(sys.argv)}')     
     print (f'The arguments are: {str(sys.argv)}')         
 
+    # Batch mode: python GetPlaceLatLong.py --batch places.csv [results.csv]
+    # resolves a whole CSV of town, country rows at once (see geocode.py)
+    if len(sys.argv) > 2 and sys.argv[1] == '--batch':
+        from geocode import geocodeFile
+        results = geocodeFile(*sys.argv[2:4])
+        print (f'{len(results)} places written')
+        print ('all done')
+        sys.exit()
+
     # Script arguments
     if len(sys.argv) > 2:
         strTown = sys.argv[1]
@@ -44,29 +53,39 @@ if __name__ == "__main__":
     try:
 # determine Lat & Long for a community name:
 
-        # variable for unique URL to this town:
-        strFindLatLongURL = f'https://www.travelmath.com/cities/{strTown},+{strCountryName}'
-        print ("lat-long URL is: ", strFindLatLongURL)
+        # try the offline gazetteer first (built by gazetteer.py), which
+        # needs no network; scrape the web only for places it does not know
+        from gazetteer import openGazetteer
+        gazetteer = openGazetteer()
+        found = gazetteer.forward(strTown, strCountryName) if gazetteer else None
+
+        if found is not None:
+            print ('Found in the offline gazetteer')
+            strLat, strLong = str(found[0]), str(found[1])
+        else:
+            # variable for unique URL to this town:
+            strFindLatLongURL = f'https://www.travelmath.com/cities/{strTown},+{strCountryName}'
+            print ("lat-long URL is: ", strFindLatLongURL)
 
-        # open and read URL:
-        aResp = request.urlopen(strFindLatLongURL)
+            # open and read URL:
+            aResp = request.urlopen(strFindLatLongURL)
 
-        web_pg = str(aResp.read()) #force a str type, is a byte type
+            web_pg = str(aResp.read()) #force a str type, is a byte type
         
-        # find lat and long based on unique pattern within HTML:
-        pattern = '<strong>[Latong]*itude:</strong> (-*\d*\.\d*)</p>' # find elements in the () parenthesis with the format xxxxxx.xxxxxx
+            # find lat and long based on unique pattern within HTML:
+            pattern = '<strong>[Latong]*itude:</strong> (-*\d*\.\d*)</p>' # find elements in the () parenthesis with the format xxxxxx.xxxxxx
 
-        # actually search the webpage:
-        latLong = re.findall(pattern,web_pg) # outputs a list when it finds the regex
+            # actually search the webpage:
+            latLong = re.findall(pattern,web_pg) # outputs a list when it finds the regex
         
-        if len(latLong) > 1:
-            strLat = latLong[0] # found it within first element of group!
-            strLong = latLong[1]
-            #
-        else: # no community found, so provide bogus value ... used to catch problems
-            print ('No community found')
-            strLat = 'blank'
-            strLong = strLat
+            if len(latLong) > 1:
+                strLat = latLong[0] # found it within first element of group!
+                strLong = latLong[1]
+                #
+            else: # no community found, so provide bogus value ... used to catch problems
+                print ('No community found')
+                strLat = 'blank'
+                strLong = strLat
         print (f'Latitude & longitude are: {strLat}, {strLong}')
     # done with "figure out lat & long from town name"
     except Exception as e:
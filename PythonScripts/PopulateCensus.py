@@ -10,62 +10,47 @@
 # SCROLL DOWN TO ENTER THE FIELDS YOU WISH TO POPULATE
 
 import arcpy
+from featureio import openWriter
+from census import fieldPlan, deriveTable
+from nearest import NearestFacilities
+from clip import ClipIndex, clipTable
 
 # use cursors to create relative tables for selected fields in
 # a dissemination area dataset
 
-ws = 'ENTER WORKSPACE HERE'
+ws = 'ENTER WORKSPACE HERE' # results can also go to a .gpkg file, set OUT_WS below
 arcpy.env.workspace = ws
 arcpy.env.overwriteOutput = True
 spatialRef = arcpy.Describe('dissemination_areas').spatialReference
 
-EXCL_QUERY = '''HH > 0 AND ECYBASHPOP > 0 AND ECYHOMEPOP > 0''' # change this to omit denominators for relative variables that may be zero
-clipFile = 'ENTER CLIPPING POLYGON NAME HERE'
-
-
-def GetCrits(inDict):
-
-    masterList = []
-    indices = []
-    loc = 0
-    for key in inDict:
-        fieldVar = inDict[key]['VARS']
-        if fieldVar != None:
-            if len(fieldVar) > 1:
-                indices.append(loc)
-            loc += len(fieldVar)
-            
-            for item in fieldVar:
-                masterList.append(item)
-                
-    indices.append(loc)
-    
-    return masterList, indices
+EXCL_QUERY = None # optional filter; ratios with a zero denominator are written as null, so none is needed
+clipFile = 'ENTER CLIPPING POLYGON NAME HERE' # in the same coordinate system as the dissemination areas
+OUT_WS = ws # workspace (or .gpkg file) that DA_relative is written into
+BLOCK_SIZE = 10000 # rows read, derived and written at a time
+WORKERS = 4 # blocks derived at once
+FACILITIES = 'shopping_centres' # facility points for the NEAR_ fields, None to skip them
+NEAR_K = 1 # nearest facilities reported per dissemination area
+NEAR_BANDS = (1000, 5000, 10000) # count the facilities within these distances (map units)
 
 
 def cr_fc(name, pairs):
-    disArea = arcpy.management.CreateFeatureclass(
-    ws, name,'POLYGON',spatial_reference=spatialRef)
-
-    disArea = disArea[0]
-    # populate the feature class created
-    for pair in pairs:
-        arcpy.management.AddField(disArea,pair[0],pair[1])
-    return disArea
-
-       
-def relativize(aList):
-    return sum(aList[:-1])/aList[-1]
+    # create the feature class with its fields and return a writer for it
+    return openWriter(OUT_WS, name, 'POLYGON', pairs, spatialRef)
 
 
 ## 0. DO NOT CHANGE THE FIRST ENTRY!
 ## 1. ALL DATA ENTERED NEEDS TO FOLLOW THE DICTIONARY FORMAT AS FOLLOWS:
 ##         {<field>: {'TYPE':'TEXT'|'DOUBLE'|'LONG'|etc., 'VARS':[]}}
+##    or, for a derived field,
+##         {<field>: {'TYPE':'DOUBLE', 'EXPR':'<expression>'}}
 ## 2. Add fields that do not need to be relativized after the first entry (place between the separators)
 ## 3. All variables 'VAR' need to be lists, even if there is only one entry
 ## 4. All fields that need to be relativized go after the last relativized variable
 ##      a) The denominator is the last item in each list, and you can sum numerators by
 ##         putting extra entries before the denominator!
+##      b) Or write the field as an expression of census fields with + - * / ** and
+##         log, log10, log1p, sqrt, exp, abs, min, max, e.g. '(HSCF001B + HSCM001B) / HH'.
+##         Dividing by zero gives null (see expressions.py)
 ## MUST BE RUN IN PYTHON 3.7 OR NEWER, ELSE THE DICTIONARY WILL BECOME UNORDERED
 FIELD_DICT = {
     'SHAPE@'                        :{'TYPE': None   ,'VARS':['SHAPE@']}                   ,\
@@ -88,7 +73,7 @@ FIELD_DICT = {
     'multilingual_POP'              :{'TYPE':'DOUBLE','VARS':['ECYMOTMULT','ECYBASHPOP']}   ,\
     'rent_EXP'                      :{'TYPE':'DOUBLE','VARS':['HSSH004','HH']}              ,\
     'camper_EXP'                    :{'TYPE':'DOUBLE','VARS':['HSRV001E','HH']}             ,\
-    'sportswear_EXP'                :{'TYPE':'DOUBLE','VARS':['HSCF001B','HSCM001B','HH']}  ,\
+    'sportswear_EXP'                :{'TYPE':'DOUBLE','EXPR':'(HSCF001B + HSCM001B) / HH'}  ,\
     'cameras_EXP'                   :{'TYPE':'DOUBLE','VARS':['HSRE017','HH']}              ,\
     'airportParking_EXP'            :{'TYPE':'DOUBLE','VARS':['HSRV016','HH']}              ,\
     'publicTransit_EXP'             :{'TYPE':'DOUBLE','VARS':['ECYTRAPUBL','ECYBASHHD']}    ,\
@@ -102,53 +87,55 @@ FIELD_DICT = {
     'childCare_EXP'                 :{'TYPE':'DOUBLE','VARS':['HSCC002','HH']}
       }
 
-print('gathering critical indices and making lists...')
+print('compiling the derived fields and making lists...')
+# the copied fields, and one plan computing every derived field (cached, so
+# a repeated run skips the parsing)
+COPIED, plan = fieldPlan(FIELD_DICT)
 # Create a list of field definitions for the new attribute table
-FIELD_PAIRS = [[field,FIELD_DICT[field]['TYPE']] for field in FIELD_DICT if FIELD_DICT[field]['TYPE'] != None]
-# Create the fields and indices that will be going through the search cursor
-SEARCH_FIELDS, indices = GetCrits(FIELD_DICT)
-# Create fields for the new attribute table
-NEW_FIELDS = [field for field in FIELD_DICT]
-print('done!')
+FIELD_PAIRS = [[field,FIELD_DICT[field]['TYPE']] for field in COPIED + plan.fields if FIELD_DICT[field]['TYPE'] != None]
+# Create the fields that will be going through the search cursor, each census field once
+SEARCH_FIELDS = [FIELD_DICT[field]['VARS'][0] for field in COPIED] + plan.sources
+print(f'done! {plan}')
+
+print('indexing near features...')
+near = NearestFacilities.fromTable(FACILITIES,NEAR_K,NEAR_BANDS) if FACILITIES else None
+NEAR_PAIRS = near.fields if near else []
+print(f'done! {near}')
 
 
 print(f'creating a new feature class with {len(FIELD_DICT)} variable entries...')
-disArea = cr_fc('DA_relative',FIELD_PAIRS)
-#disArea = 'DA_relative'
+writer = cr_fc('DA_relative',FIELD_PAIRS + NEAR_PAIRS)
 print('feature class created!')
 
 
 
 
 print('baking...')
-with arcpy.da.SearchCursor('dissemination_areas',SEARCH_FIELDS,EXCL_QUERY)\
-                           as sc:
-    with arcpy.da.InsertCursor(disArea,\
-                               NEW_FIELDS)\
-                               as ic:
-        
-        for row in sc:
-            calculated = []
-            
-
-            # read the first index and the second index from the
-            # indices list, which will omit the first entries
-            for j in range(len(indices) - 1):
-                i0 = indices[j]
-                i = indices[j+1]
-
-                calculated.append(relativize(row[i0:i]))
-
-            ic.insertRow([*(item for item in row[0:4]),*(item for item in calculated)])
+# read, derive and write BLOCK_SIZE dissemination areas at a time, all
+# three at once (see census.py); each block's derived fields are computed
+# over whole columns by the plan, and the near features are found for the
+# same block, so the feature class is only written once
+with writer:
+    deriveTable('dissemination_areas',SEARCH_FIELDS,len(COPIED),plan,writer,EXCL_QUERY,BLOCK_SIZE,WORKERS,near=near)
+
+disArea = writer.path
 
 print('cooling...')
-print('adding near features...')
-arcpy.analysis.Near(disArea, 'shopping_centres')
 print('clipping features...')
-try:
-    arcpy.analysis.Clip(disArea,clipFile,f'DA_{clipFile}')
-except:
+if not arcpy.Exists(clipFile):
     print('no clipping feature found! Leaving the entire dissemination area shapefile')
+else:
+    try:
+        # spatial index over the clip polygons: only the dissemination areas
+        # on a clip boundary are intersected (see clip.py)
+        clipIndex = ClipIndex.fromTable(clipFile)
+    except ImportError:
+        print('shapely not found! Clipping with arcpy instead')
+        arcpy.analysis.Clip(disArea,clipFile,f'DA_{clipFile}')
+    else:
+        OUT_PAIRS = FIELD_PAIRS + NEAR_PAIRS
+        with cr_fc(f'DA_{clipFile}',OUT_PAIRS) as clipWriter:
+            clipTable(disArea,[pair[0] for pair in OUT_PAIRS],clipIndex,clipWriter,blockSize=BLOCK_SIZE,workers=WORKERS)
                 
 print('ding!')        
 
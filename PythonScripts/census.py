@@ -0,0 +1,146 @@
+#===================================================================
+# Name    : census.py
+# Purpose : to compute the derived census fields column by column
+#           with NumPy instead of row by row, for PopulateCensus.py
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# The derived fields of FIELD_DICT are compiled into one plan (see
+# expressions.py), their source fields are read into one 2D float array
+# (a row per dissemination area, a column per source field) and every
+# derived field is computed at once over whole columns. A ratio whose
+# denominator is zero (or null) is written as null, so no dissemination
+# area has to be filtered out before the division.
+#
+# deriveTable() does this block by block through pipeline.py, so a
+# national layer is read, computed and written at the same time in
+# constant memory. The nearest facilities (see nearest.py) can be found
+# in the same pass, from each feature's centroid.
+
+from functools import partial
+from itertools import islice
+import numpy as np
+from expressions import PLAN_CACHE, compilePlan
+from featureio import readRows
+from pipeline import BLOCK_SIZE, WORKERS, runPipeline
+
+XY_FIELDS = ['SHAPE@X', 'SHAPE@Y']   # centroid, read after the plan's sources
+
+
+def varsExpression(variables):
+    # the old VARS form: the numerators summed over the last entry
+    numerators = ' + '.join(variables[:-1])
+    return f'({numerators}) / {variables[-1]}'
+
+
+def fieldPlan(fieldDict, cacheDir=PLAN_CACHE):
+    '''fieldPlan(fieldDict, cacheDir) -> copied fields, Plan
+            fieldDict: FIELD_DICT of PopulateCensus.py
+            cacheDir : where compiled plans are cached, None to not cache
+
+            Splits FIELD_DICT into the fields copied as they are (a single
+            VARS entry) and the derived fields, compiled into one plan. A
+            derived field is an 'EXPR' expression, or VARS of numerators
+            followed by a denominator.
+    '''
+    copied, expressions = [], []
+    for field, spec in fieldDict.items():
+        if spec.get('EXPR'):
+            expressions.append((field, spec['EXPR']))
+        elif spec.get('VARS') and len(spec['VARS']) > 1:
+            expressions.append((field, varsExpression(spec['VARS'])))
+        elif spec.get('VARS'):
+            copied.append(field)
+    return copied, compilePlan(expressions, cacheDir)
+
+
+def splitRows(rows, first, nFields):
+    # the copied fields stay rows, the source fields become floats
+    kept = [row[:first] for row in rows]
+    values = np.array([row[first:] for row in rows], dtype=float).reshape(len(rows), nFields - first)
+    return kept, values
+
+
+def readBlocks(table, fields, first, where=None, blockSize=BLOCK_SIZE):
+    '''readBlocks(table, fields, first, where, blockSize) -> generator of (kept rows, values)
+            Reads the table blockSize rows at a time, split as in readColumns().
+    '''
+    rows = readRows(table, fields, where)
+    while True:
+        block = list(islice(rows, blockSize))
+        if not block:
+            return
+        yield splitRows(block, first, len(fields))
+
+
+def readColumns(table, fields, first, where=None):
+    '''readColumns(table, fields, first, where) -> kept rows, values
+            table : dissemination area feature class (or any readRows() source)
+            fields: SEARCH_FIELDS, the copied fields then the plan's sources
+            first : number of copied fields
+            where : optional SQL filter
+
+            Reads the whole table in one pass. The copied fields (geometry,
+            text, ...) come back as a list of row tuples; the source fields
+            come back as a float array, with nulls as NaN.
+    '''
+    return splitRows(list(readRows(table, fields, where)), first, len(fields))
+
+
+def nullable(ratios):
+    # NaN becomes None, so it is written as a null
+    ratios = np.asarray(ratios, dtype=object)
+    ratios[np.isnan(ratios.astype(float))] = None
+    return ratios.tolist()
+
+
+def writeColumns(writer, kept, ratios):
+    '''writeColumns(writer, kept, ratios) -> void
+            writer: open FeatureWriter from featureio.py
+            kept  : rows of the fields that are copied as they are
+            ratios: (rows, fields) array from Plan.evaluate()
+
+            Writes a block (or the whole table) in one bulk insert.
+    '''
+    writer.insertRows([*row, *calculated] for row, calculated in zip(kept, nullable(ratios)))
+
+
+class BlockCompute():
+    # the compute stage of deriveTable(): the plan's fields, then the
+    # nearest facility fields from the last two columns (the centroid)
+
+    def __init__(self, plan, near=None):
+        self.plan = plan
+        self.near = near
+
+    def __call__(self, values):
+        derived = self.plan.evaluate(values[:, :len(self.plan.sources)])
+        if self.near is None:
+            return derived
+        return np.hstack([derived, self.near.query(values[:, -2], values[:, -1])])
+
+
+def deriveTable(table, fields, first, plan, writer, where=None, blockSize=BLOCK_SIZE,\
+                workers=WORKERS, processes=False, near=None):
+    '''deriveTable(table, fields, first, plan, writer, where, blockSize, workers, processes, near) -> stage stats
+            table    : dissemination area feature class
+            fields   : SEARCH_FIELDS, the copied fields then plan.sources
+            first    : number of copied fields
+            plan     : Plan of the derived fields, from fieldPlan()
+            writer   : open FeatureWriter, with near.fields after the
+                       derived fields when near is given
+            blockSize: rows read, computed and written at a time
+            workers  : blocks computed at once
+            processes: compute in processes instead of threads
+            near     : optional NearestFacilities, queried from each
+                       feature's centroid
+
+            Reads, derives and writes the table block by block with the
+            three stages overlapping, printing each stage's throughput.
+    '''
+    if near is not None:
+        fields = fields + XY_FIELDS
+    return runPipeline(readBlocks(table, fields, first, where, blockSize),\
+                       BlockCompute(plan, near),\
+                       partial(writeColumns, writer),\
+                       workers, processes=processes)
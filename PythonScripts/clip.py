@@ -0,0 +1,166 @@
+#===================================================================
+# Name    : clip.py
+# Purpose : to clip features to a set of clip polygons with a spatial
+#           index instead of arcpy.analysis.Clip, doing exact geometry
+#           work only where a feature crosses a clip boundary
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# The clip polygons go into an STR-tree. Every feature then takes one
+# of four paths:
+#     rejected  - its bounding box meets no clip polygon's box: dropped
+#     contained - it lies wholly inside a clip polygon: written as it
+#                 is, its geometry untouched
+#     outside   - its box meets a clip polygon but the feature does not
+#     clipped   - it crosses a clip boundary: written as its exact
+#                 intersection with the clip polygons
+# The tests and intersections run on whole blocks of features with
+# shapely 2, which releases the GIL, so the blocks are clipped in
+# parallel threads through pipeline.py.
+#
+# Needs shapely 2 (pip install shapely); without it ClipIndex raises
+# an ImportError and callers can fall back to arcpy.
+
+from collections import Counter
+from functools import partial
+import numpy as np
+from featureio import readRows
+from pipeline import BLOCK_SIZE, WORKERS, runPipeline
+
+try:
+    import shapely
+except ImportError:
+    shapely = None
+
+PATHS = ('rejected', 'contained', 'outside', 'clipped')
+REJECTED, CONTAINED, OUTSIDE, CLIPPED = range(4)
+POLYGONAL = (3, 6)   # shapely type ids of Polygon and MultiPolygon
+
+
+def toWKB(geometry):
+    # arcpy geometry or WKB bytes (e.g. from a GeoPackage) to WKB bytes
+    return bytes(geometry.WKB) if hasattr(geometry, 'WKB') else bytes(geometry)
+
+
+def polygonal(geometry):
+    # the polygon parts of an intersection, which can also hold the lines
+    # and points where a feature only touches a clip boundary
+    if shapely.get_type_id(geometry) in POLYGONAL:
+        return geometry
+    parts = shapely.get_parts(geometry)
+    parts = parts[np.isin(shapely.get_type_id(parts), POLYGONAL)]
+    return shapely.multipolygons(shapely.get_parts(parts)) if len(parts) else None
+
+
+class ClipIndex():
+
+    def __init__(self, clipGeometries):
+        '''ClipIndex(clipGeometries)
+               clipGeometries: clip polygons, as arcpy geometries or WKB
+        '''
+        if shapely is None:
+            raise ImportError('clip.py needs shapely 2: pip install shapely')
+        self.polygons = shapely.from_wkb([toWKB(g) for g in clipGeometries])
+        shapely.prepare(self.polygons)
+        self.tree = shapely.STRtree(self.polygons)
+
+    @classmethod
+    def fromTable(cls, table, where=None):
+        return cls([row[0] for row in readRows(table, ['SHAPE@'], where)])
+
+    def __repr__(self):
+        return f'ClipIndex({len(self.polygons)} clip polygons)'
+
+    def clip(self, wkbs):
+        '''clip(wkbs) -> paths, geometries
+               wkbs: list of feature geometries as WKB
+
+               Gets the path of every feature (REJECTED, CONTAINED, OUTSIDE
+               or CLIPPED) and, for the clipped ones, the WKB of the clipped
+               geometry (None for the others).
+        '''
+        n = len(wkbs)
+        paths = np.full(n, REJECTED)
+        clipped = [None] * n
+        if not n:
+            return paths, clipped
+        features = shapely.from_wkb(wkbs)
+
+        # bounding box candidates: (feature, clip polygon) pairs
+        feature, polygon = self.tree.query(features)
+        paths[feature] = OUTSIDE
+
+        # wholly inside a prepared clip polygon: keep as is
+        inside = shapely.contains(self.polygons[polygon], features[feature])
+        paths[feature[inside]] = CONTAINED
+
+        # the rest cross a boundary (or miss): exact intersection
+        crossing = paths[feature] != CONTAINED
+        feature, polygon = feature[crossing], polygon[crossing]
+        if not len(feature):
+            return paths, clipped
+        touches = shapely.intersects(self.polygons[polygon], features[feature])
+        feature, polygon = feature[touches], polygon[touches]
+
+        # features crossing one clip polygon are intersected in one call,
+        # features crossing several are intersected with their union
+        unique, first, count = np.unique(feature, return_index=True, return_counts=True)
+        single = count == 1
+        results = list(shapely.intersection(features[unique[single]], self.polygons[polygon[first[single]]]))
+        for i, start, k in zip(unique[~single], first[~single], count[~single]):
+            results.append(shapely.intersection(features[i], shapely.union_all(self.polygons[polygon[start:start + k]])))
+
+        for i, geometry in zip(np.concatenate([unique[single], unique[~single]]), results):
+            geometry = None if geometry is None or shapely.is_empty(geometry) else polygonal(geometry)
+            if geometry is not None:
+                paths[i] = CLIPPED
+                clipped[i] = shapely.to_wkb(geometry)
+        return paths, clipped
+
+
+def clipBlock(index, block):
+    # compute stage of clipTable(): block is a list of feature WKB
+    return index.clip(block)
+
+
+def writeClipped(writer, counts, rows, result):
+    # write stage of clipTable(): contained rows as they are, clipped rows
+    # with their new geometry
+    paths, clipped = result
+    counts.update(PATHS[path] for path in paths)
+    writer.insertRows([row if path == CONTAINED else [geometry, *row[1:]]
+                       for row, path, geometry in zip(rows, paths, clipped)
+                       if path in (CONTAINED, CLIPPED)])
+
+
+def clipBlocks(table, fields, where=None, blockSize=BLOCK_SIZE):
+    # (rows, WKB of the rows) blocks of a table, geometry first
+    rows = []
+    for row in readRows(table, ['SHAPE@', *fields], where):
+        rows.append(row)
+        if len(rows) == blockSize:
+            yield rows, [toWKB(row[0]) for row in rows]
+            rows = []
+    if rows:
+        yield rows, [toWKB(row[0]) for row in rows]
+
+
+def clipTable(table, fields, index, writer, where=None, blockSize=BLOCK_SIZE, workers=WORKERS):
+    '''clipTable(table, fields, index, writer, where, blockSize, workers) -> Counter of paths
+            table    : features to clip (arcpy feature class or GeoPackage layer)
+            fields   : attribute fields copied to the output
+            index    : ClipIndex of the clip polygons
+            writer   : open polygon FeatureWriter with the same fields
+            blockSize: features clipped at a time
+            workers  : blocks clipped at once
+
+            Clips a whole table block by block and reports how many features
+            took each path.
+    '''
+    counts = Counter({path: 0 for path in PATHS})
+    runPipeline(clipBlocks(table, fields, where, blockSize),\
+                partial(clipBlock, index),\
+                partial(writeClipped, writer, counts),\
+                workers)
+    print(', '.join(f'{counts[path]} {path}' for path in PATHS))
+    return counts
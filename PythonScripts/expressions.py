@@ -0,0 +1,235 @@
+#===================================================================
+# Name    : expressions.py
+# Purpose : to compile the derived fields of FIELD_DICT, written as
+#           small expressions, into one plan evaluated with NumPy
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# An expression is a formula over source field names, e.g.
+#     '(HSCF001B + HSCM001B) / HH'
+#     'ECYBASHPOP - P5YBASHPOP'
+#     'log(ECYHRIAVG)'
+# with + - * / ** , numbers, parentheses and the functions in FUNCTIONS.
+# Division is guarded: dividing by zero gives null (NaN) instead of an
+# error, as do log and sqrt outside their domain.
+#
+# compilePlan() parses every expression once into a Plan:
+#     sources - each source field once, however many expressions use it
+#     ops     - a list of array operations, where a subexpression shared
+#               by several fields (or repeated in one) is computed once
+#     outputs - the operation that gives each derived field
+# Plan.evaluate() runs the operations over whole columns at once. Plans
+# are cached on disk by a hash of the expressions, so a repeated run
+# skips parsing and planning.
+
+import ast
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+PLAN_VERSION = 1
+PLAN_CACHE = os.path.join(tempfile.gettempdir(), 'GeoprocessingTools', 'plans')
+
+
+def guardedDivide(a, b):
+    out = np.full(np.broadcast(a, b).shape, np.nan)
+    return np.divide(a, b, out=out, where=(b != 0) & ~np.isnan(b))
+
+
+def guarded(function, domain):
+    # NaN outside the function's domain instead of a warning and -inf
+    def kernel(a):
+        out = np.full(np.shape(a), np.nan)
+        return function(a, out=out, where=domain(a))
+    return kernel
+
+
+# operation name: (number of arguments, kernel)
+KERNELS = {
+    'add': (2, np.add),
+    'sub': (2, np.subtract),
+    'mul': (2, np.multiply),
+    'div': (2, guardedDivide),
+    'pow': (2, np.power),
+    'neg': (1, np.negative),
+    'log': (1, guarded(np.log, lambda a: a > 0)),
+    'log10': (1, guarded(np.log10, lambda a: a > 0)),
+    'log1p': (1, guarded(np.log1p, lambda a: a > -1)),
+    'sqrt': (1, guarded(np.sqrt, lambda a: a >= 0)),
+    'exp': (1, np.exp),
+    'abs': (1, np.abs),
+    'min': (2, np.minimum),
+    'max': (2, np.maximum),
+}
+FUNCTIONS = ('log', 'log10', 'log1p', 'sqrt', 'exp', 'abs', 'min', 'max')
+BINARY = {ast.Add: 'add', ast.Sub: 'sub', ast.Mult: 'mul', ast.Div: 'div', ast.Pow: 'pow'}
+COMMUTATIVE = ('add', 'mul', 'min', 'max')
+
+
+class Plan():
+
+    def __init__(self, sources, ops, outputs):
+        '''Plan(sources, ops, outputs)
+               sources: source field names, in the column order evaluate() expects
+               ops    : list of [name, *arguments]; an argument is a register,
+                        registers 0 .. len(sources) - 1 hold the sources and
+                        every op adds the next one. 'const' ops hold a number.
+               outputs: list of [derived field name, register]
+        '''
+        self.sources = list(sources)
+        self.ops = [list(op) for op in ops]
+        self.outputs = [list(output) for output in outputs]
+
+    def __repr__(self):
+        return f'Plan({len(self.sources)} sources, {len(self.ops)} ops, {len(self.outputs)} fields)'
+
+    @property
+    def fields(self):
+        return [output[0] for output in self.outputs]
+
+    def lastUses(self):
+        # the op after which each register is no longer needed
+        last = {}
+        for i, op in enumerate(self.ops):
+            if op[0] != 'const':
+                for register in op[1:]:
+                    last[register] = i
+        for _, register in self.outputs:
+            last.pop(register, None)
+        return last
+
+    def evaluate(self, values):
+        '''evaluate(values) -> array (rows, fields)
+               values: (rows, len(sources)) float array, columns in sources order
+
+               Computes every derived field over whole columns. Registers are
+               released as soon as no later op needs them.
+        '''
+        values = np.asarray(values, dtype=float)
+        registers = [values[:, i] for i in range(len(self.sources))]
+        release = {}
+        for register, i in self.lastUses().items():
+            release.setdefault(i, []).append(register)
+
+        with np.errstate(all='ignore'):
+            for i, (name, *arguments) in enumerate(self.ops):
+                if name == 'const':
+                    registers.append(np.float64(arguments[0]))
+                else:
+                    registers.append(KERNELS[name][1](*(registers[a] for a in arguments)))
+                for register in release.get(i, ()):
+                    registers[register] = None
+
+        out = np.empty((len(values), len(self.outputs)))
+        for j, (_, register) in enumerate(self.outputs):
+            out[:, j] = registers[register]
+        return out
+
+    def toJSON(self):
+        return {'version': PLAN_VERSION, 'sources': self.sources, 'ops': self.ops, 'outputs': self.outputs}
+
+    @classmethod
+    def fromJSON(cls, plan):
+        return cls(plan['sources'], plan['ops'], plan['outputs'])
+
+
+class Planner():
+    # turns parsed expressions into ops, reusing any op already planned
+
+    def __init__(self):
+        self.sources = []
+        self.nodes = []    # (name, *arguments) of every op, in order
+        self.known = {}    # op key -> its index in nodes
+        self.names = {}    # source field name -> its index in sources
+
+    def source(self, name):
+        if name not in self.names:
+            self.names[name] = len(self.sources)
+            self.sources.append(name)
+        return ('source', self.names[name])
+
+    def op(self, name, *arguments):
+        if name in COMMUTATIVE:
+            arguments = tuple(sorted(arguments))
+        key = (name, *arguments)
+        if key not in self.known:
+            self.known[key] = len(self.nodes)
+            self.nodes.append(key)
+        return ('op', self.known[key])
+
+    def visit(self, node, field):
+        if isinstance(node, ast.Expression):
+            return self.visit(node.body, field)
+        if isinstance(node, ast.Name):
+            return self.source(node.id)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float))\
+                                          and not isinstance(node.value, bool):
+            return self.op('const', float(node.value))
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY:
+            return self.op(BINARY[type(node.op)], self.visit(node.left, field), self.visit(node.right, field))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            operand = self.visit(node.operand, field)
+            return operand if isinstance(node.op, ast.UAdd) else self.op('neg', operand)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS\
+                                      and not node.keywords:
+            if len(node.args) != KERNELS[node.func.id][0]:
+                raise ValueError(f'{field}: {node.func.id}() takes {KERNELS[node.func.id][0]} argument(s)')
+            return self.op(node.func.id, *(self.visit(arg, field) for arg in node.args))
+        raise ValueError(f'{field}: {ast.unparse(node)!r} is not allowed in an expression')
+
+    def plan(self, outputs):
+        # sources come first in the registers, then the ops in order
+        register = lambda ref: ref[1] if ref[0] == 'source' else len(self.sources) + ref[1]
+        ops = [[name, *arguments] if name == 'const' else [name, *(register(a) for a in arguments)]
+               for name, *arguments in self.nodes]
+        return Plan(self.sources, ops, [[field, register(ref)] for field, ref in outputs])
+
+
+def parsePlan(expressions):
+    '''parsePlan(expressions) -> Plan
+            expressions: list of (derived field name, expression)
+    '''
+    planner = Planner()
+    outputs = []
+    for field, expression in expressions:
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f'{field}: cannot parse {expression!r}: {e.msg}') from None
+        outputs.append((field, planner.visit(tree, field)))
+    return planner.plan(outputs)
+
+
+def planHash(expressions):
+    spec = json.dumps([PLAN_VERSION, [list(pair) for pair in expressions]])
+    return hashlib.sha256(spec.encode('utf-8')).hexdigest()
+
+
+def compilePlan(expressions, cacheDir=PLAN_CACHE):
+    '''compilePlan(expressions, cacheDir) -> Plan
+            expressions: list of (derived field name, expression), or a dict
+            cacheDir   : where compiled plans are kept, None to not cache
+
+            Loads the plan from the cache when the same expressions have been
+            compiled before, otherwise parses, plans and caches them.
+    '''
+    expressions = list(expressions.items()) if isinstance(expressions, dict) else list(expressions)
+    cacheName = os.path.join(cacheDir, planHash(expressions) + '.json') if cacheDir else None
+
+    if cacheName and os.path.exists(cacheName):
+        try:
+            with open(cacheName) as f:
+                return Plan.fromJSON(json.load(f))
+        except (OSError, ValueError, KeyError):
+            pass  # unreadable cache entry, plan it again
+
+    plan = parsePlan(expressions)
+    if cacheName:
+        os.makedirs(cacheDir, exist_ok=True)
+        temp = f'{cacheName}.{os.getpid()}.tmp'
+        with open(temp, 'w') as f:
+            json.dump(plan.toJSON(), f)
+        os.replace(temp, cacheName)
+    return plan
@@ -0,0 +1,690 @@
+#===================================================================
+# Name    : featureio.py
+# Purpose : to read input tables and write output feature classes
+#           or tables through one interface, either with arcpy or
+#           without it (CSV and GeoPackage), so the scripts can run
+#           headless on machines without ArcGIS
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# Writers take rows as [geometry, *attributes] (or just attributes for
+# a table) and are picked by workspace:
+#     *.gpkg         -> GeoPackageWriter (sqlite3, no ArcGIS needed)
+#     anything else  -> ArcpyWriter (arcpy.da.InsertCursor)
+#
+# Geometries can be arcpy geometries, WKB bytes, an (x, y) pair for
+# points, a list of vertices, or a list of rings / parts.
+#
+# GeoPackageWriter inserts with executemany in large transactions and
+# only builds the R-tree spatial index when the writer is closed. It
+# writes in WAL mode, so a layer can be read into another layer of the
+# same .gpkg file.
+
+import csv
+import datetime
+import os
+import sqlite3
+import struct
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+BATCH_SIZE = 50000            # rows per executemany
+TRANSACTION_SIZE = 1000000    # rows per commit
+
+# arcpy field types to GeoPackage column types
+GPKG_TYPES = {'TEXT': 'TEXT', 'DOUBLE': 'DOUBLE', 'FLOAT': 'FLOAT',
+              'LONG': 'INTEGER', 'SHORT': 'SMALLINT', 'DATE': 'DATETIME',
+              'BLOB': 'BLOB', 'GUID': 'TEXT'}
+
+# arcpy geometry types to GeoPackage geometry types and WKB codes.
+# Polygons and lines are written as multi types, so multipart arcpy
+# shapes and single part shapes can share a layer.
+GPKG_GEOMETRY = {'POINT': ('POINT', 1), 'MULTIPOINT': ('MULTIPOINT', 4),
+                 'POLYLINE': ('MULTILINESTRING', 5), 'POLYGON': ('MULTIPOLYGON', 6)}
+
+
+# ==================================================================
+# WKB
+# ==================================================================
+
+def wkbCoordinates(wkb):
+    '''wkbCoordinates(wkb) -> (n, 2) array
+       Gets every x,y coordinate in a WKB geometry, in order.
+    '''
+    wkb = bytes(wkb)
+    chunks = []
+
+    def walk(offset):
+        order = '<' if wkb[offset] == 1 else '>'
+        geomType, = struct.unpack_from(order + 'I', wkb, offset + 1)
+        offset += 5
+        dims = 2 + (geomType // 1000 in (1, 2)) + (geomType // 1000 == 3) * 2
+        geomType %= 1000
+
+        if geomType == 1:
+            chunks.append(np.frombuffer(wkb, order + 'f8', dims, offset).reshape(1, dims))
+            return offset + 8 * dims
+        n, = struct.unpack_from(order + 'I', wkb, offset)
+        offset += 4
+        if geomType == 2:
+            chunks.append(np.frombuffer(wkb, order + 'f8', n * dims, offset).reshape(n, dims))
+            return offset + 8 * dims * n
+        if geomType == 3:
+            for _ in range(n):
+                m, = struct.unpack_from(order + 'I', wkb, offset)
+                chunks.append(np.frombuffer(wkb, order + 'f8', m * dims, offset + 4).reshape(m, dims))
+                offset += 4 + 8 * dims * m
+            return offset
+        for _ in range(n):
+            offset = walk(offset)
+        return offset
+
+    walk(0)
+    if not chunks:
+        return np.zeros((0, 2))
+    return np.concatenate([c[:, :2] for c in chunks]).astype(float)
+
+
+def ringBytes(coords, close=False):
+    coords = np.asarray(coords, dtype='<f8')[:, :2]
+    if close and len(coords) and (coords[0, 0] != coords[-1, 0] or coords[0, 1] != coords[-1, 1]):
+        coords = np.concatenate([coords, coords[:1]])
+    return struct.pack('<I', len(coords)) + coords.tobytes(), coords
+
+
+def wkbDimensions(wkb):
+    # (hasZ, hasM) of a WKB geometry, from its ISO or EWKB type code
+    code, = struct.unpack_from('<I' if wkb[0] == 1 else '>I', wkb, 1)
+    iso = (code & 0xFFFF) // 1000
+    return bool(code & 0x80000000) or iso in (1, 3), bool(code & 0x40000000) or iso in (2, 3)
+
+
+def isNested(value, depth):
+    # True if value is at least depth sequences deep, e.g. 3 for a list of rings of (x, y)
+    for _ in range(depth):
+        if isinstance(value, (str, bytes)) or not hasattr(value, '__len__') or not len(value):
+            return False
+        value = value[0]
+    return True
+
+
+def encodeWKB(geometry, geometryType):
+    '''encodeWKB(geometry, geometryType) -> wkb bytes, envelope (minx, maxx, miny, maxy)
+       Encodes a geometry as little endian WKB of the layer's
+       GeoPackage geometry type.
+    '''
+    typeName, code = GPKG_GEOMETRY[geometryType]
+
+    if hasattr(geometry, 'WKB') or isinstance(geometry, (bytes, bytearray, memoryview)):
+        wkb = bytes(geometry.WKB if hasattr(geometry, 'WKB') else geometry)
+        single = struct.unpack_from('<I' if wkb[0] == 1 else '>I', wkb, 1)[0]
+        if code in (5, 6) and single % 1000 in (2, 3):
+            # promote to multi, keeping the part's Z/M dimension code (e.g. 1003 -> 1006)
+            wkb = struct.pack('<BII', 1, code + single // 1000 * 1000, 1) + wkb
+        coords = wkbCoordinates(wkb)
+
+    elif code == 1:
+        x, y = geometry[0], geometry[1]
+        wkb = struct.pack('<BIdd', 1, 1, x, y)
+        coords = np.array([[x, y]])
+
+    elif code == 4:
+        coords = np.asarray(geometry, dtype=float)[:, :2]
+        wkb = struct.pack('<BII', 1, 4, len(coords))\
+              + b''.join(struct.pack('<BIdd', 1, 1, x, y) for x, y in coords)
+
+    elif isinstance(geometry, np.ndarray) and geometry.ndim == 2:
+        # fast path for one ring or line held in an (n, 2) array
+        data, coords = ringBytes(geometry, close=code == 6)
+        if code == 6:
+            wkb = struct.pack('<BIIBII', 1, 6, 1, 1, 3, 1) + data
+        else:
+            wkb = struct.pack('<BIIBI', 1, 5, 1, 1, 2) + data
+        mins, maxs = coords.min(axis=0), coords.max(axis=0)
+        return wkb, (mins[0], maxs[0], mins[1], maxs[1])
+
+    else:
+        # lines: vertices or parts; polygons: vertices, rings or parts of rings
+        depth = 3 if code == 5 else 4
+        while not isNested(geometry, depth):
+            geometry = [geometry]
+        parts, allCoords = [], []
+        for part in geometry:
+            if code == 5:
+                data, ring = ringBytes(part)
+                parts.append(struct.pack('<BI', 1, 2) + data)
+                allCoords.append(ring)
+            else:
+                rings = [ringBytes(ring, close=True) for ring in part]
+                parts.append(struct.pack('<BII', 1, 3, len(rings)) + b''.join(r[0] for r in rings))
+                allCoords.extend(r[1] for r in rings)
+        wkb = struct.pack('<BII', 1, code, len(parts)) + b''.join(parts)
+        coords = np.concatenate(allCoords) if allCoords else np.zeros((0, 2))
+
+    if len(coords):
+        envelope = (coords[:, 0].min(), coords[:, 0].max(), coords[:, 1].min(), coords[:, 1].max())
+    else:
+        envelope = None
+    return wkb, envelope
+
+
+def gpkgDateTime(value):
+    # GeoPackage DATETIME is ISO 8601 UTC text; anything else passes through
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc)
+        return value.strftime('%Y-%m-%dT%H:%M:%S.') + f'{value.microsecond // 1000:03d}Z'
+    if isinstance(value, datetime.date):
+        return value.strftime('%Y-%m-%dT00:00:00.000Z')
+    return value
+
+
+def gpkgBlob(wkb, envelope, srsId):
+    '''gpkgBlob(wkb, envelope, srsId) -> bytes
+       Wraps WKB in a GeoPackage geometry header with an xy envelope.
+    '''
+    if envelope is None:
+        return b'GP' + struct.pack('<BBi', 0, 0b00010001, srsId) + wkb   # empty
+    return b'GP' + struct.pack('<BBi4d', 0, 0b00000011, srsId, *envelope) + wkb
+
+
+def gpkgWKB(blob):
+    '''gpkgWKB(blob) -> wkb bytes
+       Strips the GeoPackage geometry header, the reverse of gpkgBlob().
+    '''
+    if blob is None:
+        return None
+    envelopeSize = (0, 32, 48, 48, 64)[(blob[3] >> 1) & 0b111]
+    return bytes(blob[8 + envelopeSize:])
+
+
+# ==================================================================
+# WRITERS
+# ==================================================================
+
+class FeatureWriter(ABC):
+
+    def __init__(self, workspace, name, geometryType, fields, spatialReference=None):
+        '''FeatureWriter(workspace, name, geometryType, fields, spatialReference)
+               workspace       : folder, geodatabase or .gpkg file to write into
+               name            : name of the new feature class or table
+               geometryType    : 'POINT', 'MULTIPOINT', 'POLYLINE', 'POLYGON', or None for a table
+               fields          : list of [field name, arcpy field type] pairs
+               spatialReference: EPSG code or arcpy SpatialReference
+
+               Base class of the output writers. Use as a context manager, or
+               call close() when done.
+        '''
+        self.workspace = workspace
+        self.name = name
+        self.geometryType = geometryType.upper() if geometryType else None
+        self.fields = [list(field) for field in fields]
+        self.spatialReference = spatialReference
+        self.count = 0
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.path}: {self.count} rows)'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def fieldNames(self):
+        return [field[0] for field in self.fields]
+
+    def insertRow(self, row):
+        '''insertRow(row) -> void
+               Inserts one row of [geometry, *attributes], or just attributes
+               for a table.
+        '''
+        self.insertRows([row])
+
+    @abstractmethod
+    def insertRows(self, rows):
+        '''insertRows(rows) -> void
+               Inserts an iterable of rows, each as insertRow() takes them.
+        '''
+
+    def insertArrays(self, geometry, *columns):
+        '''insertArrays(geometry, *columns) -> void
+               geometry: array of geometries, e.g. (n, vertices, 2) polygons
+               columns : one sequence of values per field
+
+               Inserts features held column by column.
+        '''
+        self.insertRows(zip(geometry, *columns))
+
+    def close(self):
+        pass
+
+
+class ArcpyWriter(FeatureWriter):
+
+    def __init__(self, workspace, name, geometryType, fields, spatialReference=None):
+        '''ArcpyWriter(workspace, name, geometryType, fields, spatialReference)
+               Writes through arcpy.da.InsertCursor into any ArcGIS workspace.
+        '''
+        import arcpy
+
+        super().__init__(workspace, name, geometryType, fields, spatialReference)
+        if self.geometryType:
+            self.path = arcpy.management.CreateFeatureclass(
+                workspace, name, self.geometryType, spatial_reference=spatialReference)[0]
+            cursorFields = ['SHAPE@', *self.fieldNames]
+        else:
+            self.path = arcpy.management.CreateTable(workspace, name)[0]
+            cursorFields = self.fieldNames
+
+        for field in self.fields:
+            arcpy.management.AddField(self.path, field[0], field[1])
+        self.cursor = arcpy.da.InsertCursor(self.path, cursorFields)
+        self.fromWKB = arcpy.FromWKB
+
+    def insertRows(self, rows):
+        insertRow = self.cursor.insertRow
+        for row in rows:
+            row = list(row)
+            if self.geometryType and isinstance(row[0], np.ndarray):
+                row[0] = row[0].tolist()
+            elif self.geometryType and isinstance(row[0], (bytes, bytearray, memoryview)):
+                row[0] = self.fromWKB(bytearray(row[0]), self.spatialReference)
+            insertRow(row)
+            self.count += 1
+
+    def close(self):
+        if self.cursor is not None:
+            del self.cursor
+            self.cursor = None
+
+
+class GeoPackageWriter(FeatureWriter):
+
+    def __init__(self, workspace, name, geometryType, fields, spatialReference=None,\
+                 batchSize=BATCH_SIZE, transactionSize=TRANSACTION_SIZE):
+        '''GeoPackageWriter(workspace, name, geometryType, fields, spatialReference, batchSize, transactionSize)
+               workspace: path of the .gpkg file, created if it does not exist
+
+               Writes a GeoPackage layer with the standard library sqlite3
+               module. An existing layer of the same name is replaced.
+        '''
+        super().__init__(workspace, name, geometryType, fields, spatialReference)
+        self.path = f'{workspace}{os.sep}{name}'
+        self.batchSize = batchSize
+        self.transactionSize = transactionSize
+        self.buffer = []
+        self.envelopes = []
+        self.uncommitted = 0
+        self.geometries = self.zCount = self.mCount = 0   # for gpkg_geometry_columns z and m
+
+        self.srsId, srsName, definition = self.__spatialReference(spatialReference)
+
+        self.db = sqlite3.connect(workspace)
+        # WAL lets readRows() keep reading another layer of the same file
+        # while this connection commits; close() puts the journal back
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = OFF')
+        self.db.execute('PRAGMA cache_size = -262144')  # 256 MB, mostly for the R-tree build
+        self.__createMetadataTables()
+        self.__dropLayer()
+
+        columns = ['fid INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL']
+        if self.geometryType:
+            self.typeName, self.typeCode = GPKG_GEOMETRY[self.geometryType]
+            columns.append(f'geom {self.typeName}')
+        columns += [f'"{field}" {GPKG_TYPES.get(str(fieldType).upper(), "TEXT")}'
+                    for field, fieldType in self.fields]
+
+        c = self.db.cursor()
+        c.execute(f'CREATE TABLE "{name}" ({", ".join(columns)})')
+        c.execute('INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES (?,?,?,?,?,?)',
+                  (srsName, self.srsId, 'EPSG' if self.srsId > 0 else 'NONE', self.srsId, definition, None))
+        c.execute('INSERT INTO gpkg_contents (table_name, data_type, identifier, last_change, srs_id) '
+                  'VALUES (?,?,?,?,?)',
+                  (name, 'features' if self.geometryType else 'attributes', name,
+                   self.__now(), self.srsId if self.geometryType else None))
+        if self.geometryType:
+            c.execute('INSERT INTO gpkg_geometry_columns VALUES (?,?,?,?,0,0)',
+                      (name, 'geom', self.typeName, self.srsId))
+
+        offset = bool(self.geometryType)
+        self.dateColumns = [i + offset for i, field in enumerate(self.fields)
+                            if str(field[1]).upper() == 'DATE']
+
+        placeholders = ', '.join('?' * (len(self.fields) + bool(self.geometryType)))
+        names = ['geom'] * bool(self.geometryType) + [f'"{field}"' for field in self.fieldNames]
+        self.insertSQL = f'INSERT INTO "{name}" ({", ".join(names)}) VALUES ({placeholders})'
+
+    @staticmethod
+    def __now():
+        return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    @staticmethod
+    def __spatialReference(spatialReference):
+        # (srs_id, name, definition) for gpkg_spatial_ref_sys
+        if spatialReference is None:
+            return -1, 'Undefined cartesian SRS', 'undefined'
+        if hasattr(spatialReference, 'factoryCode'):
+            return int(spatialReference.factoryCode), spatialReference.name, spatialReference.exportToString()
+        if int(spatialReference) == 4326:
+            return 4326, 'WGS 84 geodetic', WGS84_WKT
+        return int(spatialReference), f'EPSG:{int(spatialReference)}', 'undefined'
+
+    def __createMetadataTables(self):
+        c = self.db.cursor()
+        c.execute('PRAGMA application_id = 1196444487')  # 'GPKG'
+        c.execute('PRAGMA user_version = 10400')
+        c.executescript('''
+            CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys (
+                srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, organization TEXT NOT NULL,
+                organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT);
+            CREATE TABLE IF NOT EXISTS gpkg_contents (
+                table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, identifier TEXT UNIQUE,
+                description TEXT DEFAULT '', last_change DATETIME NOT NULL
+                    DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+                min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER,
+                CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys(srs_id));
+            CREATE TABLE IF NOT EXISTS gpkg_geometry_columns (
+                table_name TEXT NOT NULL, column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL,
+                srs_id INTEGER NOT NULL, z TINYINT NOT NULL, m TINYINT NOT NULL,
+                CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name),
+                CONSTRAINT fk_gc_tn FOREIGN KEY (table_name) REFERENCES gpkg_contents(table_name),
+                CONSTRAINT fk_gc_srs FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys (srs_id));
+            CREATE TABLE IF NOT EXISTS gpkg_extensions (
+                table_name TEXT, column_name TEXT, extension_name TEXT NOT NULL,
+                definition TEXT NOT NULL, scope TEXT NOT NULL,
+                CONSTRAINT ge_tce UNIQUE (table_name, column_name, extension_name));
+        ''')
+        c.executemany('INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES (?,?,?,?,?,?)', [
+            ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', None),
+            ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', None),
+            ('WGS 84 geodetic', 4326, 'EPSG', 4326, WGS84_WKT, None)])
+        self.db.commit()
+
+    def __dropLayer(self):
+        # overwrite, like arcpy.env.overwriteOutput
+        c = self.db.cursor()
+        rtree = f'rtree_{self.name}_geom'
+        for trigger in ('insert', 'update1', 'update2', 'update3', 'update4', 'delete'):
+            c.execute(f'DROP TRIGGER IF EXISTS "{rtree}_{trigger}"')
+        c.execute(f'DROP TABLE IF EXISTS "{rtree}"')
+        c.execute(f'DROP TABLE IF EXISTS "{self.name}"')
+        for table in ('gpkg_extensions', 'gpkg_geometry_columns', 'gpkg_contents'):
+            c.execute(f'DELETE FROM {table} WHERE table_name = ?', (self.name,))
+        self.db.commit()
+
+    def insertRows(self, rows):
+        for row in rows:
+            row = list(row)
+            if self.geometryType:
+                if row[0] is None:
+                    envelope = None
+                else:
+                    wkb, envelope = encodeWKB(row[0], self.geometryType)
+                    row[0] = gpkgBlob(wkb, envelope, self.srsId)
+                    hasZ, hasM = wkbDimensions(wkb)
+                    self.geometries += 1
+                    self.zCount += hasZ
+                    self.mCount += hasM
+                self.envelopes.append(envelope)
+            for i in self.dateColumns:
+                row[i] = gpkgDateTime(row[i])
+            self.buffer.append(row)
+            if len(self.buffer) >= self.batchSize:
+                self.flush()
+
+    def insertArrays(self, geometry, *columns):
+        '''insertArrays(geometry, *columns) -> void
+               geometry: (n, 2) array of points for a POINT layer, or an
+                         (n, vertices, 2) array of single ring polygons for a
+                         POLYGON layer
+               columns : one sequence of values per field
+
+               Inserts n features whose geometries all have the same number
+               of vertices, encoding every geometry in one vectorized pass.
+               Polygon rings that are not closed get their first vertex again
+               at the end; closed ones are written as they are.
+        '''
+        geometry = np.asarray(geometry, dtype='<f8')
+        n = len(geometry)
+
+        if self.geometryType == 'POINT':
+            mins = maxs = geometry[:, :2]
+        elif self.geometryType == 'POLYGON':
+            mins, maxs = geometry.min(axis=1), geometry.max(axis=1)
+        else:
+            raise ValueError(f'insertArrays does not support {self.geometryType} layers')
+        envelopes = np.stack([mins[:, 0], maxs[:, 0], mins[:, 1], maxs[:, 1]], axis=1)
+
+        if self.geometryType == 'POINT':
+            blobs = self.__arrayBlobs(geometry, envelopes)
+        else:
+            # open and closed rings encode to different lengths, one pass each
+            isOpen = (geometry[:, 0] != geometry[:, -1]).any(axis=1)
+            blobs = [None] * n
+            for group, close in ((np.flatnonzero(isOpen), True), (np.flatnonzero(~isOpen), False)):
+                if not len(group):
+                    continue
+                rings = geometry[group]
+                if close:
+                    rings = np.concatenate([rings, rings[:, :1]], axis=1)
+                for i, blob in zip(group, self.__arrayBlobs(rings, envelopes[group])):
+                    blobs[i] = blob
+
+        self.flush()
+        self.geometries += n
+        self.envelopes.extend(map(tuple, envelopes.tolist()))
+        self.buffer = [list(row) for row in zip(blobs, *columns)]
+        for row in self.buffer if self.dateColumns else ():
+            for i in self.dateColumns:
+                row[i] = gpkgDateTime(row[i])
+        self.flush()
+
+    def __arrayBlobs(self, geometry, envelopes):
+        # GeoPackage blobs of (n, 2) points or (n, vertices, 2) closed rings,
+        # laid out as one structured array
+        if self.geometryType == 'POINT':
+            layout = [('bo', 'u1'), ('type', '<u4'), ('xy', '<f8', 2)]
+        else:
+            layout = [('bo', 'u1'), ('type', '<u4'), ('nParts', '<u4'),\
+                      ('partBo', 'u1'), ('partType', '<u4'), ('nRings', '<u4'),\
+                      ('nPoints', '<u4'), ('xy', '<f8', geometry.shape[1:])]
+        blob = np.zeros(len(geometry), dtype=[('magic', 'S2'), ('version', 'u1'), ('flags', 'u1'),\
+                                              ('srsId', '<i4'), ('envelope', '<f8', 4)] + layout)
+        blob['magic'] = b'GP'
+        blob['flags'] = 0b00000011
+        blob['srsId'] = self.srsId
+        blob['envelope'] = envelopes
+        blob['bo'] = 1
+        blob['xy'] = geometry
+        if self.geometryType == 'POINT':
+            blob['type'] = 1
+        else:
+            blob['type'], blob['nParts'], blob['partBo'] = 6, 1, 1
+            blob['partType'], blob['nRings'], blob['nPoints'] = 3, 1, geometry.shape[1]
+
+        raw = blob.tobytes()
+        size = blob.dtype.itemsize
+        return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+    def flush(self):
+        '''flush() -> void
+               Writes the buffered rows with one executemany, committing once
+               the transaction size is reached.
+        '''
+        if not self.buffer:
+            return
+        self.db.executemany(self.insertSQL, self.buffer)
+        self.count += len(self.buffer)
+        self.uncommitted += len(self.buffer)
+        self.buffer = []
+        if self.uncommitted >= self.transactionSize:
+            self.db.commit()
+            self.uncommitted = 0
+
+    def __buildSpatialIndex(self):
+        # bulk load the R-tree from the envelopes gathered while writing,
+        # then add the standard triggers that keep it current afterwards
+        c = self.db.cursor()
+        table, rtree = self.name, f'rtree_{self.name}_geom'
+        c.execute(f'CREATE VIRTUAL TABLE "{rtree}" USING rtree(id, minx, maxx, miny, maxy)')
+
+        fids = [row[0] for row in c.execute(f'SELECT fid FROM "{table}" ORDER BY fid')]
+        c.executemany(f'INSERT INTO "{rtree}" VALUES (?,?,?,?,?)',
+                      ((fid, *envelope) for fid, envelope in zip(fids, self.envelopes) if envelope))
+
+        values = 'NEW.fid, ST_MinX(NEW.geom), ST_MaxX(NEW.geom), ST_MinY(NEW.geom), ST_MaxY(NEW.geom)'
+        c.executescript(f'''
+            CREATE TRIGGER "{rtree}_insert" AFTER INSERT ON "{table}"
+                WHEN (NEW.geom NOT NULL AND NOT ST_IsEmpty(NEW.geom))
+                BEGIN INSERT OR REPLACE INTO "{rtree}" VALUES ({values}); END;
+            CREATE TRIGGER "{rtree}_update1" AFTER UPDATE OF geom ON "{table}"
+                WHEN OLD.fid = NEW.fid AND (NEW.geom NOTNULL AND NOT ST_IsEmpty(NEW.geom))
+                BEGIN INSERT OR REPLACE INTO "{rtree}" VALUES ({values}); END;
+            CREATE TRIGGER "{rtree}_update2" AFTER UPDATE OF geom ON "{table}"
+                WHEN OLD.fid = NEW.fid AND (NEW.geom ISNULL OR ST_IsEmpty(NEW.geom))
+                BEGIN DELETE FROM "{rtree}" WHERE id = OLD.fid; END;
+            CREATE TRIGGER "{rtree}_update3" AFTER UPDATE ON "{table}"
+                WHEN OLD.fid != NEW.fid AND (NEW.geom NOTNULL AND NOT ST_IsEmpty(NEW.geom))
+                BEGIN DELETE FROM "{rtree}" WHERE id = OLD.fid;
+                      INSERT OR REPLACE INTO "{rtree}" VALUES ({values}); END;
+            CREATE TRIGGER "{rtree}_update4" AFTER UPDATE ON "{table}"
+                WHEN OLD.fid != NEW.fid AND (NEW.geom ISNULL OR ST_IsEmpty(NEW.geom))
+                BEGIN DELETE FROM "{rtree}" WHERE id IN (OLD.fid, NEW.fid); END;
+            CREATE TRIGGER "{rtree}_delete" AFTER DELETE ON "{table}"
+                WHEN OLD.geom NOT NULL
+                BEGIN DELETE FROM "{rtree}" WHERE id = OLD.fid; END;
+        ''')
+        c.execute('INSERT INTO gpkg_extensions VALUES (?,?,?,?,?)',
+                  (table, 'geom', 'gpkg_rtree_index', 'http://www.geopackage.org/spec120/#extension_rtree',
+                   'write-only'))
+
+        envelopes = np.array([e for e in self.envelopes if e], dtype=float).reshape(-1, 4)
+        if len(envelopes):
+            c.execute('UPDATE gpkg_contents SET min_x = ?, max_x = ?, min_y = ?, max_y = ? WHERE table_name = ?',
+                      (envelopes[:, 0].min(), envelopes[:, 1].max(),
+                       envelopes[:, 2].min(), envelopes[:, 3].max(), table))
+
+    def close(self):
+        if self.db is None:
+            return
+        self.flush()
+        if self.geometryType:
+            self.__buildSpatialIndex()
+            # z and m as written: 0 prohibited, 1 mandatory, 2 optional
+            z, m = (0 if not count else 1 if count == self.geometries else 2 for count in (self.zCount, self.mCount))
+            self.db.execute('UPDATE gpkg_geometry_columns SET z = ?, m = ? WHERE table_name = ?', (z, m, self.name))
+        self.db.execute('UPDATE gpkg_contents SET last_change = ? WHERE table_name = ?',
+                        (self.__now(), self.name))
+        self.db.commit()
+        try:
+            self.db.execute('PRAGMA journal_mode = DELETE')
+        except sqlite3.OperationalError:
+            pass   # still being read; the last connection to close checkpoints the WAL
+        self.db.close()
+        self.db = None
+
+
+def openWriter(workspace, name, geometryType, fields, spatialReference=None):
+    '''openWriter(workspace, name, geometryType, fields, spatialReference) -> FeatureWriter
+       Opens a GeoPackageWriter for a .gpkg workspace and an ArcpyWriter
+       for anything else.
+    '''
+    if str(workspace).lower().endswith('.gpkg'):
+        return GeoPackageWriter(workspace, name, geometryType, fields, spatialReference)
+    return ArcpyWriter(workspace, name, geometryType, fields, spatialReference)
+
+
+# ==================================================================
+# READERS
+# ==================================================================
+
+def readRows(table, fields, where=None, spatialReference=None):
+    '''readRows(table, fields, where, spatialReference) -> generator of tuples
+       Reads fields from a .csv file, a GeoPackage layer
+       ('file.gpkg/layer' or 'file.gpkg\\layer') or any arcpy table.
+       where is an SQL filter for GeoPackage and arcpy sources; CSV
+       rows are read as text. 'SHAPE@' reads a GeoPackage layer's
+       geometry as WKB bytes. spatialReference projects arcpy geometries
+       as they are read; other sources are read as stored.
+    '''
+    table = str(table)
+    lowered = table.lower()
+
+    if lowered.endswith('.csv'):
+        with open(table, newline='') as file:
+            for row in csv.DictReader(file):
+                yield tuple(row[field] for field in fields)
+
+    elif '.gpkg' in lowered and not lowered.endswith('.gpkg'):
+        i = lowered.index('.gpkg') + 5
+        db = sqlite3.connect(table[:i])
+        try:
+            layer = table[i + 1:]
+            shape = [j for j, field in enumerate(fields) if field == 'SHAPE@']
+            if shape:
+                geometryColumn = db.execute('SELECT column_name FROM gpkg_geometry_columns WHERE table_name = ?',\
+                                            (layer,)).fetchone()[0]
+                fields = [geometryColumn if field == 'SHAPE@' else field for field in fields]
+            columns = ', '.join(f'"{field}"' for field in fields)
+            sql = f'SELECT {columns} FROM "{layer}"' + (f' WHERE {where}' if where else '')
+            for row in db.execute(sql):
+                if shape:
+                    row = list(row)
+                    for j in shape:
+                        row[j] = gpkgWKB(row[j])
+                    row = tuple(row)
+                yield row
+        finally:
+            db.close()
+
+    else:
+        import arcpy
+        with arcpy.da.SearchCursor(table, fields, where, spatialReference) as sc:
+            yield from sc
+
+
+# arcpy field types (Field.type) and GeoPackage column types back to
+# the field types writers take
+ARCPY_FIELD_TYPES = {'String': 'TEXT', 'Integer': 'LONG', 'SmallInteger': 'SHORT', 'BigInteger': 'LONG',
+                     'Double': 'DOUBLE', 'Single': 'FLOAT', 'Date': 'DATE', 'GUID': 'GUID', 'Blob': 'BLOB'}
+GPKG_FIELD_TYPES = {'INTEGER': 'LONG', 'INT': 'LONG', 'MEDIUMINT': 'LONG', 'SMALLINT': 'SHORT',
+                    'TINYINT': 'SHORT', 'DOUBLE': 'DOUBLE', 'REAL': 'DOUBLE', 'FLOAT': 'FLOAT',
+                    'DATE': 'DATE', 'DATETIME': 'DATE', 'BLOB': 'BLOB'}
+
+
+def tableFields(table):
+    '''tableFields(table) -> list of [field name, field type]
+       The attribute fields of a GeoPackage layer or arcpy table, in the
+       form writers take them, leaving out the object id, geometry and
+       shape length/area fields.
+    '''
+    table = str(table)
+    lowered = table.lower()
+
+    if '.gpkg' in lowered and not lowered.endswith('.gpkg'):
+        i = lowered.index('.gpkg') + 5
+        db = sqlite3.connect(table[:i])
+        try:
+            layer = table[i + 1:]
+            geometry = db.execute('SELECT column_name FROM gpkg_geometry_columns WHERE table_name = ?',\
+                                  (layer,)).fetchone()
+            columns = db.execute(f'PRAGMA table_info("{layer}")').fetchall()
+        finally:
+            db.close()
+        return [[name, GPKG_FIELD_TYPES.get(declared.split('(')[0].strip().upper(), 'TEXT')]
+                for _, name, declared, _, _, primaryKey in columns
+                if not primaryKey and (geometry is None or name != geometry[0])]
+
+    import arcpy
+    return [[field.name, ARCPY_FIELD_TYPES[field.type]] for field in arcpy.ListFields(table)
+            if field.type in ARCPY_FIELD_TYPES and not field.required]
+
+
+WGS84_WKT = 'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,'\
+            'AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,'\
+            'AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],'\
+            'AUTHORITY["EPSG","4326"]]'
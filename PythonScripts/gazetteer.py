@@ -0,0 +1,278 @@
+# Tool: Gazetteer
+# Purpose: look up places offline from a GeoNames dump instead of scraping
+#          a web page for every town, used by GetPlaceLatLong.py and geocode.py
+# Author: Nathan Wisla
+# Date: October 19, 2026
+
+# buildGazetteer() turns a GeoNames dump (allCountries.txt, cities1000.txt,
+# ... from https://download.geonames.org/export/dump/) into an index directory:
+#     names.bin, names.npy     - every normalized name, sorted, concatenated as
+#                                UTF-8 with the offset of each one
+#     nameplace.npy            - the place each name belongs to
+#     labels.bin, labels.npy   - the place's own name, for display
+#     ids.npy, lat.npy, lon.npy, population.npy, country.npy
+#                              - one entry per place
+#     countries.json           - country name -> ISO code, from GeoNames
+#                                countryInfo.txt (found next to the dump if
+#                                not given); without it only ISO codes and
+#                                the names in COUNTRY_ALIASES can be searched
+#     gazetteer.json           - written last: the index is complete
+# Everything is memory-mapped when opened, so a lookup is a binary search that
+# only touches a few pages of the files.
+#
+# Names are normalized before they are stored or searched: accents are
+# dropped, case is folded, and punctuation becomes a space, so
+# 'São Paulo', 'SAO PAULO' and 'Sao-Paulo' all match.
+#
+# usage: python gazetteer.py allCountries.txt [indexDir] [countryInfo.txt]
+
+import json
+import mmap
+import os
+import re
+import sys
+import unicodedata
+from bisect import bisect_left
+from datetime import datetime, timezone
+import numpy as np
+
+GAZETTEER = 'gazetteer'
+
+# GeoNames dump columns
+ID, NAME, ASCII_NAME, ALTERNATE_NAMES, LATITUDE, LONGITUDE, FEATURE_CLASS = 0, 1, 2, 3, 4, 5, 6
+COUNTRY_CODE, POPULATION = 8, 14
+
+NOT_WORD = re.compile(r'[\W_]+')
+
+# common names and codes that are not a country's ISO code or its
+# countryInfo.txt name, normalized
+COUNTRY_ALIASES = {'uk': 'GB', 'great britain': 'GB', 'england': 'GB', 'scotland': 'GB', 'wales': 'GB',
+                   'northern ireland': 'GB', 'usa': 'US', 'united states of america': 'US', 'america': 'US'}
+
+
+def normalizeName(name):
+    '''normalizeName(name) -> str
+            Drops accents, folds case and turns punctuation into single spaces.
+    '''
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return NOT_WORD.sub(' ', name.casefold()).strip()
+
+
+def readCountryInfo(fileName):
+    # GeoNames countryInfo.txt: ISO code in column 0, country name in column 4
+    countries = {}
+    with open(fileName, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            row = line.rstrip('\n').split('\t')
+            if len(row) > 4:
+                countries[normalizeName(row[4])] = row[0]
+    return countries
+
+
+def writeStrings(strings, baseName):
+    # one UTF-8 blob plus an offset array with a trailing end offset
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in encoded], out=offsets[1:])
+    with open(baseName + '.bin', 'wb') as f:
+        f.write(b''.join(encoded))
+    np.save(baseName + '.npy', offsets)
+
+
+def buildGazetteer(dumpName, indexDir=GAZETTEER, countryInfo=None, alternates=True, featureClasses='P'):
+    '''buildGazetteer(dumpName, indexDir, countryInfo, alternates, featureClasses) -> number of places
+            dumpName      : GeoNames dump, tab separated
+            indexDir      : directory the index is written to
+            countryInfo   : GeoNames countryInfo.txt, to search by country name; by
+                            default the one next to dumpName, if there is one
+            alternates    : also index every alternate name of a place
+            featureClasses: GeoNames feature classes kept, 'P' is populated places;
+                            None keeps everything
+
+            Builds the on-disk index in one pass over the dump.
+    '''
+    if countryInfo is None:
+        countryInfo = os.path.join(os.path.dirname(os.path.abspath(dumpName)), 'countryInfo.txt')
+        if not os.path.exists(countryInfo):
+            countryInfo = None
+            print('no countryInfo.txt: places can only be searched by ISO country code')
+    os.makedirs(indexDir, exist_ok=True)
+    marker = os.path.join(indexDir, 'gazetteer.json')
+    if os.path.exists(marker):
+        os.remove(marker)
+
+    ids, lat, lon, population, country, labels = [], [], [], [], [], []
+    names = []  # (normalized name, -population, place)
+    with open(dumpName, encoding='utf-8') as f:
+        for line in f:
+            row = line.rstrip('\n').split('\t')
+            if len(row) <= POPULATION or (featureClasses and row[FEATURE_CLASS] not in featureClasses):
+                continue
+            place = len(ids)
+            people = int(row[POPULATION] or 0)
+            ids.append(int(row[ID]))
+            lat.append(float(row[LATITUDE]))
+            lon.append(float(row[LONGITUDE]))
+            population.append(people)
+            country.append(row[COUNTRY_CODE])
+            labels.append(row[NAME])
+
+            spellings = {row[NAME], row[ASCII_NAME]}
+            if alternates and row[ALTERNATE_NAMES]:
+                spellings.update(row[ALTERNATE_NAMES].split(','))
+            for name in {normalizeName(s) for s in spellings}:
+                if name:
+                    names.append((name, -people, place))
+
+    # the most populous place comes first among places of the same name
+    names.sort()
+    writeStrings([name[0] for name in names], os.path.join(indexDir, 'names'))
+    np.save(os.path.join(indexDir, 'nameplace.npy'), np.array([name[2] for name in names], dtype=np.int32))
+    writeStrings(labels, os.path.join(indexDir, 'labels'))
+    np.save(os.path.join(indexDir, 'ids.npy'), np.array(ids, dtype=np.int64))
+    np.save(os.path.join(indexDir, 'lat.npy'), np.array(lat, dtype=np.float32))
+    np.save(os.path.join(indexDir, 'lon.npy'), np.array(lon, dtype=np.float32))
+    np.save(os.path.join(indexDir, 'population.npy'), np.array(population, dtype=np.int64))
+    np.save(os.path.join(indexDir, 'country.npy'), np.array(country, dtype='S2'))
+
+    with open(os.path.join(indexDir, 'countries.json'), 'w', encoding='utf-8') as f:
+        json.dump(readCountryInfo(countryInfo) if countryInfo else {}, f)
+    with open(marker, 'w') as f:
+        json.dump({'source': os.path.basename(dumpName), 'places': len(ids), 'names': len(names),\
+                   'built': datetime.now(timezone.utc).isoformat(timespec='seconds')}, f)
+    return len(ids)
+
+
+class StringTable():
+    # read-only sequence over a blob written by writeStrings(), so bisect
+    # can search it without decoding more than the strings it compares
+
+    def __init__(self, baseName):
+        self.offsets = np.load(baseName + '.npy', mmap_mode='r')
+        with open(baseName + '.bin', 'rb') as f:
+            self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(baseName + '.bin') else b''
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].decode('utf-8')
+
+
+class Gazetteer():
+
+    def __init__(self, indexDir=GAZETTEER):
+        '''Gazetteer(indexDir)
+               indexDir: directory written by buildGazetteer()
+        '''
+        self.indexDir = indexDir
+        with open(os.path.join(indexDir, 'gazetteer.json')) as f:
+            self.info = json.load(f)
+        with open(os.path.join(indexDir, 'countries.json'), encoding='utf-8') as f:
+            self.countries = json.load(f)
+
+        self.names = StringTable(os.path.join(indexDir, 'names'))
+        self.labels = StringTable(os.path.join(indexDir, 'labels'))
+        load = lambda name: np.load(os.path.join(indexDir, name + '.npy'), mmap_mode='r')
+        self.namePlace = load('nameplace')
+        self.ids, self.lat, self.lon = load('ids'), load('lat'), load('lon')
+        self.population, self.country = load('population'), load('country')
+        self.codes = None
+
+    def __repr__(self):
+        return f'Gazetteer({self.indexDir}: {self.info["places"]} places)'
+
+    def __len__(self):
+        return len(self.ids)
+
+    def countryCode(self, country):
+        # ISO code from a code or a country name, None if unknown
+        key = normalizeName(country or '')
+        if key in COUNTRY_ALIASES:
+            return COUNTRY_ALIASES[key]
+        if key in self.countries:
+            return self.countries[key]
+        if len(key) == 2:
+            if self.codes is None:
+                self.codes = set(code.decode() for code in np.unique(self.country))
+            if key.upper() in self.codes:
+                return key.upper()
+        return None
+
+    def place(self, i):
+        '''place(i) -> (geonameid, name, country code, lat, long, population)
+               Coordinates are stored as float32, GeoNames gives 5 decimals.
+        '''
+        return int(self.ids[i]), self.labels[i], self.country[i].decode(),\
+               round(float(self.lat[i]), 5), round(float(self.lon[i]), 5), int(self.population[i])
+
+    def lookup(self, name, country=None, prefix=False, limit=10):
+        '''lookup(name, country, prefix, limit) -> list of places, see place()
+                name   : place name, accents and case do not matter
+                country: ISO code or country name to filter on; a country that
+                         cannot be resolved to a code matches nothing
+                prefix : match every name that starts with name
+                limit  : most places returned
+
+                For an exact match the places are in order of population.
+        '''
+        key = normalizeName(name)
+        if not key:
+            return []
+        code = self.countryCode(country) if country else None
+        if country and code is None:
+            return []
+
+        start = bisect_left(self.names, key)
+        end = bisect_left(self.names, key + '\U0010ffff', start) if prefix\
+              else bisect_left(self.names, key + '\x00', start)
+
+        found, seen = [], set()
+        for i in range(start, end):
+            place = int(self.namePlace[i])
+            if place in seen or (code and self.country[place].decode() != code):
+                continue
+            seen.add(place)
+            found.append(self.place(place))
+            if len(found) >= limit:
+                break
+        return found
+
+    def forward(self, town, country=None):
+        '''forward(town, country) -> (lat, long) or None
+               The most populous exact match, like GetPlaceLatLong.py.
+        '''
+        found = self.lookup(town, country, limit=1)
+        return (found[0][3], found[0][4]) if found else None
+
+
+def openGazetteer(indexDir=GAZETTEER):
+    '''openGazetteer(indexDir) -> Gazetteer or None
+            Opens the offline index, or gives None if it has not been built,
+            so callers fall back to the web.
+    '''
+    if not os.path.exists(os.path.join(indexDir, 'gazetteer.json')):
+        return None
+    return Gazetteer(indexDir)
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+
+    if len(sys.argv) < 2:
+        print('usage: python gazetteer.py allCountries.txt [indexDir] [countryInfo.txt]')
+        sys.exit(1)
+
+    t0 = perf_counter()
+    n = buildGazetteer(sys.argv[1], *sys.argv[2:4])
+    print(f'{n} places indexed in {perf_counter() - t0:.1f} s')
+
+    gazetteer = Gazetteer(sys.argv[2] if len(sys.argv) > 2 else GAZETTEER)
+    t0 = perf_counter()
+    for i in range(10000):
+        gazetteer.lookup('halifax', limit=1)
+    print(f'{(perf_counter() - t0) / 10000 * 1e6:.1f} microseconds per lookup')
+    print('all done')
@@ -0,0 +1,250 @@
+# Tool: Geocode
+# Purpose: resolve a whole list of town, country pairs to latitude and
+#          longitude, the batch version of GetPlaceLatLong.py
+# Author: Nathan Wisla
+# Date: October 19, 2026
+
+# Lookups run concurrently (at most `concurrency` at a time) with each host
+# limited to `rate` requests per second. Every answer, found or not, goes into
+# a SQLite cache, so a place is only ever fetched once. Network errors are not
+# cached and are retried on the next run. When the offline gazetteer has been
+# built (see gazetteer.py) it is searched first and the web is only used for
+# the places it does not know.
+#
+# usage: python geocode.py places.csv [results.csv] [baseURL]
+#        places.csv has a town and a country on each row (header optional)
+
+import asyncio
+import csv
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib import request
+from urllib.parse import quote, urlsplit
+from gazetteer import GAZETTEER, openGazetteer
+
+BASE_URL = 'https://www.travelmath.com/cities/'
+CACHE = 'PlaceLatLong.sqlite'
+
+# the same pattern GetPlaceLatLong.py looks for, latitude first then longitude
+PATTERN = re.compile(rb'<strong>[Latong]*itude:</strong> (-*\d*\.\d*)</p>')
+CHUNK = 16384
+TIMEOUT = 30
+
+
+def placeKey(town, country):
+    # cache key: case and surrounding space do not make a new place
+    return ' '.join(town.split()).casefold(), ' '.join(country.split()).casefold()
+
+
+def placeURL(town, country, baseURL=BASE_URL):
+    return baseURL + quote(f'{town.strip()},+{country.strip()}', safe=',+')
+
+
+def readLatLong(response, chunkSize=CHUNK):
+    '''readLatLong(response, chunkSize) -> (lat, long) or None
+            response : open file-like HTTP response
+            chunkSize: bytes read at a time
+
+            Reads the page a chunk at a time and stops as soon as both the
+            latitude and the longitude have matched, so the rest of the page
+            is never downloaded.
+    '''
+    page = b''
+    found = []
+    searchFrom = 0
+    while len(found) < 2:
+        chunk = response.read(chunkSize)
+        if not chunk:
+            break
+        page += chunk
+        for match in PATTERN.finditer(page, searchFrom):
+            found.append(float(match.group(1)))
+            searchFrom = match.end()
+        # a match may straddle the next chunk, keep a little of this one
+        searchFrom = max(searchFrom, len(page) - 256)
+    return tuple(found[:2]) if len(found) > 1 else None
+
+
+def fetchLatLong(url, timeout=TIMEOUT):
+    # blocking fetch, run in a worker thread
+    req = request.Request(url, headers={'User-Agent': 'GeoprocessingTools geocode'})
+    with request.urlopen(req, timeout=timeout) as response:
+        return readLatLong(response)
+
+
+class PlaceCache():
+
+    def __init__(self, path=CACHE):
+        '''PlaceCache(path)
+               path: SQLite file, created if it does not exist
+        '''
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('''CREATE TABLE IF NOT EXISTS places (
+                                       town TEXT, country TEXT,
+                                       latitude REAL, longitude REAL,
+                                       fetched TEXT,
+                                       PRIMARY KEY (town, country))''')
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get(self, town, country):
+        '''get(town, country) -> (lat, long)
+               Gets a cached place: (None, None) if the source did not know
+               it, or None if it has never been fetched.
+        '''
+        return self.connection.execute('SELECT latitude, longitude FROM places WHERE town = ? AND country = ?',\
+                                       placeKey(town, country)).fetchone()
+
+    def put(self, town, country, latLong):
+        # latLong None records a place the source does not know
+        lat, long = latLong if latLong is not None else (None, None)
+        self.connection.execute('INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?, ?)',\
+                                (*placeKey(town, country), lat, long,\
+                                 datetime.now(timezone.utc).isoformat(timespec='seconds')))
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+
+class HostRateLimiter():
+
+    def __init__(self, rate):
+        '''HostRateLimiter(rate)
+               rate: requests per second allowed to each host, None for no limit
+        '''
+        self.interval = 1 / rate if rate else 0
+        self.nextSlot = {}
+        self.lock = asyncio.Lock()
+
+    async def wait(self, url):
+        # reserve the host's next free slot, then sleep until it comes round
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.nextSlot.get(host, now))
+            self.nextSlot[host] = slot + self.interval
+        await asyncio.sleep(slot - now)
+
+
+async def geocodeAll(places, cache, baseURL=BASE_URL, concurrency=8, rate=2.0, gazetteer=None):
+    '''geocodeAll(places, cache, baseURL, concurrency, rate, gazetteer) -> list of (town, country, lat, long, status)
+            places     : list of (town, country)
+            cache      : PlaceCache
+            gazetteer  : optional Gazetteer searched before the cache and the web
+            baseURL    : town and country are appended to it
+            concurrency: most lookups in flight at once
+            rate       : requests per second to one host
+
+            status is 'gazetteer', 'cached', 'found', 'missing' or the error message.
+    '''
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(rate)
+    pending = {}  # one fetch per distinct place, however often it repeats
+
+    async def lookup(town, country):
+        async with slots:
+            url = placeURL(town, country, baseURL)
+            await limiter.wait(url)
+            try:
+                latLong = await loop.run_in_executor(executor, fetchLatLong, url)
+            except Exception as e:
+                return None, f'Uh oh, {e}'
+        cache.put(town, country, latLong)
+        return latLong, 'found' if latLong else 'missing'
+
+    results = []
+    for town, country in places:
+        latLong = gazetteer.forward(town, country) if gazetteer else None
+        if latLong is not None:
+            results.append((town, country, *latLong, 'gazetteer'))
+            continue
+        cached = cache.get(town, country)
+        if cached is not None:
+            results.append((town, country, *cached, 'cached'))
+            continue
+        key = placeKey(town, country)
+        if key not in pending:
+            pending[key] = asyncio.ensure_future(lookup(town, country))
+        results.append((town, country, key))
+
+    try:
+        if pending:
+            await asyncio.gather(*pending.values())
+    finally:
+        executor.shutdown(wait=False)
+        cache.commit()
+
+    for i, result in enumerate(results):
+        if len(result) == 3:
+            town, country, key = result
+            latLong, status = pending[key].result()
+            lat, long = latLong if latLong else (None, None)
+            results[i] = (town, country, lat, long, status)
+    return results
+
+
+def readPlaces(fileName):
+    '''readPlaces(fileName) -> list of (town, country)
+            Reads a CSV of town, country rows. A first row of
+            "town, country" is taken as a header.
+    '''
+    with open(fileName, newline='', encoding='utf-8-sig') as f:
+        rows = [row for row in csv.reader(f) if len(row) > 1 and row[0].strip()]
+    if rows and [cell.strip().casefold() for cell in rows[0][:2]] == ['town', 'country']:
+        rows = rows[1:]
+    return [(row[0].strip(), row[1].strip()) for row in rows]
+
+
+def geocodeFile(inputName, outputName='PlaceLatLong.csv', cachePath=CACHE, baseURL=BASE_URL,\
+                concurrency=8, rate=2.0, gazetteerDir=GAZETTEER):
+    '''geocodeFile(inputName, outputName, cachePath, baseURL, concurrency, rate, gazetteerDir) -> list of results
+            Geocodes every row of a town, country CSV and writes
+            town, country, latitude, longitude, status to outputName.
+            The gazetteer is used if gazetteerDir holds a built index.
+    '''
+    places = readPlaces(inputName)
+    gazetteer = openGazetteer(gazetteerDir) if gazetteerDir else None
+    with PlaceCache(cachePath) as cache:
+        results = asyncio.run(geocodeAll(places, cache, baseURL, concurrency, rate, gazetteer))
+
+    with open(outputName, 'w', newline='', encoding='utf-8') as f:
+        out = csv.writer(f)
+        out.writerow(['town', 'country', 'latitude', 'longitude', 'status'])
+        out.writerows(results)
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('usage: python geocode.py places.csv [results.csv] [baseURL]')
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    # positional on the command line, but the third is the base URL
+    results = geocodeFile(sys.argv[1], *sys.argv[2:3], baseURL=sys.argv[3] if len(sys.argv) > 3 else BASE_URL)
+    counts = {}
+    for result in results:
+        status = result[-1] if result[-1] in ('gazetteer', 'cached', 'found', 'missing') else 'error'
+        counts[status] = counts.get(status, 0) + 1
+    print(f'{len(results)} places in {time.perf_counter() - t0:.1f} s: {counts}')
+    print('all done')
@@ -0,0 +1,126 @@
+# Tool: Hash Join
+# Purpose: attach KPI measurements to features while they are written,
+#          instead of running management.JoinField over the output
+# Author: Nathan Wisla
+# Date: October 19, 2026
+
+# The join table is read once into a dict keyed on the join field. Many
+# measurements per key are reduced to one as they stream past, so memory
+# grows with the number of keys, not the number of measurements.
+#
+# Reductions (the value attached is a (date, value) pair):
+#   'latest' - the measurement with the latest date
+#   'first'  - the measurement with the earliest date
+#   'min'    - the lowest value, with its date
+#   'max'    - the highest value, with its date
+#   'mean'   - the mean value, with the latest date
+#   'count'  - the number of measurements, with the latest date
+#
+# Dates are compared as datetimes: CSV text is parsed with DATE_FORMATS
+# (or ISO 8601), so '10/2/2021' is later than '9/1/2021'.
+
+from datetime import date as Date, datetime, timezone
+
+# month first, as ArcGIS exports write dates
+DATE_FORMATS = ('%m/%d/%Y', '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y %I:%M:%S %p',\
+                '%m/%d/%Y %I:%M %p', '%Y/%m/%d', '%Y/%m/%d %H:%M:%S')
+
+
+def toNumber(value):
+    # CSV sources give text, arcpy sources give numbers
+    if value is None or value == '':
+        return None
+    return float(value)
+
+
+def toDate(value):
+    '''toDate(value) -> datetime or None
+            CSV sources give text, arcpy sources give datetimes. Time zone
+            aware dates become UTC, so all dates compare. A date that cannot
+            be parsed raises a ValueError instead of being compared as text.
+    '''
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    if isinstance(value, Date):
+        return datetime(value.year, value.month, value.day)
+    text = str(value).strip()
+    try:
+        return toDate(datetime.fromisoformat(text))
+    except ValueError:
+        pass
+    for dateFormat in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, dateFormat)
+        except ValueError:
+            continue
+    raise ValueError(f'cannot read {value!r} as a date')
+
+
+def buildJoinIndex(rows, reduction='latest'):
+    '''buildJoinIndex(rows, reduction) -> dict of key: (date, value)
+            rows     : iterable of (key, date, value), e.g. from
+                       readRows(joinTable, ['CELL', 'Date', 'RSSI'])
+            reduction: how many measurements of one key become one, see above
+
+            Builds the join index in a single pass over the join table.
+            Rows with no date or no value are ignored.
+    '''
+    index = {}
+
+    if reduction in ('latest', 'first'):
+        later = reduction == 'latest'
+        for key, date, value in rows:
+            date, value = toDate(date), toNumber(value)
+            if date is None or value is None:
+                continue
+            old = index.get(key)
+            if old is None or (date > old[0] if later else date < old[0]):
+                index[key] = (date, value)
+        return index
+
+    if reduction in ('min', 'max'):
+        higher = reduction == 'max'
+        for key, date, value in rows:
+            date, value = toDate(date), toNumber(value)
+            if date is None or value is None:
+                continue
+            old = index.get(key)
+            if old is None or (value > old[1] if higher else value < old[1])\
+                           or (value == old[1] and date > old[0]):
+                index[key] = (date, value)
+        return index
+
+    if reduction in ('mean', 'count'):
+        # accumulate [latest date, sum, count] then finish
+        for key, date, value in rows:
+            date, value = toDate(date), toNumber(value)
+            if date is None or value is None:
+                continue
+            acc = index.get(key)
+            if acc is None:
+                index[key] = [date, value, 1]
+            else:
+                if date > acc[0]:
+                    acc[0] = date
+                acc[1] += value
+                acc[2] += 1
+        if reduction == 'mean':
+            return {key: (acc[0], acc[1] / acc[2]) for key, acc in index.items()}
+        return {key: (acc[0], acc[2]) for key, acc in index.items()}
+
+    raise ValueError(f'unknown reduction: {reduction}')
+
+
+def joinColumns(keys, index):
+    '''joinColumns(keys, index) -> dates, values
+            keys : join key of every feature being written
+            index: from buildJoinIndex()
+
+            Gets the joined date and value columns in feature order. Features
+            with no match get None in both, like a JoinField with KEEP_ALL.
+    '''
+    missing = (None, None)
+    joined = [index.get(key, missing) for key in keys]
+    return [pair[0] for pair in joined], [pair[1] for pair in joined]
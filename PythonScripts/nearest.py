@@ -0,0 +1,121 @@
+#===================================================================
+# Name    : nearest.py
+# Purpose : to find the nearest facilities to many features with a
+#           KD-tree instead of arcpy.analysis.Near
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# The facilities are indexed once in a KD-tree over their projected
+# coordinates. For every feature (by its centroid) a query gives:
+#     NEAR_FID, NEAR_DIST       - the nearest facility and its distance,
+#                                 as arcpy.analysis.Near names them
+#     NEAR_FID_2, NEAR_DIST_2.. - the next nearest, up to k
+#     NEAR_1000M, NEAR_5000M... - how many facilities are within each
+#                                 distance band
+# Distances are in the units of the coordinate system, so both layers
+# need the same projected coordinate system (metres for the bands).
+# Unlike Near, the distance is measured from the feature's centroid, not
+# from its nearest edge.
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.spatial import cKDTree
+from featureio import readRows
+
+K = 1
+BANDS = (1000, 5000, 10000)   # distance bands in map units
+CHUNK = 100000
+
+
+class NearestFacilities():
+
+    def __init__(self, x, y, ids, k=K, bands=BANDS):
+        '''NearestFacilities(x, y, ids, k, bands)
+               x, y : facility coordinates, projected
+               ids  : facility ids reported as NEAR_FID (e.g. OBJECTID)
+               k    : number of nearest facilities reported
+               bands: distances to count facilities within
+        '''
+        self.xy = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+        self.ids = np.asarray(ids, dtype=float)
+        self.k = min(k, len(self.ids))
+        self.bands = tuple(bands)
+        self.tree = None
+
+    @classmethod
+    def fromTable(cls, table, k=K, bands=BANDS, where=None):
+        '''fromTable(table, k, bands, where) -> NearestFacilities
+               Reads the facility points (OID@, SHAPE@X, SHAPE@Y) of a table.
+        '''
+        rows = np.array(list(readRows(table, ['OID@', 'SHAPE@X', 'SHAPE@Y'], where)), dtype=float).reshape(-1, 3)
+        return cls(rows[:, 1], rows[:, 2], rows[:, 0], k, bands)
+
+    def __repr__(self):
+        return f'NearestFacilities({len(self.ids)} facilities, k={self.k}, bands={self.bands})'
+
+    def __getstate__(self):
+        # the tree is rebuilt where it is used rather than pickled to workers
+        state = self.__dict__.copy()
+        state['tree'] = None
+        return state
+
+    @property
+    def fields(self):
+        '''fields -> list of [field name, arcpy field type], in query() column order
+        '''
+        fields = []
+        for i in range(1, self.k + 1):
+            suffix = '' if i == 1 else f'_{i}'
+            fields += [[f'NEAR_FID{suffix}', 'LONG'], [f'NEAR_DIST{suffix}', 'DOUBLE']]
+        for band in self.bands:
+            # in map units, and without a '.' so it is a valid field name (NEAR_500M, NEAR_0_5M)
+            distance = f'{band:f}'.rstrip('0').rstrip('.').replace('.', '_')
+            fields.append([f'NEAR_{distance}M', 'LONG'])
+        return fields
+
+    def query(self, x, y):
+        '''query(x, y) -> array (rows, len(fields))
+               x, y: feature coordinates, in the facilities' coordinate system
+
+               Finds the k nearest facilities and the band counts of every
+               feature. Columns follow fields, NaN where there is no facility.
+        '''
+        xy = np.column_stack([np.asarray(x, dtype=float).ravel(), np.asarray(y, dtype=float).ravel()])
+        out = np.full((len(xy), len(self.fields)), np.nan)
+        if not len(self.ids):
+            out[:, 2 * self.k:] = 0
+            return out
+        if self.tree is None:
+            self.tree = cKDTree(self.xy)
+
+        distance, index = self.tree.query(xy, k=self.k)
+        distance, index = distance.reshape(len(xy), self.k), index.reshape(len(xy), self.k)
+        missing = index >= len(self.ids)   # a NaN centroid has no neighbour
+        out[:, 0:2 * self.k:2] = np.where(missing, np.nan, self.ids[np.minimum(index, len(self.ids) - 1)])
+        out[:, 1:2 * self.k:2] = np.where(missing, np.nan, distance)
+
+        for j, band in enumerate(self.bands):
+            out[:, 2 * self.k + j] = self.tree.query_ball_point(xy, band, return_length=True)
+        return out
+
+
+def queryChunk(near, xy):
+    # worker side of nearestTable()
+    return near.query(xy[:, 0], xy[:, 1])
+
+
+def nearestTable(near, x, y, chunkSize=CHUNK, workers=None):
+    '''nearestTable(near, x, y, chunkSize, workers) -> array (rows, len(near.fields))
+            near     : NearestFacilities
+            x, y     : feature coordinates
+            chunkSize: features per query chunk
+            workers  : processes the chunks are spread over, None for every core
+
+            Queries a large set of features in parallel chunks.
+    '''
+    xy = np.column_stack([np.asarray(x, dtype=float).ravel(), np.asarray(y, dtype=float).ravel()])
+    chunks = [xy[i:i + chunkSize] for i in range(0, len(xy), chunkSize)]
+    if len(chunks) < 2:
+        return near.query(xy[:, 0], xy[:, 1])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(queryChunk, [near] * len(chunks), chunks)))
@@ -0,0 +1,145 @@
+#===================================================================
+# Name    : pipeline.py
+# Purpose : to read, compute and write fixed-size blocks of rows at
+#           the same time, with a bounded number of blocks in memory
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# runPipeline() overlaps three stages:
+#     read    - a reader thread pulls (carry, payload) blocks from a
+#               generator into a bounded queue
+#     compute - a worker pool runs compute(payload) on each block
+#     write   - the calling thread writes write(carry, result) in the
+#               order the blocks were read
+# carry never leaves the calling process (geometries, cursor rows, ...)
+# and payload is all a worker sees, so with processes=True only the
+# payload (e.g. a NumPy array) is pickled.
+#
+# At most queueSize blocks wait to be computed and `workers` blocks are
+# being computed, so memory stays flat however large the input is.
+# Writing stays on the calling thread, where arcpy cursors and sqlite3
+# connections were opened.
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+BLOCK_SIZE = 10000   # rows per block
+WORKERS = 4
+QUEUE_SIZE = 4       # blocks read ahead of the workers
+DONE = object()
+
+
+class StageStats():
+
+    def __init__(self, name):
+        self.name = name
+        self.blocks = 0
+        self.rows = 0
+        self.seconds = 0.0   # time the stage was busy
+
+    def add(self, rows, seconds):
+        self.blocks += 1
+        self.rows += rows
+        self.seconds += seconds
+
+    def __repr__(self):
+        rate = self.rows / self.seconds if self.seconds else float('inf')
+        return f'{self.name:<8} {self.blocks:>6} blocks {self.rows:>10} rows '\
+               f'{self.seconds:>8.2f} s busy {rate:>12,.0f} rows/s'
+
+
+def timedCall(compute, payload):
+    # runs in the worker, so the compute time excludes queueing
+    t0 = time.perf_counter()
+    result = compute(payload)
+    return result, time.perf_counter() - t0
+
+
+def readAhead(blocks, inbox, stats, stop):
+    # reader thread: fill the bounded inbox until the blocks run out
+    try:
+        iterator = iter(blocks)
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                carry, payload = next(iterator)
+            except StopIteration:
+                break
+            stats.add(len(payload), time.perf_counter() - t0)
+            while not stop.is_set():
+                try:
+                    inbox.put((carry, payload), timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+        item = DONE
+    except BaseException as e:
+        item = e
+    while not stop.is_set():
+        try:
+            inbox.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+
+def runPipeline(blocks, compute, write, workers=WORKERS, queueSize=QUEUE_SIZE, processes=False, report=True):
+    '''runPipeline(blocks, compute, write, workers, queueSize, processes, report) -> dict of StageStats
+            blocks   : iterable of (carry, payload) blocks, e.g. from a cursor
+            compute  : compute(payload) -> result, run in the worker pool;
+                       must be picklable with processes=True
+            write    : write(carry, result), run on the calling thread in
+                       input order
+            workers  : size of the worker pool
+            queueSize: blocks read ahead of the workers
+            processes: use a process pool instead of a thread pool
+            report   : print the per-stage throughput when done
+
+            Returns the read, compute and write stats plus the total time.
+    '''
+    stats = {name: StageStats(name) for name in ('read', 'compute', 'write')}
+    inbox = queue.Queue(maxsize=queueSize)
+    stop = threading.Event()
+    reader = threading.Thread(target=readAhead, args=(blocks, inbox, stats['read'], stop), daemon=True)
+    Pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    inFlight = deque()
+
+    def writeOldest():
+        carry, future, rows = inFlight.popleft()
+        result, seconds = future.result()
+        stats['compute'].add(rows, seconds)
+        t0 = time.perf_counter()
+        write(carry, result)
+        stats['write'].add(rows, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    reader.start()
+    try:
+        with Pool(max_workers=workers) as pool:
+            while True:
+                item = inbox.get()
+                if item is DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                carry, payload = item
+                inFlight.append((carry, pool.submit(timedCall, compute, payload), len(payload)))
+                if len(inFlight) >= workers:
+                    writeOldest()
+            while inFlight:
+                writeOldest()
+    finally:
+        stop.set()
+        reader.join()
+    elapsed = time.perf_counter() - t0
+
+    if report:
+        for stage in stats.values():
+            print(stage)
+        rows = stats['write'].rows
+        print(f'{rows} rows in {elapsed:.2f} s = {rows / elapsed if elapsed else 0:,.0f} rows/s')
+    stats['elapsed'] = elapsed
+    return stats
@@ -0,0 +1,112 @@
+# Tool: Reverse Geocode
+# Purpose: label coordinates with their nearest populated place from the
+#          offline gazetteer, the reverse of GetPlaceLatLong.py
+# Author: Nathan Wisla
+# Date: October 19, 2026
+
+# Every place in the gazetteer (see gazetteer.py) is put on the unit sphere as
+# an (x, y, z) point and indexed in a KD-tree. The nearest place by straight
+# line (chord) through the sphere is also the nearest by great circle, so no
+# projection or longitude seam gets in the way, and the chord converts
+# exactly to a great circle distance.
+#
+# usage: python reversegeocode.py lat long [indexDir]
+
+import sys
+import numpy as np
+from scipy.spatial import cKDTree
+from gazetteer import GAZETTEER, Gazetteer
+
+EARTH_RADIUS = 6371008.8  # mean earth radius in metres
+CHUNK = 1000000
+
+
+def unitVectors(lat, lon):
+    '''unitVectors(lat, lon) -> array (n, 3)
+            Puts decimal degree coordinates on the unit sphere.
+    '''
+    phi = np.radians(np.asarray(lat, dtype=float).ravel())
+    lam = np.radians(np.asarray(lon, dtype=float).ravel())
+    cosPhi = np.cos(phi)
+    return np.column_stack([cosPhi * np.cos(lam), cosPhi * np.sin(lam), np.sin(phi)])
+
+
+def chordToMetres(chord, radius=EARTH_RADIUS):
+    # great circle distance from the straight line distance on the unit sphere
+    return 2 * radius * np.arcsin(np.minimum(np.asarray(chord) / 2, 1))
+
+
+def metresToChord(distance, radius=EARTH_RADIUS):
+    # straight line distance on the unit sphere from a great circle distance,
+    # so a chord radius query finds everything within that great circle distance
+    return 2 * np.sin(np.minimum(np.asarray(distance, dtype=float) / (2 * radius), np.pi / 2))
+
+
+class ReverseGeocoder():
+
+    def __init__(self, gazetteer=GAZETTEER, minPopulation=0):
+        '''ReverseGeocoder(gazetteer, minPopulation)
+               gazetteer    : Gazetteer, or the directory of one
+               minPopulation: only places at least this big are candidates
+        '''
+        self.gazetteer = gazetteer if isinstance(gazetteer, Gazetteer) else Gazetteer(gazetteer)
+        population = np.asarray(self.gazetteer.population)
+        self.places = np.flatnonzero(population >= minPopulation)
+        self.tree = cKDTree(unitVectors(self.gazetteer.lat[self.places], self.gazetteer.lon[self.places]))
+
+    def __repr__(self):
+        return f'ReverseGeocoder({len(self.places)} places)'
+
+    def nearest(self, lat, lon, k=1, chunkSize=CHUNK, workers=-1):
+        '''nearest(lat, lon, k, chunkSize, workers) -> place indices, distances in metres
+                lat, lon : arrays of coordinates in decimal degrees
+                k        : places per coordinate; with k > 1 the results have a
+                           column per neighbour, nearest first
+                chunkSize: coordinates converted and queried at a time, which
+                           bounds memory for very large inputs
+                workers  : threads each query runs on, -1 for every core
+
+                Place indices are rows of the gazetteer, see Gazetteer.place();
+                use ids() to get GeoNames ids.
+        '''
+        lat = np.asarray(lat, dtype=float).ravel()
+        lon = np.asarray(lon, dtype=float).ravel()
+        shape = (len(lat),) if k == 1 else (len(lat), k)
+        index = np.empty(shape, dtype=np.int64)
+        distance = np.empty(shape)
+
+        for start in range(0, len(lat), chunkSize):
+            chunk = slice(start, start + chunkSize)
+            chord, i = self.tree.query(unitVectors(lat[chunk], lon[chunk]), k=k, workers=workers)
+            index[chunk] = self.places[i]
+            distance[chunk] = chordToMetres(chord)
+        return index, distance
+
+    def ids(self, index):
+        # GeoNames ids of place indices
+        return np.asarray(self.gazetteer.ids)[index]
+
+    def names(self, index):
+        # display names of place indices
+        return [self.gazetteer.labels[i] for i in np.asarray(index).ravel()]
+
+
+def reverseGeocode(lat, lon, gazetteer=GAZETTEER, minPopulation=0, chunkSize=CHUNK, workers=-1):
+    '''reverseGeocode(lat, lon, gazetteer, minPopulation, chunkSize, workers) -> GeoNames ids, distances in metres
+            One-off reverse geocode of coordinate arrays: the nearest place to
+            each coordinate and how far away it is along a great circle.
+    '''
+    geocoder = ReverseGeocoder(gazetteer, minPopulation)
+    index, distance = geocoder.nearest(lat, lon, 1, chunkSize, workers)
+    return geocoder.ids(index), distance
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print('usage: python reversegeocode.py lat long [indexDir]')
+        sys.exit(1)
+
+    geocoder = ReverseGeocoder(sys.argv[3] if len(sys.argv) > 3 else GAZETTEER)
+    index, distance = geocoder.nearest([float(sys.argv[1])], [float(sys.argv[2])])
+    place = geocoder.gazetteer.place(index[0])
+    print(f'{place[1]}, {place[2]} (GeoNames {place[0]}) is {distance[0] / 1000:.1f} km away')
@@ -0,0 +1,252 @@
+# Tool: Sectors
+# Purpose: build the antenna sector (circle slice) vertices drawn by
+#          DrawArcPolygons.py for every antenna at once with NumPy, and
+#          find the measurement points that fall inside each sector
+# Author: Nathan Wisla
+# Date: October 19, 2026
+
+from functools import lru_cache
+import numpy as np
+
+# WGS84 ellipsoid, used to turn a radius in metres into degrees
+WGS84_A = 6378137.0
+WGS84_E2 = 6.69437999014e-3
+
+# the default sector matches arc() in DrawArcPolygons.py:
+# 0.003 degrees, 20 degrees either side of the azimuth, a vertex every 4 degrees
+RADIUS = 0.003
+HALF_BEAM = 20
+STEP = 4
+
+
+@lru_cache(maxsize=None)
+def unitTable(halfBeam=HALF_BEAM, step=STEP):
+    # cos/sin of every vertex offset from the sector's centre line.
+    # Built once per sector shape and shared by every call.
+    offsets = np.radians(np.arange(-halfBeam, halfBeam + 1, step, dtype=float))
+    table = np.stack([np.cos(offsets), np.sin(offsets)])
+    table.flags.writeable = False
+    return table
+
+
+def degreesPerMetre(lat):
+    # local geodesic scale: (degrees of longitude, degrees of latitude) per metre
+    phi = np.radians(lat)
+    w = 1 - WGS84_E2 * np.sin(phi) ** 2
+    meridional = WGS84_A * (1 - WGS84_E2) / w ** 1.5
+    primeVertical = WGS84_A / np.sqrt(w)
+    return np.degrees(1 / (primeVertical * np.cos(phi))), np.degrees(1 / meridional)
+
+
+def sectorVertices(lon, lat, azimuth, radius=RADIUS, units='degrees', halfBeam=HALF_BEAM, step=STEP):
+    '''sectorVertices(lon, lat, azimuth, radius, units, halfBeam, step) -> array (n, vertices, 2)
+            lon, lat: arrays of antenna positions in decimal degrees
+            azimuth : array of antenna orientations in degrees, clockwise from north
+            radius  : sector radius, a scalar or one per antenna
+            units   : 'degrees' (as drawn by arc()) or 'metres', which scales the
+                      radius by the local ellipsoid radii so sectors keep their
+                      true ground size at every latitude
+            halfBeam: half of the sector's opening angle in degrees
+            step    : angle between arc vertices in degrees
+
+            Builds every sector in one vectorized call. Each sector is the
+            antenna position followed by its arc vertices, the same polygon
+            DrawArcPolygons.py inserts.
+    '''
+    lon = np.asarray(lon, dtype=float).ravel()
+    lat = np.asarray(lat, dtype=float).ravel()
+    azimuth = np.asarray(azimuth, dtype=float).ravel()
+    radius = np.broadcast_to(np.asarray(radius, dtype=float), lon.shape)
+
+    if units == 'degrees':
+        rx = ry = radius
+    elif units == 'metres':
+        sx, sy = degreesPerMetre(lat)
+        rx, ry = radius * sx, radius * sy
+    else:
+        raise ValueError(f'unknown radius units: {units}')
+
+    # centre line of each sector as a math angle (counterclockwise from east);
+    # cos(centre + offset) and sin(centre + offset) come from the unit table by
+    # angle addition, so only two trig calls are made per antenna
+    cosTable, sinTable = unitTable(halfBeam, step)
+    centre = np.radians(90 - azimuth)
+    c, s = np.cos(centre)[:, None], np.sin(centre)[:, None]
+
+    vertices = np.empty((len(lon), len(cosTable) + 1, 2))
+    vertices[:, 0, 0] = lon
+    vertices[:, 0, 1] = lat
+    # offsets run from -halfBeam to +halfBeam, i.e. counterclockwise, as in arc()
+    vertices[:, 1:, 0] = lon[:, None] + rx[:, None] * (c * cosTable - s * sinTable)
+    vertices[:, 1:, 1] = lat[:, None] + ry[:, None] * (s * cosTable + c * sinTable)
+    return vertices
+
+
+class PointGrid():
+
+    def __init__(self, x, y, cellX, cellY):
+        '''PointGrid(x, y, cellX, cellY)
+               x, y        : arrays of point coordinates in decimal degrees
+               cellX, cellY: bucket size in degrees
+
+               Buckets points into a uniform grid. Only occupied buckets are
+               stored, so memory follows the number of points, not the extent.
+        '''
+        self.x = np.asarray(x, dtype=float).ravel()
+        self.y = np.asarray(y, dtype=float).ravel()
+        self.cellX, self.cellY = float(cellX), float(cellY)
+        self.x0, self.y0 = self.x.min(), self.y.min()
+        self.nx = int((self.x.max() - self.x0) // self.cellX) + 1
+
+        cells = self.cellId(self.x, self.y)
+        self.order = np.argsort(cells, kind='stable')
+        self.occupied, self.starts = np.unique(cells[self.order], return_index=True)
+        self.starts = np.append(self.starts, len(cells))
+
+    def cellIndex(self, x, y):
+        return ((np.asarray(x) - self.x0) // self.cellX).astype(np.int64),\
+               ((np.asarray(y) - self.y0) // self.cellY).astype(np.int64)
+
+    def cellId(self, x, y):
+        ix, iy = self.cellIndex(x, y)
+        return iy * self.nx + ix
+
+    def candidates(self, x, y):
+        '''candidates(x, y) -> query index, point index
+               x, y: arrays of query positions
+
+               Gets every (query, point) pair where the point lies in the 3 x 3
+               block of buckets around the query, i.e. every point within one
+               bucket size of it.
+        '''
+        ix, iy = self.cellIndex(x, y)
+        offsets = np.arange(-1, 2)
+        cx = (ix[:, None, None] + offsets[None, None, :]).repeat(3, axis=1).reshape(len(ix), 9)
+        cy = (iy[:, None, None] + offsets[None, :, None]).repeat(3, axis=2).reshape(len(iy), 9)
+        inside = (cx >= 0) & (cx < self.nx) & (cy >= 0)
+        ids = np.where(inside, cy * self.nx + cx, -1)
+
+        pos = np.searchsorted(self.occupied, ids)
+        pos = np.minimum(pos, len(self.occupied) - 1)
+        found = inside & (self.occupied[pos] == ids)
+
+        start = np.where(found, self.starts[pos], 0).ravel()
+        count = np.where(found, self.starts[pos + 1] - self.starts[pos], 0).ravel()
+        query = np.repeat(np.arange(len(ix)), 9)
+
+        total = count.sum()
+        pairQuery = np.repeat(query, count)
+        # position of every pair inside its bucket's run of sorted points
+        runStart = np.repeat(np.cumsum(count) - count, count)
+        pairPos = np.repeat(start, count) + np.arange(total) - runStart
+        return pairQuery, self.order[pairPos]
+
+
+def assignPoints(px, py, values, lon, lat, azimuth, radius=RADIUS, units='degrees',\
+                 halfBeam=HALF_BEAM, chunkSize=20000, returnPairs=False):
+    '''assignPoints(px, py, values, lon, lat, azimuth, radius, units, halfBeam, chunkSize, returnPairs) -> dict
+            px, py     : arrays of measurement positions in decimal degrees
+            values     : array of measurement values (e.g. RSSI), NaN to count only
+            lon, lat   : arrays of antenna positions
+            azimuth    : array of antenna orientations, clockwise from north
+            radius     : sector radius, a scalar or one per antenna
+            units      : 'degrees' or 'metres', as in sectorVertices()
+            halfBeam   : half of the sector's opening angle in degrees
+            chunkSize  : sectors tested at a time, bounds memory use
+            returnPairs: also return the (sector, point) index of every hit
+
+            Finds which measurements fall inside which antenna's sector. The
+            points are bucketed into a grid once; each sector then tests only
+            the points in nearby buckets, by distance and by bearing against
+            azimuth +/- halfBeam, instead of intersecting polygons. A point
+            inside several sectors counts for each of them.
+
+            Returns per-sector arrays 'count', 'sum', 'mean', 'min' and 'max'
+            of the values (NaN where a sector has no values).
+    '''
+    px = np.asarray(px, dtype=float).ravel()
+    py = np.asarray(py, dtype=float).ravel()
+    values = np.broadcast_to(np.asarray(values, dtype=float), px.shape)
+    lon = np.asarray(lon, dtype=float).ravel()
+    lat = np.asarray(lat, dtype=float).ravel()
+    azimuth = np.asarray(azimuth, dtype=float).ravel()
+    radius = np.broadcast_to(np.asarray(radius, dtype=float), lon.shape)
+    n = len(lon)
+
+    if units == 'degrees':
+        sx = sy = np.ones(n)
+    elif units == 'metres':
+        sx, sy = degreesPerMetre(lat)
+    else:
+        raise ValueError(f'unknown radius units: {units}')
+
+    count = np.zeros(n, dtype=np.int64)
+    total = np.zeros(n)
+    valued = np.zeros(n, dtype=np.int64)
+    low = np.full(n, np.inf)
+    high = np.full(n, -np.inf)
+    pairs = []
+
+    if len(px) and n:
+        # a bucket at least as large as the largest sector, so the 3 x 3
+        # block around an antenna always covers its whole sector
+        grid = PointGrid(px, py, max((radius * sx).max(), 1e-12), max((radius * sy).max(), 1e-12))
+
+        for c0 in range(0, n, chunkSize):
+            chunk = slice(c0, min(n, c0 + chunkSize))
+            sector, point = grid.candidates(lon[chunk], lat[chunk])
+            sector += c0
+
+            # offsets in the sector's own units: degrees, or local metres
+            dx = (px[point] - lon[sector]) / sx[sector]
+            dy = (py[point] - lat[sector]) / sy[sector]
+            bearing = np.degrees(np.arctan2(dx, dy))
+            offAxis = np.abs((bearing - azimuth[sector] + 180) % 360 - 180)
+            hit = (np.hypot(dx, dy) <= radius[sector]) & (offAxis <= halfBeam)
+            sector, point = sector[hit], point[hit]
+
+            count += np.bincount(sector, minlength=n)
+            v = values[point]
+            ok = ~np.isnan(v)
+            total += np.bincount(sector[ok], v[ok], minlength=n)
+            valued += np.bincount(sector[ok], minlength=n)
+            np.minimum.at(low, sector[ok], v[ok])
+            np.maximum.at(high, sector[ok], v[ok])
+            if returnPairs:
+                pairs.append((sector, point))
+
+    empty = valued == 0
+    result = {'count': count,
+              'sum': total,
+              'mean': np.where(empty, np.nan, total / np.maximum(valued, 1)),
+              'min': np.where(empty, np.nan, low),
+              'max': np.where(empty, np.nan, high)}
+    if returnPairs:
+        result['pairs'] = (np.concatenate([p[0] for p in pairs]) if pairs else np.zeros(0, np.int64),
+                           np.concatenate([p[1] for p in pairs]) if pairs else np.zeros(0, np.int64))
+    return result
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+
+    n = 500000
+    rng = np.random.default_rng(0)
+    lon, lat, azimuth = rng.uniform(-140, -50, n), rng.uniform(42, 70, n), rng.uniform(0, 360, n)
+
+    for units, radius in (('degrees', RADIUS), ('metres', 300)):
+        t0 = perf_counter()
+        vertices = sectorVertices(lon, lat, azimuth, radius, units)
+        elapsed = perf_counter() - t0
+        print(f'{units}: {n} sectors of {vertices.shape[1]} vertices in {elapsed:.3f} s '\
+              f'= {n / elapsed:,.0f} sectors/second')
+
+    nPoints, nSectors = 2000000, 20000
+    px, py = rng.uniform(-64, -63, nPoints), rng.uniform(44, 45, nPoints)
+    rssi = rng.uniform(-120, -50, nPoints)
+    t0 = perf_counter()
+    stats = assignPoints(px, py, rssi, lon[:nSectors] % 1 - 64, lat[:nSectors] % 1 + 44,\
+                         azimuth[:nSectors], 300, 'metres')
+    elapsed = perf_counter() - t0
+    print(f'{nPoints} points into {nSectors} sectors in {elapsed:.3f} s, '\
+          f'{stats["count"].sum()} hits')
@@ -7,27 +7,60 @@
 #===================================================================
 
 from arcpy import *
+import os
+import sys
+
+# featureio.py is shared with the scripts in PythonScripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PythonScripts'))
+from featureio import openWriter
+from parameters import parseDistances
+from proximity import readPoints, nearestDistances, coverageCurve, catchments, checkMode
 
 
 class DistanceWithin():
 
-    def __init__(self, ws, storeFC, custFC, searchDist):
-        '''DistanceWithin(ws, storeFC, custFC, searchDist)
+    def __init__(self, ws, storeFC, custFC, searchDist, storeTable=False, mode=''):
+        '''DistanceWithin(ws, storeFC, custFC, searchDist, storeTable, mode)
            A class that calculates the percent count of all feature classes (custFC)
            within a specified radius of another class (storeFC).
+           searchDist can also be a list of distances, which makes a coverage
+           curve: one row per distance, all from one nearest store search.
+           With storeTable, a StoreCatchments table also gets the customers
+           within every distance of each store, exclusive and shared.
+           mode is PLANAR or GEODESIC (great circle kilometres, for
+           longitude/latitude data); left empty, it is GEODESIC when
+           storeFC has a geographic coordinate system. Both layers are
+           read in one coordinate system: WGS84 for GEODESIC, the store
+           layer's for PLANAR.
         '''
 
         self.storeFC = storeFC
         self.custFC = custFC
-        self.searchDist = searchDist
+        self.distances = list(searchDist) if isinstance(searchDist, (list, tuple)) else [searchDist]
+        self.searchDist = self.distances[0] if len(self.distances) == 1 else self.distances
         tableName = 'PercentWithinDistance'
 
         self.SetEnv(ws)
+        self.mode = self.DistanceMode(mode)
+        self.spatialRef = self.DistanceSpatialReference()
 
         # ======================================================
-        self.percent = self.SelectPercent()
-        fields, self.fieldsMsg = self.cr_table(tableName,['DISTANCE_KM','LONG'],['PERCENT','DOUBLE'])
-        self.insertMsg = self.InsertInto(tableName, fields, searchDist, self.percent)
+        if len(self.distances) == 1:
+            self.percent = self.SelectPercent()
+            fields, self.fieldsMsg = self.cr_table(tableName,['DISTANCE_KM','DOUBLE'],['PERCENT','DOUBLE'])
+            self.insertMsg = self.InsertInto(tableName, fields, self.searchDist, self.percent)
+        else:
+            self.counts, self.percent = self.CoverageCurve()
+            fields, self.fieldsMsg = self.cr_table(tableName,['DISTANCE_KM','DOUBLE'],['PERCENT','DOUBLE'],['CUSTOMERS','LONG'])
+            self.insertMsg = self.InsertRows(tableName, fields,\
+                                             zip(self.distances, self.percent.tolist(), self.counts.tolist()))
+
+        self.catchmentMsg = ''
+        if storeTable:
+            rows = self.StoreCatchments()
+            fields, fieldsMsg = self.cr_table('StoreCatchments',['STORE_FID','LONG'],['DISTANCE_KM','DOUBLE'],\
+                                              ['CUSTOMERS','LONG'],['EXCLUSIVE','LONG'],['SHARED','LONG'])
+            self.catchmentMsg = fieldsMsg + self.InsertRows('StoreCatchments', fields, rows)
 
         
     def SetEnv(self, ws):
@@ -35,6 +68,35 @@ class DistanceWithin():
         env.scratchWorkspace = ws
         env.overwriteOutput = True
 
+    # Planar distances need projected data; geographic data
+    # is measured along great circles instead.
+    def DistanceMode(self, mode):
+        '''DistanceMode(mode) -> PLANAR or GEODESIC
+           Returns the given mode, or picks one from the store
+               feature class's coordinate system.
+        '''
+        if mode:
+            return checkMode(mode)
+        spatialRef = Describe(self.storeFC).spatialReference
+        return 'GEODESIC' if spatialRef.type == 'Geographic' else 'PLANAR'
+
+    # The customers are read in the stores' coordinate system (or
+    # WGS84), whatever coordinate system they are stored in.
+    def DistanceSpatialReference(self):
+        '''DistanceSpatialReference() -> SpatialReference
+           Returns the coordinate system both layers are read in: WGS84
+               for GEODESIC, the store feature class's for PLANAR, which
+               must then be projected.
+        '''
+        if self.mode == 'GEODESIC':
+            return SpatialReference(4326)
+        spatialRef = Describe(self.storeFC).spatialReference
+        if spatialRef.type == 'Geographic':
+            raise ValueError(f'PLANAR distances need a projected store feature class, {self.storeFC} is in '\
+                             f'{spatialRef.name}; use GEODESIC or project it first')
+        return spatialRef
+
+
     # Calculate the percent of customers within a
     # given distance of a particular store.
     def SelectPercent(self):
@@ -50,11 +112,16 @@ class DistanceWithin():
         # get the total count first
         total = int(management.GetCount(custFC)[0])
 
+        if self.mode == 'GEODESIC':
+            overlap, withinDist = 'WITHIN_A_DISTANCE_GEODESIC', f'{withinDist} Kilometers'
+        else:
+            overlap, withinDist = 'WITHIN_A_DISTANCE', withinDist*1000
+
         selection = management.SelectLayerByLocation(\
             custFC,\
-            'WITHIN_A_DISTANCE',\
+            overlap,\
             storeFC,\
-            withinDist*1000)
+            withinDist)
 
         # get the count of selected features
         selCount = int(management.GetCount(selection)[0])
@@ -62,49 +129,106 @@ class DistanceWithin():
         return selCount / total * 100
 
 
+    # Calculate the percent of customers within each of many
+    # distances of their nearest store.
+    def CoverageCurve(self):
+        '''CoverageCurve() -> counts, percents
+           Finds the nearest store of every customer once with a KD-tree,
+               then reads the count within every search distance off the
+               sorted distances (see proximity.py).
+        '''
+        # clear any selections that may have been made
+        management.SelectLayerByAttribute(self.custFC,'CLEAR_SELECTION')
+        distances = nearestDistances(readPoints(self.storeFC, spatialReference=self.spatialRef),\
+                                     readPoints(self.custFC, spatialReference=self.spatialRef), self.mode)
+        return coverageCurve(distances, [d * 1000 for d in self.distances])
+
+
+    # Count the customers within each distance of every store,
+    # and how many of them no other store reaches.
+    def StoreCatchments(self):
+        '''StoreCatchments() -> rows
+           Ball-queries every store against a KD-tree of the customers in a
+               process pool (see proximity.py), one row per store and distance:
+               [store id, distance, customers, exclusive, shared]
+               Run in-process in ArcGIS Pro the workers are started with the
+               environment's python.exe, as ArcGISPro.exe cannot be one; if
+               that is missing they fall back to threads, which is slower.
+        '''
+        management.SelectLayerByAttribute(self.custFC,'CLEAR_SELECTION')
+        ids, stores = readPoints(self.storeFC, ids=True, spatialReference=self.spatialRef)
+        customers = readPoints(self.custFC, spatialReference=self.spatialRef)
+        # every distance from one pool and one ball query per store
+        within, exclusive, shared = catchments(stores, customers, [d * 1000 for d in self.distances], mode=self.mode)
+        rows = []
+        for i, distance in enumerate(self.distances):
+            rows += zip(ids.tolist(), [distance] * len(ids), within[i].tolist(), exclusive[i].tolist(), shared[i].tolist())
+        return rows
+
+
     # create a table to store the data
     # uses *args to insert all fields as pairs:
     #                                   [field name, field datatype]
+    # the workspace can also be a .gpkg file (see featureio.py)
     def cr_table(self, tableName,*fields):
         '''cr_table(tableName, *fields) -> fields, msg
            Creates a table and populates it with fields inputted as
                pairs of [field name, field datatype]
         '''
 
-        management.CreateTable(ws,tableName)
+        self.writer = openWriter(ws, tableName, None, fields)
         msg = f'CREATED TABLE {tableName} WITH FIELDS\n----------------\n'
         
         for field in fields:
-            management.AddField(tableName, field[0], field[1])
             msg += f'{field[0]}: {field[1]}\n'
 
         return [field[0] for field in fields], msg
 
 
-    # create an insert cursor to make new rows
-    # use with__as to create a temporary cursor so it doesn't need to be deleted
+    # write the new rows through the writer opened by cr_table
+    # use with__as so the writer is closed when done
     def InsertInto(self, tableName, fields, *rowContents):
         '''InsertInto(tableName, fields, *rowContents) -> msg
            Inserts rows into an empty table, outputs a success message
         '''
-        with da.InsertCursor(tableName, fields) as cursor:
-            cursor.insertRow(rowContents)
+        with self.writer as writer:
+            writer.insertRow(rowContents)
         
         msg = 'Insert successful!\n'
         return msg
 
 
+    # write many rows in one pass through the writer opened by cr_table
+    def InsertRows(self, tableName, fields, rows):
+        '''InsertRows(tableName, fields, rows) -> msg
+           Inserts many rows into an empty table, outputs a success message
+        '''
+        with self.writer as writer:
+            writer.insertRows(rows)
+
+        msg = f'Insert successful! {self.writer.count} rows\n'
+        return msg
+
+
     def __repr__(self):
         aStr = ''
         aStr += f'Searching for features in {self.custFC} within \n'\
-                f'{self.searchDist} km of selected {self.storeFC}...\n\n'
+                f'{self.searchDist} km of selected {self.storeFC} ({self.mode.lower()})...\n\n'
 
         aStr += self.fieldsMsg
         aStr += f'Inserting rows... {self.insertMsg}\n'
         aStr += 'script complete!'
 
-        aStr += f'\n\n{self.percent:.2f} percent of the {self.custFC} features were selected\n'\
-                f'in this operation.'
+        if len(self.distances) == 1:
+            aStr += f'\n\n{self.percent:.2f} percent of the {self.custFC} features were selected\n'\
+                    f'in this operation.'
+        else:
+            aStr += f'\n\npercent of the {self.custFC} features within each distance:\n'
+            for distance, percent in zip(self.distances, self.percent):
+                aStr += f'{distance:>8} km: {percent:6.2f}\n'
+
+        if self.catchmentMsg:
+            aStr += f'\n\n{self.catchmentMsg}'
 
         return aStr
 
@@ -112,12 +236,17 @@ class DistanceWithin():
 #============================================================================
 # run the script
 
-ws = GetParameterAsText(0)
-storeFC = GetParameterAsText(1)
-custFC = GetParameterAsText(2)
-searchDist = int(GetParameterAsText(3))
-
-search = DistanceWithin(ws, storeFC, custFC, searchDist)
-AddMessage(search)
+# the catchment workers import this module, so only run it as a script
+if __name__ == '__main__':
+    ws = GetParameterAsText(0)
+    storeFC = GetParameterAsText(1)
+    custFC = GetParameterAsText(2)
+    searchDist = parseDistances(GetParameterAsText(3)) # 5, or 1;5;10, or 1-50 for a curve
+    searchDist = searchDist[0] if len(searchDist) == 1 else searchDist
+    storeTable = GetParameterAsText(4).lower() == 'true' # optional per-store catchment table
+    mode = GetParameterAsText(5) # PLANAR or GEODESIC, empty to pick from the coordinate system
+
+    search = DistanceWithin(ws, storeFC, custFC, searchDist, storeTable, mode)
+    AddMessage(search)
 
 
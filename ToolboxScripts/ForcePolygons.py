@@ -14,7 +14,18 @@
 
 
 import arcpy
-from json import loads
+import os
+import sys
+from itertools import islice
+import numpy as np
+
+# featureio.py is shared with the scripts in PythonScripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PythonScripts'))
+from featureio import openWriter, readRows, tableFields
+from ringarray import RingArray
+from controlpoints import ControlTransform
+
+BATCH_SIZE = 10000   # polygons read, moved and written at a time
 
 class ForcePolygons:
     
@@ -27,7 +38,7 @@ class ForcePolygons:
         '''
         self.sr = arcpy.SpatialReference(srid)
         self.OldShape = shape
-        self.centroid, self.coords = self.__ExtractCoordinates()
+        self.centroid, self.rings = self.__ExtractCoordinates()
         self.XY = (newX,newY)
         self.NewShape = self.__GeneratePolygon()
 
@@ -37,71 +48,18 @@ class ForcePolygons:
         return aStr
 
     def __GeneratePolygon(self):
-        RelativeShape = arcpy.Polygon(self.__RelativizeCoordinates(self.coords))
-        RelativeCoords = loads(RelativeShape.JSON)['rings']
-        AbsoluteCoords = self.__AbsolutizeCoordinates(RelativeCoords)
-        AbsoluteShape = arcpy.Polygon(AbsoluteCoords,self.sr)
-        return AbsoluteShape
-
-    def __AbsolutizeCoordinates(self, array):
-        '''A recursive method for taking relative coordinates and placing them relative to a new centroid on the canvas.
-                array: an iterable of coordinates
-        '''
-        if self.__is_iterable(array):
-            array = list(array)
-            coords = []
-            
-            for i in range(len(array)):
-                if self.__is_iterable(array[i]):
-                    array[i] = self.__AbsolutizeCoordinates(array[i])
-                else:
-                    coords.append(array[i] + self.XY[i])
-            if coords:
-                array = arcpy.Point(*coords)
-            else:
-                array = arcpy.Array(array)
-            
-            return array
+        # one array shift of every vertex, rebuilt as a geometry once
+        self.rings.translate(self.XY[0] - self.centroid[0], self.XY[1] - self.centroid[1])
+        return arcpy.FromWKB(bytearray(self.rings.toWKB()[0]), self.sr)
 
     def __ExtractCoordinates(self):
         shape = self.OldShape
         if isinstance(shape, arcpy.Polygon):
             centroid = (shape.centroid.X, shape.centroid.Y)
-            coords = loads(shape.JSON)['rings']
         else:
             centroid = shape.centroid
-            coords = shape.coordinates()
-        return centroid, coords 
-
-    def __is_iterable(self, obj):
-        try:
-            iter(obj)
-        except:
-            #not iterable
-            return False
-        else:
-            #iterable
-            return True
-    
-    def __RelativizeCoordinates(self, array):
-        '''A recursive method for taking coordinates and placing them relative to a centroid
-                array: an iterable of coordinates
-        '''
-        if self.__is_iterable(array):
-            array = list(array)
-            coords = []
-            
-            for i in range(len(array)):
-                if self.__is_iterable(array[i]):
-                    array[i] = self.__RelativizeCoordinates(array[i])
-                else:
-                    coords.append(array[i] - self.centroid[i])
-            if coords:
-                array = arcpy.Point(*coords)
-            else:
-                array = arcpy.Array(array)
-            
-            return array
+        rings = RingArray.fromWKB([bytes(shape.WKB)])
+        return centroid, rings
     
 class Parameters:
     def __init__(self, inputList):
@@ -157,32 +115,159 @@ def Message(*args):
     else: 
         arcpy.AddMessage(args[0])
 
+def PolygonBatches(table, fields, batchSize=BATCH_SIZE):
+    '''PolygonBatches(table, fields, batchSize) reads a feature class (or GeoPackage layer) batchSize rows at a time,
+    the polygons of each batch going into one RingArray, so memory stays the same however big the table is.
+
+    :param: table
+    :param: fields: attribute fields read after the geometry
+    :param: batchSize
+    :returns: generator of (rows, indices of the rows with a geometry, RingArray, (n, 2) array of centroids)'''
+    gpkg = '.gpkg' in table.lower()
+    rows = readRows(table, (['SHAPE@'] if gpkg else ['SHAPE@WKB', 'SHAPE@XY']) + fields)
+    while True:
+        block = list(islice(rows, batchSize))
+        if not block:
+            return
+        shapes = [i for i, row in enumerate(block) if row[0] is not None]
+        rings = RingArray.fromWKB(block[i][0] for i in shapes)
+        if gpkg:
+            centroids = rings.centroids()
+        else:
+            centroids = np.array([block[i][1] for i in shapes], dtype=float).reshape(-1, 2)
+        yield block, shapes, rings, centroids
+
+def CenterMove(X, Y):
+    '''CenterMove(X, Y) makes a move that puts every polygon's centroid on (X, Y), as one array shift per batch.
+
+    :param: X, Y: the new center
+    :returns: move(rings, centroids)'''
+    def move(rings, centroids):
+        rings.translate(X - centroids[:, 0], Y - centroids[:, 1])
+    return move
+
+def ControlMove(transform):
+    '''ControlMove(transform) makes a move that puts every vertex through a transform fitted to control points,
+    as one matrix product per batch.
+
+    :param: transform: ControlTransform
+    :returns: move(rings, centroids)'''
+    def move(rings, centroids):
+        rings.transform(transform.matrix)
+    return move
+
+def MovePolygons(table, writer, move, fields, batchSize=BATCH_SIZE):
+    '''MovePolygons(table, writer, move, fields, batchSize) moves every polygon and writes it, with its attributes,
+    to a new feature class one batch at a time. Each batch is moved with one array operation, and the
+    geometries are only rebuilt (from WKB) as they are written.
+
+    :param: table
+    :param: writer: open polygon writer with the same fields
+    :param: move: CenterMove or ControlMove
+    :param: fields: attribute fields carried through
+    :param: batchSize
+    :returns: number of rows written'''
+    skip = 1 if '.gpkg' in table.lower() else 2   # geometry fields ahead of the attributes
+    count = 0
+    for block, shapes, rings, centroids in PolygonBatches(table, fields, batchSize):
+        move(rings, centroids)
+        geometries = [None] * len(block)
+        for i, wkb in zip(shapes, rings.toWKB()):
+            geometries[i] = wkb
+        writer.insertRows([geometry, *row[skip:]] for geometry, row in zip(geometries, block))
+        count += len(block)
+        Message(f'{count} polygons moved...')
+    return count
+
+def EditWorkspace(table):
+    '''EditWorkspace(table) finds the workspace (geodatabase or folder) an edit session on the table is started in,
+    above any feature dataset.
+
+    :param: table
+    :returns: workspace path'''
+    workspace = os.path.dirname(arcpy.Describe(table).catalogPath)
+    while arcpy.Describe(workspace).dataType not in ('Workspace', 'Folder'):
+        workspace = os.path.dirname(workspace)
+    return workspace
+
+def MoveInPlace(table, move, batchSize=BATCH_SIZE):
+    '''MoveInPlace(table, move, batchSize) moves every polygon in the feature class itself, batchSize at a time.
+    A search cursor reads each batch of shapes and centroids into one RingArray, the batch is moved with one
+    array operation, and an update cursor over the batch's object id range writes back the rows of that batch,
+    matched by object id, so the two cursors never need to see the rows in the same order. The whole run is one
+    edit session: if anything fails, every batch already written is rolled back.
+
+    :param: table
+    :param: move: CenterMove or ControlMove
+    :param: batchSize
+    :returns: number of polygons moved'''
+    describe = arcpy.Describe(table)
+    oidField = arcpy.AddFieldDelimiters(table, describe.OIDFieldName)
+    count = 0
+    with arcpy.da.Editor(EditWorkspace(table)),\
+         arcpy.da.SearchCursor(table, ['OID@', 'SHAPE@WKB', 'SHAPE@XY']) as sc:
+        while True:
+            block = list(islice(sc, batchSize))
+            if not block:
+                return count
+            shapes = [row for row in block if row[1] is not None]
+            if not shapes:
+                continue
+            rings = RingArray.fromWKB(row[1] for row in shapes)
+            move(rings, np.array([row[2] for row in shapes], dtype=float).reshape(-1, 2))
+            moved = dict(zip((row[0] for row in shapes), rings.toWKB()))
+
+            where = f'{oidField} >= {min(moved)} AND {oidField} <= {max(moved)}'
+            with arcpy.da.UpdateCursor(table, ['OID@', 'SHAPE@'], where) as uc:
+                for oid, _ in uc:
+                    if oid in moved:
+                        uc.updateRow([oid, arcpy.FromWKB(bytearray(moved.pop(oid)), describe.spatialReference)])
+            if moved:
+                # raised inside the edit session, so nothing is left half moved
+                raise RuntimeError(f'{table} changed while its polygons were being moved')
+            count += len(shapes)
+            Message(f'{count} polygons moved...')
+
 params = [
     'old_fc',
     'new_fc',
-    'newCenter'
+    'newCenter',
+    'controlPoints',
+    'transform'
 ]
 
 params = Parameters(params)
 ws = arcpy.env.workspace
 sr = arcpy.SpatialReference(3005)
-xy = params.newCenter.value.split(' ')# arcgis point parameter object is a text string of X,Y separated by a space.
-X,Y = [float(val) for val in xy]
-
 
-Message('Creating new feature class...')
-fc = arcpy.Describe(arcpy.management.CreateFeatureclass(ws,params.new_fc.value.split('\\')[-1],'POLYGON',spatial_reference=sr))
+# control points (a table, or 'x y x2 y2;...' pairs) correct scale and rotation
+# as well; without them every polygon is centered on newCenter
+if params.controlPoints.value:
+    transform = ControlTransform.fromControlPoints(params.controlPoints.value, params.transform.value or 'AFFINE')
+    Message(transform)
+    move = ControlMove(transform)
+    destination = f'by the {transform.kind.lower()} transform'
+else:
+    xy = params.newCenter.value.split(' ')# arcgis point parameter object is a text string of X,Y separated by a space.
+    X,Y = [float(val) for val in xy]
+    move = CenterMove(X, Y)
+    destination = f'to ({X}, {Y})'
 
-Message('Extracting polygons from old feature class...')
-with arcpy.da.SearchCursor(params.old_fc.value, ['SHAPE@']) as sc:
-    polygons = [row[0] for row in sc]
+if params.new_fc.value:
+    Message('Creating new feature class...')
+    # new_fc may also be a layer in a .gpkg file, e.g. C:\data\moved.gpkg\polygons
+    fields = tableFields(params.old_fc.value)
+    newWS, newName = os.path.split(params.new_fc.value)
+    writer = openWriter(newWS if newWS.lower().endswith('.gpkg') else ws, newName, 'POLYGON', fields, sr)
 
-# Future: use an update cursor on the old feature class
-Message('Moving Polygons to new feature class...')
-with arcpy.da.InsertCursor(fc.name, ['SHAPE@']) as ic:
-    for polygon in polygons:
-        f = ForcePolygons(polygon,X, Y)
-        Message(f)
-        ic.insertRow([f.NewShape])
+    # the old feature class is streamed through in batches, attributes and all
+    Message('Moving Polygons to new feature class...')
+    with writer as ic:
+        count = MovePolygons(params.old_fc.value, ic, move, [field[0] for field in fields])
+else:
+    # no new feature class: the old one is updated in place
+    Message('Moving Polygons in place...')
+    count = MoveInPlace(params.old_fc.value, move)
+Message(f'{count} polygons moved {destination}')
 
 Message('Done!')
\ No newline at end of file
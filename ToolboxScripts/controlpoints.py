@@ -0,0 +1,118 @@
+#===================================================================
+# Name    : controlpoints.py
+# Purpose : to fit an affine or similarity transform to pairs of
+#           ground control points, so ForcePolygons can correct the
+#           scale and rotation of misprojected data, not just its place
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# A control point pairs where a spot is in the bad data (source x, y)
+# with where it should be (target x, y). The transform is fitted by
+# least squares over every pair at once:
+#     AFFINE     - x' = a x + b y + c, y' = d x + e y + f: scale, rotation
+#                  and shear, needs 3 points not on one line
+#     SIMILARITY - x' = s x - r y + c, y' = r x + s y + f: one scale and a
+#                  rotation only, needs 2 points
+# Each pair's residual is how far the fitted transform puts its source
+# point from its target point. The fit is a 2 x 3 matrix, applied to any
+# number of vertices in one matrix product.
+#
+# Control points come as a table with the fields of CONTROL_FIELDS (CSV,
+# GeoPackage layer or arcpy table), or as text of source and target
+# pairs: 'x y x2 y2;x y x2 y2;...' (an ArcGIS value table parameter).
+
+import os
+import sys
+import numpy as np
+
+# featureio.py is shared with the scripts in PythonScripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PythonScripts'))
+from featureio import readRows
+
+CONTROL_FIELDS = ['SOURCE_X', 'SOURCE_Y', 'TARGET_X', 'TARGET_Y']
+TRANSFORMS = {'AFFINE': 3, 'SIMILARITY': 2}   # transform: least control points
+
+
+def readControlPoints(controlPoints):
+    '''readControlPoints(controlPoints) -> source (n, 2), target (n, 2)
+           controlPoints: a table with CONTROL_FIELDS, or text of
+                          'source x, source y, target x, target y' groups
+                          separated by semicolons
+    '''
+    text = str(controlPoints).strip()
+    if os.path.splitext(text)[1].lower() == '.csv' or '.gpkg' in text.lower() or os.path.exists(text):
+        points = np.array(list(readRows(text, CONTROL_FIELDS)), dtype=float)
+    else:
+        points = np.array([group.replace(',', ' ').split() for group in text.split(';') if group.strip()],\
+                          dtype=float)
+    points = points.reshape(-1, 4)
+    return points[:, :2], points[:, 2:]
+
+
+def fitMatrix(source, target, kind='AFFINE'):
+    '''fitMatrix(source, target, kind) -> (2, 3) matrix
+           Least squares fit of an AFFINE or SIMILARITY transform taking
+           the source points to the target points.
+    '''
+    # solved about the points' means, which keeps large projected
+    # coordinates well conditioned, then shifted back
+    sourceMean, targetMean = source.mean(axis=0), target.mean(axis=0)
+    x, y = (source - sourceMean).T
+    target = target - targetMean
+    if kind == 'AFFINE':
+        # both target coordinates solved at once against [x y]
+        solution, _, rank, _ = np.linalg.lstsq(np.column_stack([x, y]), target, rcond=None)
+        if rank < 2:
+            raise ValueError('AFFINE needs 3 control points that are not on one line')
+        linear = solution.T
+    else:
+        # SIMILARITY: unknowns s and r, with the x rows and y rows stacked
+        design = np.vstack([np.column_stack([x, -y]), np.column_stack([y, x])])
+        (s, r), _, rank, _ = np.linalg.lstsq(design, np.concatenate([target[:, 0], target[:, 1]]), rcond=None)
+        if rank < 2:
+            raise ValueError('SIMILARITY needs 2 control points in different places')
+        linear = np.array([[s, -r], [r, s]])
+    return np.column_stack([linear, targetMean - linear @ sourceMean])
+
+
+class ControlTransform():
+
+    def __init__(self, source, target, kind='AFFINE'):
+        '''ControlTransform(source, target, kind)
+               source: (n, 2) control points in the data to be corrected
+               target: (n, 2) where those points should be
+               kind  : AFFINE or SIMILARITY, see TRANSFORMS
+        '''
+        self.kind = str(kind).upper()
+        if self.kind not in TRANSFORMS:
+            raise ValueError(f'transform must be one of {list(TRANSFORMS)}, not {kind!r}')
+        self.source = np.asarray(source, dtype=float).reshape(-1, 2)
+        self.target = np.asarray(target, dtype=float).reshape(-1, 2)
+        if len(self.source) < TRANSFORMS[self.kind]:
+            raise ValueError(f'{self.kind} needs at least {TRANSFORMS[self.kind]} control points, '
+                             f'not {len(self.source)}')
+        self.matrix = fitMatrix(self.source, self.target, self.kind)
+        self.residuals = np.hypot(*(self.apply(self.source) - self.target).T)
+        self.rmse = float(np.sqrt(np.mean(self.residuals ** 2)))
+
+    @classmethod
+    def fromControlPoints(cls, controlPoints, kind='AFFINE'):
+        return cls(*readControlPoints(controlPoints), kind)
+
+    def __repr__(self):
+        scaleX, scaleY = np.hypot(self.matrix[0, :2], self.matrix[1, :2])
+        rotation = np.degrees(np.arctan2(self.matrix[1, 0], self.matrix[0, 0]))
+        aStr = f'{self.kind} transform from {len(self.source)} control points\n'\
+               f'scale {scaleX:.6g} x {scaleY:.6g}, rotation {rotation:.4f} degrees, '\
+               f'shift ({self.matrix[0, 2]:.3f}, {self.matrix[1, 2]:.3f})\n'
+        for i, residual in enumerate(self.residuals):
+            aStr += f'  point {i + 1}: residual {residual:.3f}\n'
+        aStr += f'RMS error {self.rmse:.3f}'
+        return aStr
+
+    def apply(self, xy):
+        '''apply(xy) -> (n, 2) array
+               Transforms any number of x, y coordinates in one matrix product.
+        '''
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        return xy @ self.matrix[:, :2].T + self.matrix[:, 2]
@@ -0,0 +1,31 @@
+#===================================================================
+# Name    : parameters.py
+# Purpose : to read the text of toolbox parameters shared by more than
+#           one tool, without pulling in any tool's own dependencies
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# Only NumPy is needed, so DistanceWithin (scipy, reversegeocode) and
+# Quadrat can both read distance lists without importing each other.
+
+import numpy as np
+
+
+def parseDistances(text):
+    '''parseDistances(text) -> list of distances
+           text: one distance '5', a list '1;5;10' (or '1,5,10'), or a
+                 range 'start-stop' or 'start-stop:step', e.g. '1-50'
+    '''
+    distances = []
+    for part in str(text).replace(',', ';').split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part[1:]:
+            span, _, step = part.partition(':')
+            start, stop = (float(value) for value in span.split('-', 1))
+            step = float(step) if step else 1
+            distances += np.arange(start, stop + step / 2, step).tolist()
+        else:
+            distances.append(float(part))
+    return [int(d) if float(d).is_integer() else d for d in distances]
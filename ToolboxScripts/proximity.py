@@ -0,0 +1,230 @@
+#===================================================================
+# Name    : proximity.py
+# Purpose : to answer DistanceWithin questions for many distances at
+#           once with a KD-tree instead of one spatial selection each
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# Every customer's distance to its nearest store is found once. Sorted,
+# those distances answer "what percent of customers are within d of a
+# store" for any number of distances by binary search, so a 1-50 km
+# coverage curve costs one KD-tree query instead of 50 selections.
+#
+# Store catchments count, for every store, the customers within the
+# radius: all of them, the ones no other store reaches (exclusive) and
+# the ones shared with another store. Stores are ball-queried in chunks
+# across a process pool, each worker building the customer KD-tree once.
+# Every radius is answered from one ball query at the largest radius:
+# the hits' distances are binned by radius, and a hit is exclusive for
+# the radii below its customer's second nearest store.
+# Run in-process in ArcGIS Pro, sys.executable is ArcGISPro.exe, which
+# cannot start workers; the pool then uses the python.exe of Pro's
+# environment, or threads if there is none.
+#
+# Distances are measured in one of two modes:
+#     PLANAR   - straight lines between projected coordinates, in metres
+#     GEODESIC - great circles between longitude/latitude coordinates
+#                (e.g. EPSG:4326), correct worldwide without reprojecting.
+#                The points go on the unit sphere as (x, y, z) and the
+#                KD-tree searches by chord, which orders points exactly as
+#                the great circle does; a radius r in metres is the chord
+#                2 sin(r / 2R). Reported distances come from haversine.
+
+import os
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from scipy.spatial import cKDTree
+
+# featureio.py is shared with the scripts in PythonScripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PythonScripts'))
+from featureio import readRows
+from reversegeocode import EARTH_RADIUS, unitVectors, metresToChord
+
+STORE_CHUNK = 2000   # stores per catchment ball query task
+MODES = ('PLANAR', 'GEODESIC')
+
+
+def readPoints(featureClass, ids=False, spatialReference=None):
+    '''readPoints(featureClass, ids, spatialReference) -> (n, 2) array of x, y (and object ids)
+           Reads the point coordinates of a feature class (or its selection),
+           and with ids=True their object ids first. With spatialReference
+           the points are projected into it as they are read, so two layers
+           in different coordinate systems can be measured against each other.
+    '''
+    if ids:
+        rows = np.array(list(readRows(featureClass, ['OID@', 'SHAPE@X', 'SHAPE@Y'], spatialReference=spatialReference)),\
+                        dtype=float).reshape(-1, 3)
+        return rows[:, 0].astype(np.int64), rows[:, 1:]
+    return np.array(list(readRows(featureClass, ['SHAPE@X', 'SHAPE@Y'], spatialReference=spatialReference)),\
+                    dtype=float).reshape(-1, 2)
+
+
+def checkMode(mode):
+    mode = str(mode).upper()
+    if mode not in MODES:
+        raise ValueError(f'distance mode must be one of {MODES}, not {mode!r}')
+    return mode
+
+
+def searchPoints(points, mode='PLANAR'):
+    '''searchPoints(points, mode) -> array
+           points: (n, 2) x, y array; longitude, latitude for GEODESIC
+
+           The coordinates the KD-trees search in: the points as they are,
+           or for GEODESIC their (n, 3) unit sphere vectors.
+    '''
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if checkMode(mode) == 'GEODESIC':
+        if (np.abs(points[:, 0]) > 180).any() or (np.abs(points[:, 1]) > 90).any():
+            raise ValueError('GEODESIC needs longitude/latitude coordinates within +-180 and +-90 degrees')
+        return unitVectors(points[:, 1], points[:, 0])
+    return points
+
+
+def searchRadius(radius, mode='PLANAR'):
+    # a radius in metres as a searchPoints() distance
+    return metresToChord(radius) if checkMode(mode) == 'GEODESIC' else radius
+
+
+def haversine(lon1, lat1, lon2, lat2, radius=EARTH_RADIUS):
+    '''haversine(lon1, lat1, lon2, lat2, radius) -> distances in metres
+           Great circle distances between decimal degree coordinates, element
+           by element over whole arrays.
+    '''
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(a, dtype=float)) for a in (lon1, lat1, lon2, lat2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * radius * np.arcsin(np.sqrt(np.minimum(h, 1)))
+
+
+def nearestDistances(stores, customers, mode='PLANAR'):
+    '''nearestDistances(stores, customers, mode) -> distances
+           stores, customers: (n, 2) coordinate arrays
+           mode             : PLANAR or GEODESIC, see MODES
+
+           The distance from every customer to its nearest store, in metres
+           for GEODESIC.
+    '''
+    mode = checkMode(mode)
+    if not len(stores):
+        return np.full(len(customers), np.inf)
+    distances, index = cKDTree(searchPoints(stores, mode)).query(searchPoints(customers, mode))
+    if mode == 'GEODESIC':
+        stores, customers = np.asarray(stores, dtype=float), np.asarray(customers, dtype=float)
+        distances = haversine(customers[:, 0], customers[:, 1], stores[index, 0], stores[index, 1])
+    return distances
+
+
+def coverageCurve(distances, searchDists):
+    '''coverageCurve(distances, searchDists) -> counts, percents
+           distances  : nearest store distance of every customer
+           searchDists: distances to answer, in the same units
+
+           How many (and what percent of) customers are within each search
+           distance of a store, by binary search over the sorted distances.
+    '''
+    ordered = np.sort(distances)
+    counts = np.searchsorted(ordered, np.asarray(searchDists, dtype=float), side='right')
+    percents = counts / len(ordered) * 100 if len(ordered) else np.zeros(len(counts))
+    return counts, percents
+
+
+# the customer tree, second nearest store distances and radii of a
+# catchment worker, set once per process by initCatchments() rather than
+# sent with every task
+worker = {}
+
+
+def initCatchments(customers, second, radii):
+    worker['tree'] = cKDTree(customers)
+    worker['customers'] = customers
+    worker['second'] = second
+    worker['radii'] = radii
+
+
+def catchmentChunk(stores):
+    # customers within each radius of each store in the chunk, and how many
+    # of them no other store reaches, from one ball query at the largest
+    # radius: a hit at distance d is within every radius r >= d, and
+    # exclusive for the radii d <= r < (its second nearest store)
+    radii = worker['radii']
+    hits = worker['tree'].query_ball_point(stores, radii[-1])
+    counts = np.array([len(hit) for hit in hits], dtype=np.int64)
+    customers = np.concatenate([np.asarray(hit, dtype=np.int64) for hit in hits]) if len(hits) else np.zeros(0, np.int64)
+    store = np.repeat(np.arange(len(stores)), counts)
+    distance = np.sqrt(((worker['customers'][customers] - stores[store]) ** 2).sum(axis=1))
+
+    # first radius each hit is within, and first radius it is shared at
+    first = np.searchsorted(radii, distance, side='left')
+    shared = np.maximum(np.searchsorted(radii, worker['second'][customers], side='left'), first)
+    size = len(stores) * (len(radii) + 1)
+    within = np.bincount(store * (len(radii) + 1) + first, minlength=size)
+    exclusive = within - np.bincount(store * (len(radii) + 1) + shared, minlength=size)
+    within = within.reshape(len(stores), -1).cumsum(axis=1)[:, :-1]
+    exclusive = exclusive.reshape(len(stores), -1).cumsum(axis=1)[:, :-1]
+    return within.T.astype(np.int64), exclusive.T.astype(np.int64)
+
+
+def workerPool(workers, initializer, initargs):
+    '''workerPool(workers, initializer, initargs) -> executor
+           A process pool, unless this Python is embedded in another program
+           (ArcGISPro.exe running the tool in-process) and no python
+           executable can be found to start the workers, then a thread pool.
+    '''
+    executable = os.path.basename(sys.executable).lower()
+    if not executable.startswith('python'):
+        python = os.path.join(sys.exec_prefix, 'python.exe' if os.name == 'nt' else 'python')
+        if not os.path.isfile(python):
+            return ThreadPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+        multiprocessing.set_executable(python)
+    return ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+
+
+def catchments(stores, customers, radius, workers=None, chunkSize=STORE_CHUNK, mode='PLANAR'):
+    '''catchments(stores, customers, radius, workers, chunkSize, mode) -> within, exclusive, shared
+           stores, customers: (n, 2) coordinate arrays
+           radius           : catchment radius, or a list of radii, in the same units
+                              (metres for GEODESIC)
+           workers          : processes for the ball queries, None for every core
+                              (threads when no python executable is found, see workerPool)
+           chunkSize        : stores per task
+           mode             : PLANAR or GEODESIC, see MODES
+
+           Counts, for every store, the customers within the radius, the ones
+           exclusive to it and the ones it shares with another store. Every
+           radius comes from one pool, one customer tree per worker and one
+           ball query at the largest radius; for a list of radii the counts
+           are (radii, stores) arrays.
+    '''
+    single = np.ndim(radius) == 0
+    radii = np.atleast_1d(np.asarray(radius, dtype=float))
+    order = np.argsort(radii)
+    stores, customers = searchPoints(stores, mode), searchPoints(customers, mode)
+    if not len(stores) or not len(customers) or not len(radii):
+        zeros = np.zeros((len(radii), len(stores)), dtype=np.int64)
+        within, exclusive = zeros, zeros.copy()
+    else:
+        # a customer within r of a store is exclusive to it while its second
+        # nearest store is beyond r
+        second = cKDTree(stores).query(customers, k=2, workers=-1)[0][:, 1] if len(stores) > 1\
+                 else np.full(len(customers), np.inf)
+        args = (customers, second, searchRadius(radii[order], mode))
+
+        chunks = [stores[i:i + chunkSize] for i in range(0, len(stores), chunkSize)]
+        if len(chunks) < 2:
+            initCatchments(*args)
+            results = [catchmentChunk(chunks[0])]
+            worker.clear()   # do not keep the customer tree alive
+        else:
+            with workerPool(workers, initCatchments, args) as pool:
+                results = list(pool.map(catchmentChunk, chunks))
+
+        # back from sorted radii to the order given
+        within, exclusive = np.empty((2, len(radii), len(stores)), dtype=np.int64)
+        within[order] = np.concatenate([result[0] for result in results], axis=1)
+        exclusive[order] = np.concatenate([result[1] for result in results], axis=1)
+
+    if single:
+        within, exclusive = within[0], exclusive[0]
+    return within, exclusive, within - exclusive
@@ -1,9 +1,18 @@
-import arcpy, os
+import arcpy, os, sys
+import numpy as np
 from tkinter import *
+from ringarray import RingArray
+from quadratgrid import QuadratGrid, quadratStats, quadratSweep
+from parameters import parseDistances
+
+# featureio.py is shared with the scripts in PythonScripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PythonScripts'))
+from featureio import openWriter, readRows
 
 class Quadrat():
 
-    def __init__(self, workspace, dataset, studyArea, side, significance, chkOpt, useScratch=True):
+    def __init__(self, workspace, dataset, studyArea, side, significance, chkOpt, useScratch=True, inMemory=True,\
+                 sweep=None):
         '''Quadrat()
                workspace    - The workspace that all tasks will be done in
                dataset      - The point dataset that will be operated on
@@ -11,6 +20,10 @@ class Quadrat():
                side         - The quadrat side length
                significance - The significance statistic (1, 5, 10)
                chkOpt       - Select whether or not to used an optimized quadrat
+               inMemory     - Count the points per quadrat in memory (see quadratgrid.py)
+                              instead of building fishnet, intersect and frequency files
+               sweep        - Optional side lengths (km) to get the statistics of all at
+                              once, from one binning of the points
         '''
         self.root = workspace
         self.dataset = dataset
@@ -35,10 +48,16 @@ class Quadrat():
         # =============================================================
         # Build data layers
         # =============================================================
-        self.fishnetClip = self.BuildFishnet()      
-        self.intersected = self.BuildIntersect()
-        self.intersectFreq = self.BuildFreqTable_intersect()
-        self.frequencyFreq = self.BuildFreqTable_freq()
+        self.fishnetClip = self.intersected = self.intersectFreq = self.frequencyFreq = None
+        self.rings = self.extent = self.xy = self.sweepTable = None
+        if inMemory:
+            self.grid, self.counts = self.BuildGrid()
+        else:
+            self.counts = None
+            self.fishnetClip = self.BuildFishnet()      
+            self.intersected = self.BuildIntersect()
+            self.intersectFreq = self.BuildFreqTable_intersect()
+            self.frequencyFreq = self.BuildFreqTable_freq()
 
         # =============================================================
         # Summarize statistics
@@ -51,12 +70,41 @@ class Quadrat():
         self.t, self.tMsg = self.GetTTest()
         self.crit = self.GetCritValues()
         self.pointPattern, self.pointPatternMsg = self.GetPointPattern(self.crit)
+        self.sweep, self.sweepMsg = self.GetSweep(sweep) if sweep else (None, '')
         self.SetParameters()
         
 # ==================================================================================
 # ARCPY BUILDERS
 # ==================================================================================
 
+    def BuildGrid(self):
+        '''BuildGrid() -> grid, counts
+           Counts the points in every quadrat of the study area in memory: the
+           fishnet's cells, the study area rasterized onto them once and the points
+           binned by floor division. counts has one entry per quadrat of the clipped
+           fishnet; nothing is written to the workspace.
+        '''
+        self.ReadLayers()
+        grid = QuadratGrid(self.rings, self.extent, self.quadSideLength)
+        counts = grid.Count(self.xy[:, 0], self.xy[:, 1])[grid.mask]
+        return grid, counts
+
+
+    def BuildSweepTable(self, curve):
+        '''BuildSweepTable(curve) -> outputPath
+           Writes one row per side length of a sweep: the quadrat counts, lambda,
+           variance, variance to mean ratio, t and pattern.
+        '''
+        fields = [['SIDE_KM','DOUBLE'],['QUADRATS','LONG'],['NONEMPTY','LONG'],['LAMBDA','DOUBLE'],\
+                  ['VARIANCE','DOUBLE'],['VMR','DOUBLE'],['T','DOUBLE'],['PATTERN','TEXT']]
+        patterns = [self.GetPointPattern(self.crit, t)[0] for t in curve['T']]
+        with openWriter(self.ws, f'sweep_{self.filename}', None, fields) as writer:
+            writer.insertRows(zip((curve['SIDE'] / 1000).tolist(), curve['QUADRATS'].tolist(),\
+                                  curve['NONEMPTY'].tolist(), curve['LAMBDA'].tolist(),\
+                                  curve['VARIANCE'].tolist(), curve['VMR'].tolist(), curve['T'].tolist(), patterns))
+        return writer.path
+
+
     def BuildIntersect(self):
         ''' BuildIntersect() -> ouputPath
             builds an intersect between the dataset points and the fishnet.
@@ -177,8 +225,11 @@ class Quadrat():
         '''GetNonEmptyQuadCount() -> count, msg
            Gets the total non-empty quadrats in the study area
         '''
-        nonEmptyCount = arcpy.management.GetCount(self.intersectFreq)
-        nonEmptyCount = int(nonEmptyCount.getOutput(0))
+        if self.counts is not None:
+            nonEmptyCount = int(np.count_nonzero(self.counts))
+        else:
+            nonEmptyCount = arcpy.management.GetCount(self.intersectFreq)
+            nonEmptyCount = int(nonEmptyCount.getOutput(0))
         msg = f'There are {nonEmptyCount} quadrats with points.\n'
         return nonEmptyCount, msg
     
@@ -192,14 +243,16 @@ class Quadrat():
         return optSize, msg
 
 
-    def GetPointPattern(self,crit):
-        '''GetEmptyQuadCount(crit) -> pattern, msg
+    def GetPointPattern(self,crit,t=None):
+        '''GetPointPattern(crit, t) -> pattern, msg
            Gets the pattern classification based on a statistical t-test's critical values.
+           t is the quadrat's own t-score unless another is given.
         '''
-        if self.t < -crit:
+        t = self.t if t is None else t
+        if t < -crit:
             pattern = 'regular'
             
-        elif self.t > crit:
+        elif t > crit:
             pattern = 'clustered'
             
         else:
@@ -209,6 +262,23 @@ class Quadrat():
         return pattern, msg
 
 
+    def GetSweep(self, sides):
+        '''GetSweep(sides) -> curve, msg
+           Gets the variance to mean ratio and t-score of many side lengths (km) in one
+           call: the points are binned once at the smallest side, and the odd multiples
+           of it are summed from those counts (see quadratgrid.py).
+        '''
+        self.ReadLayers()
+        curve = quadratSweep(self.rings, self.extent, self.xy[:, 0], self.xy[:, 1],\
+                             [side * 1000 for side in sides], self.pointCount)
+        self.sweepTable = self.BuildSweepTable(curve)
+
+        msg = f'\n{"":*^50}\n{"SCALE SWEEP":*^50}\n{"":*^50}\n'
+        for side, vmr, t in zip(curve['SIDE'], curve['VMR'], curve['T']):
+            msg += f'{side/1000:>8.2f} km: VMR = {vmr:.2f}, t = {t:.2f} ({self.GetPointPattern(self.crit, t)[0]})\n'
+        return curve, msg
+
+
     def GetPoints(self):
         '''GetPoints() -> pointCount
            Gets the total amount of points in the dataset.
@@ -222,8 +292,11 @@ class Quadrat():
         '''GetQuadCount() -> quadCcount, msg
            Gets the total quadrats in the study area, based on the fishnet.
         '''
-        quadCount = arcpy.management.GetCount(self.fishnetClip)
-        quadCount = int(quadCount.getOutput(0))
+        if self.counts is not None:
+            quadCount = len(self.counts)
+        else:
+            quadCount = arcpy.management.GetCount(self.fishnetClip)
+            quadCount = int(quadCount.getOutput(0))
         msg = f'There are {quadCount} quadrats.\n'
         return quadCount, msg
 
@@ -251,6 +324,11 @@ class Quadrat():
         '''GetVariance() -> variance, msg
            Gets the variance used to calculate the statistical t-test.
         '''       
+        if self.counts is not None:
+            variance = quadratStats(self.counts, self.pointCount)[3]
+            msg = f'Variance = {variance:.2f}\n'
+            return variance, msg
+
         lambda_ = self.lambda_
         variance = ((lambda_) **2) * self.emptyCount
 
@@ -268,6 +346,19 @@ class Quadrat():
 # ==================================================================================
 # SETTERS
 # ==================================================================================
+    def ReadLayers(self):
+        '''ReadLayers()
+           Reads the study area polygons, their extent and the point coordinates once.
+        '''
+        if self.xy is not None:
+            return
+        ext = arcpy.Describe(self.studyArea).extent
+        self.extent = (ext.XMin, ext.YMin, ext.XMax, ext.YMax)
+        self.rings = RingArray.fromWKB(row[0] for row in readRows(self.studyArea, ['SHAPE@WKB'])\
+                                       if row[0] is not None)
+        self.xy = np.array(list(readRows(self.dataset, ['SHAPE@X', 'SHAPE@Y'])), dtype=float).reshape(-1, 2)
+
+
     def SetEnv(self):
         '''setEnv()
            Sets the environment and the scratch workspace.
@@ -285,7 +376,10 @@ class Quadrat():
         '''
         arcpy.SetParameterAsText(6, self.dataset)
         arcpy.SetParameterAsText(7, self.studyArea)
-        arcpy.SetParameterAsText(8, self.fishnetClip)
+        if self.fishnetClip:
+            arcpy.SetParameterAsText(8, self.fishnetClip)
+        if self.sweepTable:
+            arcpy.SetParameterAsText(10, self.sweepTable)
 
 # ==================================================================================
 # toString
@@ -310,6 +404,7 @@ class Quadrat():
         aStr += self.varianceMsg
         aStr += self.tMsg
         aStr += self.pointPatternMsg
+        aStr += self.sweepMsg
               
         
         return aStr
@@ -371,8 +466,9 @@ studyArea = arcpy.GetParameterAsText(2)
 side = float(arcpy.GetParameterAsText(3))
 significance = int(arcpy.GetParameterAsText(4))
 chkOpt = arcpy.GetParameterAsText(5)
+sweep = parseDistances(arcpy.GetParameterAsText(9)) # optional side lengths (km), e.g. 0.5-10:0.5
 
-q = Quadrat(ws,dataset,studyArea,side,significance,chkOpt)
+q = Quadrat(ws,dataset,studyArea,side,significance,chkOpt,sweep=sweep)
 
 ShowResults(\
             q.filename,\
@@ -0,0 +1,295 @@
+#===================================================================
+# Name    : quadratgrid.py
+# Purpose : to count points per quadrat in memory with NumPy, instead
+#           of building a fishnet, clipping it, intersecting it with the
+#           points and summarizing the result in frequency tables
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# The grid is the one quadrat.py has CreateFishnet build: cells of the
+# side length from (XMin - side/2, YMin - side/2) until they cover
+# (XMax + side/2, YMax + side/2) of the study area's extent.
+#
+# The study area is rasterized onto the grid once, with the same cells
+# the fishnet Clip keeps (the cells the study area covers some of):
+#     boundary cells - the study area's edges run through them, found by
+#                      walking every edge across the columns and rows it
+#                      spans
+#     inside cells   - the rest of the cells whose centers are inside,
+#                      filled row by row between the edge crossings of the
+#                      row's center line by nonzero winding. The rings are
+#                      reoriented first (outer rings one way, holes the
+#                      other) so holes stay holes however they were wound,
+#                      and overlapping study polygons still count once.
+# Points are binned into cells with floor division. Only points inside
+# the study area count, as with the Intersect: every point in an inside
+# cell is, and points in boundary cells are tested against the edges of
+# their row. The counts of the kept cells give the quadrat statistics
+# with np.bincount, with no intermediate files.
+#
+# quadratSweep() runs many side lengths from one binning. The points are
+# counted once at the smallest side; a side that is an odd multiple k of
+# it has its fishnet origin exactly (k - 1) / 2 small cells further out,
+# so its counts and study area cells are k x k blocks of the small ones
+# (padded at the edges). Other sides are binned again exactly.
+
+import numpy as np
+
+MAX_PAIRS = 5000000   # point x edge tests held at once in PointsInside()
+SWEEP_FIELDS = ['SIDE', 'QUADRATS', 'NONEMPTY', 'LAMBDA', 'VARIANCE', 'VMR', 'T', 'AGGREGATED']
+
+
+def ringEdges(rings):
+    '''ringEdges(rings) -> (edges, 4) array of x1, y1, x2, y2
+           The edges of every ring of a RingArray (see ringarray.py).
+    '''
+    xy = rings.coords[:, :2]
+    start = np.ones(len(xy), dtype=bool)
+    start[rings.rings[1:] - 1] = False   # a ring's last vertex starts no edge
+    i = np.flatnonzero(start)
+    return np.column_stack([xy[i], xy[i + 1]])
+
+
+def expand(first, last):
+    # (group, value) pairs for every value first..last of every group
+    n = np.maximum(last - first + 1, 0)
+    group = np.repeat(np.arange(len(n)), n)
+    step = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    return group, first[group] + step
+
+
+def quadratStats(counts, pointCount):
+    '''quadratStats(counts, pointCount) -> quadCount, nonEmptyCount, lambda, variance, t
+           counts    : points in each quadrat of the study area
+           pointCount: points in the dataset, which lambda is taken over
+
+           The statistics of Quadrat.GetVariance() and Quadrat.GetTTest():
+           lambda = points / quadrats, variance = mean (count - lambda)^2,
+           t = (variance - lambda) / sqrt(2 / (quadrats - 1)).
+    '''
+    counts = np.asarray(counts)
+    quadCount = len(counts)
+    nonEmptyCount = int(np.count_nonzero(counts))
+    lambda_ = pointCount / quadCount
+    variance = float(np.mean((counts - lambda_) ** 2))
+    t = (variance - lambda_) / ((2 / (quadCount - 1)) ** 0.5)
+    return quadCount, nonEmptyCount, lambda_, variance, t
+
+
+class QuadratGrid():
+
+    def __init__(self, rings, extent, side):
+        '''QuadratGrid(rings, extent, side)
+               rings : RingArray of the study area polygons
+               extent: (XMin, YMin, XMax, YMax) of the study area
+               side  : quadrat side length, in map units
+        '''
+        xMin, yMin, xMax, yMax = extent
+        self.extent = tuple(extent)
+        self.side = float(side)
+        self.originX = xMin - side / 2
+        self.originY = yMin - side / 2
+        # rounded so floating point noise does not add a column or row
+        self.nCols = max(int(np.ceil(round((xMax - xMin + side) / side, 9))), 1)
+        self.nRows = max(int(np.ceil(round((yMax - yMin + side) / side, 9))), 1)
+
+        # edges in grid units: a cell is one unit, cell (row, col) spans
+        # [col, col + 1) x [row, row + 1)
+        edges = ringEdges(rings.oriented())
+        self.u1, self.u2 = (edges[:, 0] - self.originX) / side, (edges[:, 2] - self.originX) / side
+        self.v1, self.v2 = (edges[:, 1] - self.originY) / side, (edges[:, 3] - self.originY) / side
+
+        self.boundary = self.BoundaryCells()
+        self.mask = self.boundary | self.InsideCells()
+
+    def __repr__(self):
+        return f'QuadratGrid({self.nRows} x {self.nCols} cells of {self.side:g}, '\
+               f'{int(self.mask.sum())} in the study area)'
+
+    def BoundaryCells(self):
+        '''BoundaryCells() -> (rows, cols) bool array
+               The cells the study area's edges run through.
+        '''
+        boundary = np.zeros((self.nRows, self.nCols), dtype=bool)
+        uMin, uMax = np.minimum(self.u1, self.u2), np.maximum(self.u1, self.u2)
+
+        # every column an edge spans (an edge ending on a cell side does
+        # not reach into the next cell)
+        first = np.clip(np.floor(uMin), 0, self.nCols - 1).astype(np.int64)
+        last = np.clip(np.maximum(np.ceil(uMax) - 1, np.floor(uMin)), 0, self.nCols - 1).astype(np.int64)
+        edge, col = expand(first, last)
+
+        # the part of the edge in that column, and the rows it spans there
+        u1, u2, v1, v2 = self.u1[edge], self.u2[edge], self.v1[edge], self.v2[edge]
+        lo, hi = np.maximum(np.minimum(u1, u2), col), np.minimum(np.maximum(u1, u2), col + 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            slope = (v2 - v1) / (u2 - u1)
+        vertical = ~np.isfinite(slope)
+        vLo = np.where(vertical, np.minimum(v1, v2), v1 + (lo - u1) * np.where(vertical, 0, slope))
+        vHi = np.where(vertical, np.maximum(v1, v2), v1 + (hi - u1) * np.where(vertical, 0, slope))
+        vMin, vMax = np.minimum(vLo, vHi), np.maximum(vLo, vHi)
+
+        first = np.clip(np.floor(vMin), 0, self.nRows - 1).astype(np.int64)
+        last = np.clip(np.maximum(np.ceil(vMax) - 1, np.floor(vMin)), 0, self.nRows - 1).astype(np.int64)
+        pair, row = expand(first, last)
+        boundary[row, col[pair]] = True
+        return boundary
+
+    def Crossings(self, lines):
+        '''Crossings(lines) -> line, u, sign (sorted by line, then u)
+               lines: v of the rows' center lines, r + 0.5 for row r
+
+               Where the edges cross each row's center line, and whether
+               they cross it going up (+1) or down (-1).
+        '''
+        vMin, vMax = np.minimum(self.v1, self.v2), np.maximum(self.v1, self.v2)
+        # rows whose center line is in [vMin, vMax): horizontal edges cross none
+        first = np.maximum(np.ceil(vMin - 0.5), 0).astype(np.int64)
+        last = np.minimum(np.ceil(vMax - 0.5) - 1, len(lines) - 1).astype(np.int64)
+        edge, line = expand(first, last)
+        v = lines[line]
+        u = self.u1[edge] + (v - self.v1[edge]) * (self.u2[edge] - self.u1[edge]) / (self.v2[edge] - self.v1[edge])
+        sign = np.where(self.v2[edge] > self.v1[edge], 1, -1)
+        order = np.lexsort((u, line))
+        return line[order], u[order], sign[order]
+
+    def InsideCells(self):
+        '''InsideCells() -> (rows, cols) bool array
+               The cells whose centers are inside the study area, filled row
+               by row between the edge crossings of the rows' center lines.
+        '''
+        line, u, sign = self.Crossings(np.arange(self.nRows) + 0.5)
+        # winding number just right of each crossing, counted from the row's start
+        winding = np.cumsum(sign)
+        rowStart = np.searchsorted(line, line)
+        winding -= np.concatenate([[0], winding])[rowStart]
+
+        # from a crossing with nonzero winding to the next crossing in the row
+        span = np.flatnonzero((winding[:-1] != 0) & (line[:-1] == line[1:]))
+        first = np.clip(np.ceil(u[span] - 0.5), 0, self.nCols).astype(np.int64)
+        last = np.clip(np.ceil(u[span + 1] - 0.5), 0, self.nCols).astype(np.int64)
+
+        fill = np.zeros((self.nRows, self.nCols + 1), dtype=np.int64)
+        np.add.at(fill, (line[span], first), 1)
+        np.add.at(fill, (line[span], last), -1)
+        return np.cumsum(fill, axis=1)[:, :-1] > 0
+
+    def Cells(self, x, y):
+        '''Cells(x, y) -> row, col
+               The cell of every point by floor division, -1 off the grid.
+        '''
+        col = np.floor((np.asarray(x, dtype=float) - self.originX) / self.side).astype(np.int64)
+        row = np.floor((np.asarray(y, dtype=float) - self.originY) / self.side).astype(np.int64)
+        off = (col < 0) | (col >= self.nCols) | (row < 0) | (row >= self.nRows)
+        col[off], row[off] = -1, -1
+        return row, col
+
+    def PointsInside(self, x, y, row, col):
+        '''PointsInside(x, y, row, col) -> bool array
+               Whether each point is inside the study area. Points in inside
+               cells are; points in boundary cells are tested against the edges
+               crossing their row (nonzero winding along a ray to +x).
+        '''
+        onGrid = row >= 0
+        inside = np.zeros(len(row), dtype=bool)
+        inside[onGrid] = self.mask[row[onGrid], col[onGrid]] & ~self.boundary[row[onGrid], col[onGrid]]
+
+        test = np.flatnonzero(onGrid)
+        test = test[self.boundary[row[test], col[test]]]
+        if not len(test):
+            return inside
+        u = (np.asarray(x, dtype=float)[test] - self.originX) / self.side
+        v = (np.asarray(y, dtype=float)[test] - self.originY) / self.side
+
+        # the edges spanning each row band, grouped by row
+        vMin, vMax = np.minimum(self.v1, self.v2), np.maximum(self.v1, self.v2)
+        first = np.clip(np.floor(vMin), 0, self.nRows - 1).astype(np.int64)
+        last = np.clip(np.floor(vMax), 0, self.nRows - 1).astype(np.int64)
+        edge, edgeRow = expand(first, last)
+        order = np.argsort(edgeRow, kind='stable')
+        edge, edgeRow = edge[order], edgeRow[order]
+        bounds = np.searchsorted(edgeRow, np.arange(self.nRows + 1))
+
+        pointOrder = np.argsort(row[test], kind='stable')
+        pointRows = row[test][pointOrder]
+        for r in np.unique(pointRows):
+            edges = edge[bounds[r]:bounds[r + 1]]
+            u1, v1, u2, v2 = self.u1[edges], self.v1[edges], self.u2[edges], self.v2[edges]
+            sign = np.where(v2 > v1, 1, -1)
+            points = pointOrder[np.searchsorted(pointRows, r):np.searchsorted(pointRows, r, side='right')]
+            step = max(MAX_PAIRS // max(len(edges), 1), 1)
+            for start in range(0, len(points), step):
+                chunk = points[start:start + step]
+                pu, pv = u[chunk, None], v[chunk, None]
+                crosses = (np.minimum(v1, v2) <= pv) & (pv < np.maximum(v1, v2))
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    uCross = u1 + (pv - v1) * (u2 - u1) / (v2 - v1)
+                winding = np.where(crosses & (uCross > pu), sign, 0).sum(axis=1)
+                inside[test[chunk]] = winding != 0
+        return inside
+
+    def Count(self, x, y):
+        '''Count(x, y) -> (rows, cols) int array
+               Points per cell, counting only the points inside the study area.
+        '''
+        row, col = self.Cells(x, y)
+        inside = self.PointsInside(x, y, row, col)
+        cells = row[inside] * self.nCols + col[inside]
+        return np.bincount(cells, minlength=self.nRows * self.nCols).reshape(self.nRows, self.nCols)
+
+    def Aggregate(self, counts, k):
+        '''Aggregate(counts, k) -> counts, mask of the grid with k times the side
+               counts: (rows, cols) counts of this grid, from Count()
+               k     : odd whole number
+
+               Sums k x k blocks of cells into the cells of the coarser grid,
+               which lines up with this one when k is odd.
+        '''
+        if k < 1 or k % 2 != 1:
+            raise ValueError(f'only odd multiples of the side line up with the grid, not {k}')
+        xMin, yMin, xMax, yMax = self.extent
+        side = self.side * k
+        nCols = max(int(np.ceil(round((xMax - xMin + side) / side, 9))), 1)
+        nRows = max(int(np.ceil(round((yMax - yMin + side) / side, 9))), 1)
+        pad = (k - 1) // 2
+
+        blocks = []
+        for values in (counts, self.mask):
+            padded = np.zeros((nRows * k, nCols * k), dtype=values.dtype)
+            rows, cols = min(self.nRows, nRows * k - pad), min(self.nCols, nCols * k - pad)
+            padded[pad:pad + rows, pad:pad + cols] = values[:rows, :cols]
+            blocks.append(padded.reshape(nRows, k, nCols, k))
+        return blocks[0].sum(axis=(1, 3)), blocks[1].any(axis=(1, 3))
+
+
+def quadratSweep(rings, extent, x, y, sides, pointCount=None):
+    '''quadratSweep(rings, extent, x, y, sides, pointCount) -> dict of arrays, keyed by SWEEP_FIELDS
+           rings     : RingArray of the study area polygons
+           extent    : (XMin, YMin, XMax, YMax) of the study area
+           x, y      : point coordinates
+           sides     : quadrat side lengths, in map units
+           pointCount: points lambda is taken over, all of x by default
+
+           The quadrat statistics of every side length, with the variance to
+           mean ratio (VMR), from one binning at the smallest side. AGGREGATED
+           is 1 for the sides summed from it and 0 for the ones binned again.
+    '''
+    sides = np.sort(np.asarray(sides, dtype=float))
+    pointCount = len(x) if pointCount is None else pointCount
+    base = QuadratGrid(rings, extent, sides[0])
+    baseCounts = base.Count(x, y)
+
+    curve = {field: [] for field in SWEEP_FIELDS}
+    for side in sides:
+        k = int(round(side / base.side))
+        aggregated = k % 2 == 1 and abs(k * base.side - side) <= 1e-9 * side
+        if aggregated:
+            counts, mask = base.Aggregate(baseCounts, k)
+        else:
+            grid = QuadratGrid(rings, extent, side)
+            counts, mask = grid.Count(x, y), grid.mask
+        quadCount, nonEmptyCount, lambda_, variance, t = quadratStats(counts[mask], pointCount)
+        for field, value in zip(SWEEP_FIELDS, (side, quadCount, nonEmptyCount, lambda_, variance,\
+                                               variance / lambda_, t, int(aggregated))):
+            curve[field].append(value)
+    return {field: np.array(values) for field, values in curve.items()}
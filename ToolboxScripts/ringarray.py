@@ -0,0 +1,219 @@
+#===================================================================
+# Name    : ringarray.py
+# Purpose : to hold the rings of many polygons as one NumPy coordinate
+#           array, so ForcePolygons can move them all with one array
+#           add instead of an arcpy.Point per vertex
+# Author  : Nathan Wisla
+# Date    : October 19, 2026
+#===================================================================
+# A RingArray is read straight from WKB (Polygon or MultiPolygon, with
+# or without Z/M) into flat arrays:
+#     coords   - every vertex, (n, dims), x and y first
+#     rings    - where each ring starts in coords, plus the end
+#     parts    - where each part (outer ring, then its holes) starts in
+#                rings, plus the end
+#     features - where each feature starts in parts, plus the end
+# Moving features is one subtract/add over coords, repeated out per
+# vertex from the per-feature shift. The geometry is only built again
+# at write time, as WKB per feature, and Z/M values pass through.
+
+import struct
+import numpy as np
+
+POLYGON, MULTIPOLYGON = 3, 6
+EWKB_Z, EWKB_M = 0x80000000, 0x40000000
+
+
+def wkbType(wkb, offset):
+    # byte order, base geometry type, coordinate dimensions and ISO
+    # dimension code (0 xy, 1 z, 2 m, 3 zm) of the geometry at offset,
+    # from ISO or EWKB type codes
+    order = '<' if wkb[offset] == 1 else '>'
+    code, = struct.unpack_from(order + 'I', wkb, offset + 1)
+    iso = (code & 0xFFFF) // 1000
+    hasZ = bool(code & EWKB_Z) or iso in (1, 3)
+    hasM = bool(code & EWKB_M) or iso in (2, 3)
+    return order, (code & 0xFFFF) % 1000, 2 + hasZ + hasM, hasZ + 2 * hasM
+
+
+class RingArray():
+
+    def __init__(self, coords, rings, parts, features, flavour=0):
+        '''RingArray(coords, rings, parts, features, flavour)
+               coords  : (n, dims) vertex array, x and y first
+               rings   : start of each ring in coords, plus the end
+               parts   : start of each part in rings, plus the end
+               features: start of each feature in parts, plus the end
+               flavour : ISO WKB dimension code, 0 (xy), 1 (z), 2 (m) or 3 (zm)
+        '''
+        self.coords = np.asarray(coords, dtype=float)
+        self.rings = np.asarray(rings, dtype=np.int64)
+        self.parts = np.asarray(parts, dtype=np.int64)
+        self.features = np.asarray(features, dtype=np.int64)
+        self.flavour = flavour
+
+    @classmethod
+    def fromWKB(cls, wkbs):
+        '''fromWKB(wkbs) -> RingArray
+               wkbs: Polygon or MultiPolygon WKB of every feature
+
+               Reads the ring structure with struct and every ring's
+               coordinates with one np.frombuffer.
+        '''
+        chunks, rings, parts, features = [], [0], [0], [0]
+        dims = flavour = None
+
+        def readPolygon(wkb, offset):
+            order, _, _, _ = wkbType(wkb, offset)
+            n, = struct.unpack_from(order + 'I', wkb, offset + 5)
+            offset += 9
+            for _ in range(n):
+                m, = struct.unpack_from(order + 'I', wkb, offset)
+                chunks.append(np.frombuffer(wkb, order + 'f8', m * dims, offset + 4).reshape(m, dims))
+                rings.append(rings[-1] + m)
+                offset += 4 + 8 * dims * m
+            parts.append(len(rings) - 1)
+            return offset
+
+        for wkb in wkbs:
+            wkb = bytes(wkb)
+            order, geometryType, featureDims, featureFlavour = wkbType(wkb, 0)
+            if dims is None:
+                dims, flavour = featureDims, featureFlavour
+            elif featureDims != dims:
+                raise ValueError('every feature of a RingArray needs the same coordinate dimensions')
+            if geometryType == POLYGON:
+                readPolygon(wkb, 0)
+            elif geometryType == MULTIPOLYGON:
+                n, = struct.unpack_from(order + 'I', wkb, 5)
+                offset = 9
+                for _ in range(n):
+                    offset = readPolygon(wkb, offset)
+            else:
+                raise ValueError(f'RingArray holds polygons, not WKB geometry type {geometryType}')
+            features.append(len(parts) - 1)
+
+        coords = np.concatenate(chunks) if chunks else np.zeros((0, dims or 2))
+        return cls(coords, rings, parts, features, flavour or 0)
+
+    def __len__(self):
+        return len(self.features) - 1
+
+    def __repr__(self):
+        return f'RingArray({len(self)} features, {len(self.parts) - 1} parts, '\
+               f'{len(self.rings) - 1} rings, {len(self.coords)} vertices)'
+
+    def vertexCounts(self):
+        # vertices of every feature
+        return np.diff(self.rings[self.parts[self.features]])
+
+    def translate(self, dx, dy):
+        '''translate(dx, dy) -> self
+               dx, dy: one shift for every feature, or an array of one per feature
+
+               Moves the features in place with one add over every vertex.
+        '''
+        shift = np.column_stack(np.broadcast_arrays(np.asarray(dx, dtype=float), np.asarray(dy, dtype=float)))
+        if len(shift) == 1:
+            self.coords[:, :2] += shift[0]
+        else:
+            self.coords[:, :2] += np.repeat(shift, self.vertexCounts(), axis=0)
+        return self
+
+    def transform(self, matrix):
+        '''transform(matrix) -> self
+               matrix: (2, 3) affine matrix [[a, b, c], [d, e, f]], so that
+                       x' = a x + b y + c and y' = d x + e y + f
+
+               Transforms every vertex in place with one matrix product.
+        '''
+        matrix = np.asarray(matrix, dtype=float)
+        self.coords[:, :2] = self.coords[:, :2] @ matrix[:, :2].T + matrix[:, 2]
+        return self
+
+    def ringMoments(self):
+        '''ringMoments() -> area, cx, cy, one per ring
+               Signed area of every ring (positive counterclockwise) and its
+               first moments, the centroid times the area.
+        '''
+        # each ring is measured from its first vertex, which keeps large
+        # projected coordinates from swamping the cross products
+        starts, counts = self.rings[:-1], np.diff(self.rings)
+        origin = self.coords[np.minimum(starts, max(len(self.coords) - 1, 0)), :2] if len(self.coords)\
+                 else np.zeros((len(starts), 2))
+        xy = self.coords[:, :2] - np.repeat(origin, counts, axis=0)
+        nonEmpty = counts > 0
+        x0, y0 = xy[:, 0], xy[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+        ends = self.rings[1:][nonEmpty] - 1   # a ring's last vertex pairs with its first
+        x1[ends], y1[ends] = x0[starts[nonEmpty]], y0[starts[nonEmpty]]
+        cross = x0 * y1 - x1 * y0
+
+        area = np.zeros(len(starts))
+        cx, cy = np.zeros(len(starts)), np.zeros(len(starts))
+        if nonEmpty.any():
+            area[nonEmpty] = np.add.reduceat(cross, starts[nonEmpty]) / 2
+            cx[nonEmpty] = np.add.reduceat((x0 + x1) * cross, starts[nonEmpty]) / 6
+            cy[nonEmpty] = np.add.reduceat((y0 + y1) * cross, starts[nonEmpty]) / 6
+        return area, cx + origin[:, 0] * area, cy + origin[:, 1] * area
+
+    def outerRings(self):
+        # True for the first ring of every part, False for its holes
+        outer = np.zeros(len(self.rings) - 1, dtype=bool)
+        outer[self.parts[:-1][np.diff(self.parts) > 0]] = True
+        return outer
+
+    def centroids(self):
+        '''centroids() -> (features, 2) array
+               Area-weighted centroid of every feature, holes subtracted,
+               whichever way the rings wind.
+        '''
+        area, cx, cy = self.ringMoments()
+
+        # outer rings add their area and holes take theirs away
+        sign = np.where(self.outerRings(), 1.0, -1.0) * np.sign(area)
+        ringFeature = np.repeat(np.arange(len(self)), np.diff(self.parts[self.features]))
+        weight = np.bincount(ringFeature, sign * area, len(self))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.column_stack([np.bincount(ringFeature, sign * cx, len(self)) / weight,
+                                    np.bincount(ringFeature, sign * cy, len(self)) / weight])
+
+    def oriented(self):
+        '''oriented() -> RingArray
+               A copy with every outer ring counterclockwise and every hole
+               clockwise, whichever way they wound (Esri shapes wind the other
+               way, OGC ones often either way), so a winding number count treats
+               holes as holes.
+        '''
+        area = self.ringMoments()[0]
+        flip = (area < 0) == self.outerRings()
+        counts = np.diff(self.rings)
+        # vertex i of a flipped ring [start, end) comes from start + end - 1 - i
+        index = np.arange(len(self.coords))
+        flipped = np.repeat(flip, counts)
+        index[flipped] = (np.repeat(self.rings[:-1] + self.rings[1:] - 1, counts) - index)[flipped]
+        return RingArray(self.coords[index], self.rings, self.parts, self.features, self.flavour)
+
+    def toWKB(self):
+        '''toWKB() -> list of WKB bytes, one per feature
+               Little endian ISO WKB: a Polygon for single part features and a
+               MultiPolygon for the rest.
+        '''
+        typeOffset = 1000 * self.flavour
+        data = self.coords.astype('<f8', copy=False)
+        counts = np.diff(self.rings)
+        wkbs = []
+        for f in range(len(self)):
+            firstPart, lastPart = self.features[f], self.features[f + 1]
+            polygons = []
+            for p in range(firstPart, lastPart):
+                body = [struct.pack('<BII', 1, POLYGON + typeOffset, self.parts[p + 1] - self.parts[p])]
+                for r in range(self.parts[p], self.parts[p + 1]):
+                    body.append(struct.pack('<I', counts[r]))
+                    body.append(data[self.rings[r]:self.rings[r + 1]].tobytes())
+                polygons.append(b''.join(body))
+            if len(polygons) == 1:
+                wkbs.append(polygons[0])
+            else:
+                wkbs.append(struct.pack('<BII', 1, MULTIPOLYGON + typeOffset, len(polygons)) + b''.join(polygons))
+        return wkbs